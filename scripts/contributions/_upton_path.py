@@ -0,0 +1,28 @@
+#!/usr/bin/env python
+
+'''
+------------------------------------------------------------------------------------------------
+Short Description:
+Makes gamelib and o_function of upton-algo importable from the scripts in this directory.
+------------------------------------------------------------------------------------------------
+
+README:
+
+You do not need to run this file, import it before importing from upton-algo:
+	import _upton_path
+	from gamelib.frames import parse_turn_info
+
+upton-algo is looked for two directories up, next to the scripts directory. If it is not there,
+importing this file raises an ImportError that says where it was looked for.
+'''
+
+import os
+import sys
+
+# gamelib and o_function live next to algo_strategy.py in upton-algo
+UPTON_DIR = os.path.normpath(os.path.join(os.path.dirname(os.path.realpath(__file__)), '..', '..', 'upton-algo'))
+
+if not os.path.isdir(os.path.join(UPTON_DIR, 'gamelib')):
+	raise ImportError("upton-algo not found: {} has no gamelib directory".format(UPTON_DIR))
+if UPTON_DIR not in sys.path:
+	sys.path.insert(0, UPTON_DIR)
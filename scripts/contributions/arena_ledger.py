@@ -0,0 +1,120 @@
+#!/usr/bin/env python
+
+'''
+------------------------------------------------------------------------------------------------
+Short Description:
+The match ledger of run_arena.py. Every match is appended to a json lines file as it finishes,
+keyed by the content hashes of both algos, the seat they played in and a repeat index, so an
+interrupted arena can be resumed and only pairings whose code changed are played again.
+------------------------------------------------------------------------------------------------
+
+README:
+
+You do not need to run this file, run_arena.py uses it. To list what a ledger holds:
+>py scripts/contributions/arena_ledger.py arena_results.jsonl
+
+A match is identified by (hash of algo A, hash of algo B, seat, repeat) where A is the algo with
+the smaller hash, seat 0 means A played as player 1 and seat 1 that B did, and repeat counts
+identical games. Changing any file of an algo changes its hash, so all its pairings are played
+again while the results of the old code stay in the ledger.
+'''
+
+try:
+	import os
+	import sys
+	import json
+	import argparse
+except ImportError as e:
+	print("WARNING: Module not found, full error:\n")
+	print(str(e))
+	sys.exit()
+
+# gamelib of upton-algo, see _upton_path.py
+import _upton_path
+from gamelib.opening_book import source_hash
+
+# a short hash of every file in an algo directory, the same one an opening book is versioned with
+def algo_hash(path):
+	return source_hash(path)
+
+# the ledger key of a match, the pair is ordered by hash so it does not depend on the order algos were listed in
+def match_key(hash1, hash2, seat, repeat):
+	return '{}:{}:{}:{}'.format(hash1, hash2, seat, repeat)
+
+# orders a pair of algos by hash, the first one is algo A of the ledger keys
+def order_pair(algo_a, algo_b, hash_a, hash_b):
+	if hash_b < hash_a:
+		return algo_b, algo_a, hash_b, hash_a
+	return algo_a, algo_b, hash_a, hash_b
+
+# the player 1 / player 2 assignment of one game of a pairing ordered with order_pair
+def pairing_job(algo_a, algo_b, hash_a, hash_b, seat, repeat):
+	players = (algo_a, algo_b) if seat == 0 else (algo_b, algo_a)
+	hashes = (hash_a, hash_b) if seat == 0 else (hash_b, hash_a)
+	return {'algo1': players[0], 'algo2': players[1], 'hash1': hashes[0], 'hash2': hashes[1],
+		'seat': seat, 'repeat': repeat, 'key': match_key(hash_a, hash_b, seat, repeat)}
+
+# builds the player 1 / player 2 assignment of every game of a pairing
+def pairing_jobs(algo_a, algo_b, hash_a, hash_b, seats=1, repeats=1):
+	algo_a, algo_b, hash_a, hash_b = order_pair(algo_a, algo_b, hash_a, hash_b)
+	return [pairing_job(algo_a, algo_b, hash_a, hash_b, seat, repeat) for repeat in range(repeats) for seat in range(seats)]
+
+class Ledger:
+	'''
+	Append-only json lines file of match results, loaded once and appended to as matches finish.
+	A match counts as finished if the engine exited normally before its timeout and its replay with the endStats
+	was found, other results are kept for reference but played again.
+	'''
+	def __init__(self, path):
+		self.path = path
+		self.results = []
+		self.finished = {}
+		self.load()
+
+	def load(self):
+		if not os.path.exists(self.path):
+			return
+		with open(self.path) as f:
+			for line in f:
+				line = line.strip()
+				if not line:
+					continue
+				try:
+					result = json.loads(line)
+				except ValueError:
+					continue # the last line of an interrupted run may be cut off
+				self.add(result)
+
+	def add(self, result):
+		self.results.append(result)
+		if result.get('key') is not None and self.is_finished(result):
+			self.finished[result['key']] = result
+
+	@staticmethod
+	def is_finished(result):
+		return result.get('returncode') == 0 and not result.get('timed_out') and result.get('turns') is not None
+
+	def __contains__(self, key):
+		return key in self.finished
+
+	def append(self, result):
+		self.add(result)
+		with open(self.path, 'a') as f:
+			f.write(json.dumps(result) + '\n')
+
+	# the finished results of a pair of algo versions, in any seat
+	def pairing_results(self, hash_a, hash_b):
+		return [result for result in self.finished.values() if {result.get('hash1'), result.get('hash2')} == {hash_a, hash_b}]
+
+def parse_args():
+	ap = argparse.ArgumentParser(add_help=False, formatter_class=argparse.RawTextHelpFormatter)
+	ap.add_argument('-h', '--help', action='help', help='show this help message and exit\n\n')
+	ap.add_argument('ledger', help='the json lines file written by run_arena.py\n\n')
+	return vars(ap.parse_args())
+
+if __name__ == '__main__':
+	args = parse_args()
+	ledger = Ledger(args['ledger'])
+	print('{} results, {} finished matches'.format(len(ledger.results), len(ledger.finished)))
+	for key, result in sorted(ledger.finished.items()):
+		print('{: <34}{} ({}) vs {} ({})   winner: {}'.format(key, result['algo1'], result['hash1'], result['algo2'], result['hash2'], result.get('winner')))
@@ -0,0 +1,132 @@
+#!/usr/bin/env python
+
+'''
+------------------------------------------------------------------------------------------------
+Short Description:
+Statistics used by run_arena.py to decide when the outcome of a pairing is settled.
+------------------------------------------------------------------------------------------------
+
+README:
+
+You do not need to run this file, run_arena.py uses it.
+
+Each pairing is tested with a sequential probability ratio test (SPRT). The hypotheses are that
+algo A wins a game with probability 0.5 + delta (A is better) or 0.5 - delta (B is better). A tie
+counts as half a win for each. After every game the log likelihood ratio of the score is compared
+with bounds derived from alpha and beta, the accepted error rates. As soon as it leaves them, the
+pairing is decided and needs no more games.
+'''
+
+import math
+
+# a pairing of two algo versions and the score of the games played between them so far
+class Pairing:
+	def __init__(self, algo_a, algo_b, hash_a, hash_b):
+		self.algo_a = algo_a
+		self.algo_b = algo_b
+		self.hash_a = hash_a
+		self.hash_b = hash_b
+		self.score = 0.0 # points of algo A, 1 per win and 0.5 per tie
+		self.games = 0
+		self.scheduled = 0
+		self.in_flight = 0
+		self.decision = None
+
+	# winner is the hash of the algo that won, None for a tie
+	def add_result(self, winner):
+		self.games += 1
+		if winner == self.hash_a:
+			self.score += 1
+		elif winner is None:
+			self.score += 0.5
+
+	def __str__(self):
+		return '{} vs {}: {:g}-{:g} after {} games'.format(self.algo_a, self.algo_b, self.score, self.games - self.score, self.games)
+
+class SPRT:
+	def __init__(self, delta=0.1, alpha=0.05, beta=0.05):
+		self.p0 = 0.5 - delta
+		self.p1 = 0.5 + delta
+		self.lower = math.log(beta / (1 - alpha))
+		self.upper = math.log((1 - beta) / alpha)
+
+	# log likelihood ratio of A being better against B being better
+	def llr(self, score, games):
+		return score * math.log(self.p1 / self.p0) + (games - score) * math.log((1 - self.p1) / (1 - self.p0))
+
+	# 'A' or 'B' once the better algo is settled, None while it is not
+	def decide(self, score, games):
+		llr = self.llr(score, games)
+		if llr >= self.upper:
+			return 'A'
+		if llr <= self.lower:
+			return 'B'
+		return None
+
+	# how far a pairing is from being decided, 1 at the start and 0 at a bound
+	def uncertainty(self, score, games):
+		llr = self.llr(score, games)
+		bound = self.upper if llr >= 0 else -self.lower
+		return max(0.0, 1 - abs(llr) / bound)
+
+# Glicko ratings of algo versions, updated after every game.
+# Every algo starts at 1500 with a deviation of 350, the deviation is the uncertainty of the rating
+# and shrinks as the algo plays. Games are used as they come, one game per rating period.
+class Ratings:
+	Q = math.log(10) / 400
+
+	def __init__(self, initial=1500.0, deviation=350.0, min_deviation=30.0):
+		self.initial = initial
+		self.deviation = deviation
+		self.min_deviation = min_deviation
+		self.players = {}
+		self.games = {}
+
+	def get(self, player):
+		if player not in self.players:
+			self.players[player] = [self.initial, self.deviation]
+			self.games[player] = 0
+		return self.players[player]
+
+	@classmethod
+	def g(cls, deviation):
+		return 1 / math.sqrt(1 + 3 * (cls.Q * deviation) ** 2 / math.pi ** 2)
+
+	# the expected score of a against b
+	def expected(self, a, b):
+		rating_a, deviation_a = self.get(a)
+		rating_b, deviation_b = self.get(b)
+		return 1 / (1 + 10 ** (-self.g(math.hypot(deviation_a, deviation_b)) * (rating_a - rating_b) / 400))
+
+	# score_a is 1 if a won, 0 if b won and 0.5 for a tie
+	def add_game(self, a, b, score_a):
+		rating_a, deviation_a = self.get(a)
+		rating_b, deviation_b = self.get(b)
+		self.players[a] = self.__update(rating_a, deviation_a, rating_b, deviation_b, score_a)
+		self.players[b] = self.__update(rating_b, deviation_b, rating_a, deviation_a, 1 - score_a)
+		self.games[a] += 1
+		self.games[b] += 1
+
+	def __update(self, rating, deviation, rating_opponent, deviation_opponent, score):
+		g = self.g(deviation_opponent)
+		expected = 1 / (1 + 10 ** (-g * (rating - rating_opponent) / 400))
+		d_inverse = self.Q ** 2 * g ** 2 * expected * (1 - expected)
+		precision = 1 / deviation ** 2 + d_inverse
+		rating += self.Q / precision * g * (score - expected)
+		return [rating, max(self.min_deviation, math.sqrt(1 / precision))]
+
+	# the expected reduction of the rating variance of both algos from one more game between them.
+	# It is highest for uncertain algos with close ratings, a decided mismatch teaches little.
+	def information(self, a, b):
+		_, deviation_a = self.get(a)
+		_, deviation_b = self.get(b)
+		expected = self.expected(a, b)
+		gain = 0.0
+		for deviation, deviation_opponent in ((deviation_a, deviation_b), (deviation_b, deviation_a)):
+			d_inverse = self.Q ** 2 * self.g(deviation_opponent) ** 2 * expected * (1 - expected)
+			gain += deviation ** 2 - 1 / (1 / deviation ** 2 + d_inverse)
+		return gain
+
+	# (player, rating, deviation, games) from the best rating down
+	def ranking(self):
+		return sorted([(player, rating, deviation, self.games[player]) for player, (rating, deviation) in self.players.items()], key=lambda e: -e[1])
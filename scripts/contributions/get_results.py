@@ -117,6 +117,37 @@ would show 2 graphs. The first would show health and the second would plot bits
 
 (I recommend just trying a bunch of combinations with ':' to get familiar with this).
 
+----------------------------------------------------------------------------------------
+-t: Only look at some turns
+
+You can restrict the averages and graphs to a range of turns, for example turns 5 to 20:
+>py scripts/contributions/get_results.py -avg health -t 5 20
+
+Frames of other turns are skipped without decoding them. Wins are always decided by the end of the game.
+
+----------------------------------------------------------------------------------------
+-j: Read replays in parallel
+
+Reading hundreds of replays takes a while. With -j they are read by a number of processes at once,
+all cores if no number is given:
+>py scripts/contributions/get_results.py -a -j
+>py scripts/contributions/get_results.py -a -j 4
+
+The workers only parse the files, their results are added up in the order of the files so the output
+is the same as without -j. How many replays were read per second is printed when reading more than one.
+
+----------------------------------------------------------------------------------------
+-s: Read from a replay store (requires numpy)
+
+Reading many replays is slow, every frame of every file is decoded again on each run. With -s the
+replays are converted once into a store of numpy arrays (see replay_store.py) and read from there:
+>py scripts/contributions/get_results.py -a -s
+
+Replays missing from the store, or changed since they were added, are converted first. The store is in
+replays/store unless you give another directory (>py scripts/contributions/get_results.py -a -s my_store).
+Summaries over many replays only read the manifest of the store, the arrays are only loaded for the
+replays that are shown one by one.
+
 ----------------------------------------------------------------------------------------
 
 All of the commands above can be combined in any order. For example, if I wanted to run the
@@ -174,11 +205,41 @@ try:
 	import json
 	import glob
 	import math
+	import time
 	import argparse
+	import concurrent.futures
+	from arena_stats import Ratings
 except ImportError as e:
 	sys.stderr.write("WARNING: Module not found, full error:\n\n")
 	sys.stderr.write(e)
 
+# gamelib of upton-algo, get_results also works without it
+try:
+	import _upton_path
+	from gamelib.frames import parse_turn_info
+except ImportError:
+	# the same turnInfo, only slower since the whole line is decoded
+	def parse_turn_info(line):
+		try:
+			return json.loads(line).get('turnInfo')
+		except ValueError:
+			return None
+
+# the replay store decodes events with gamelib, without it -s is not available
+try:
+	from replay_store import ReplayStore, DEFAULT_STORE
+	store_error = None
+except ImportError as e:
+	ReplayStore = None
+	DEFAULT_STORE = os.path.join(os.path.dirname(os.path.realpath(__file__)), '..', '..', 'replays', 'store')
+	store_error = e
+
+# only needed to read from a replay store
+try:
+	import numpy as np
+except ImportError:
+	np = None
+
 try:
 	import matplotlib.pyplot as plt
 	plt_installed = True
@@ -231,6 +292,26 @@ def parse_args():
 		nargs="*",
 		default=[],
 		help="specify what data you would like to be graphed - you must have matplotlib installed\n\nValid Options For Single Game:\n\t- health\n\t- bits\n\t- cores\n\t- cores_spent\n\t- bits_spent\n\t- cores_on_board\n\nValid Options For Multiple Games:\n\t- wins\n\n")
+	ap.add_argument(
+		"-s", "--store",
+		nargs="?",
+		const=DEFAULT_STORE,
+		default=None,
+		help="read the replays from a replay_store.py store (default replays/store), adding missing ones first - requires numpy\n\n")
+	ap.add_argument(
+		"-t", "--turns",
+		nargs=2,
+		type=int,
+		default=None,
+		metavar=('FIRST', 'LAST'),
+		help="only read the data of the turns from FIRST to LAST for averages and graphs, wins always use the end of the game\n\n")
+	ap.add_argument(
+		"-j", "--jobs",
+		nargs="?",
+		type=int,
+		const=os.cpu_count(),
+		default=1,
+		help="number of processes reading replay files in parallel, all cores if no number is given\n\n")
 	return vars(ap.parse_args())
 
 
@@ -381,15 +462,8 @@ class Algo:
 			self.replays[replay][turn][arg] = data
 
 
-	def recored_final_data(self, replay, other):
-		self_hp = list(self.replays[replay].items())[-1][1]['health']
-		other_hp = list(other.replays[replay].items())[-1][1]['health']
-
-		if self_hp > other_hp:
-			self.wins += 1
-
 	def add_end_stats(self, replay, endStats):
-		self.replays[replay]['endStats'] = endStats;
+		self.replays.setdefault(replay, {})['endStats'] = endStats
 
 	def print_block(self, header, data):
 		hLen = 7
@@ -440,16 +514,94 @@ class Algo:
 		return disp
 
 
+# yields (turn, frame, data) for every frame of a replay file, decoding one line at a time.
+# With turns (a container of turn numbers) the json of frames of other turns is not decoded, except for the frame with the endStats
+def read_replay(fname, turns=None):
+	with open(fname) as f:
+		for line in f:
+			line = line.strip()
+			if line == '':
+				continue
+			if turns is not None and '"endStats"' not in line:
+				turn_info = parse_turn_info(line)
+				if turn_info is not None and turn_info[1] not in turns:
+					continue
+
+			data = json.loads(line)
+			if 'debug' in data:
+				continue
+			yield data['turnInfo'][1], data['turnInfo'][2], data
+
+# structure points of the structures of one player on the board
+def get_cores_on_board(units):
+	return len(units[0]) + len(units[1]) * 4 + len(units[2]) * 3
+
+# structure and mobile points spent on the spawns of one player
+def get_spent(spawn, p_index):
+	cores = bits = 0
+	for _, unit_type, _, player in spawn:
+		if player != p_index:
+			continue
+		if unit_type < 3:
+			cores += (1, 4, 3)[unit_type]
+		elif unit_type < 6:
+			bits += (1, 3, 1)[unit_type - 3]
+	return cores, bits
+
+# Keeps the per turn data of both players while the frames of a replay stream by, as Algo.add_data would store it.
+# Later frames of a turn overwrite earlier ones, so its size depends on the number of turns and not on the number of frames.
+class TurnAggregator:
+	CUMULATIVE = ('cores_spent', 'bits_spent')
+
+	def __init__(self):
+		self.turns = ({}, {})			# per player, dicts with keys of turn and values of a dict of data
+		self.end_stats = None
+		self.final_health = (0.0, 0.0)
+
+	def add_frame(self, t, f, data, keep=True):
+		self.final_health = (data['p1Stats'][0], data['p2Stats'][0])
+		if 'endStats' in data:
+			self.end_stats = data['endStats']
+		if not keep:
+			return
+
+		for p_index in (1, 2):
+			stats = data['p{}Stats'.format(p_index)]
+			turn = self.turns[p_index - 1].setdefault(t, {})
+			turn['health'] = stats[0]
+			turn['cores'] = stats[1]
+			turn['bits'] = stats[2]
+			turn['cores_on_board'] = get_cores_on_board(data['p{}Units'.format(p_index)])
+			if f == 0:
+				turn['cores_spent'], turn['bits_spent'] = get_spent(data['events']['spawn'], p_index)
+
+	# adds the data of player p_index to an algo
+	def apply(self, algo, p_index, fname):
+		for t, turn in self.turns[p_index - 1].items():
+			for arg, data in turn.items():
+				algo.add_data(fname, t, arg, data, arg in self.CUMULATIVE)
+
+# streams the frames of a replay file into a TurnAggregator, no frame is kept after it was added.
+# This is all a worker process does with a replay when they are read in parallel.
+def aggregate_replay(fname, turns=None):
+	aggregator = TurnAggregator()
+	for t, f, data in read_replay(fname, turns):
+		aggregator.add_frame(t, f, data, turns is None or t in turns)
+	return aggregator
+
 # Stores data from a single replay and creates the Algo classes
 class Replay:
-	def __init__(self, f_name, algos):
+	def __init__(self, f_name, algos, stored=None, details=True, turns=None, aggregator=None):
 		self.fname = f_name;
-		self.ref = None
-		self.turns = {}
-		self.valid_turns = []
+		self.stored = stored			# the StoredReplay when read from a replay store
+		self.aggregator = aggregator	# the TurnAggregator when read from the replay file, given if it was read by a worker process
 
-		self.load_data()				# handles loading all the data from file into python variables
-		self.unpack_data(algos)		# stores relevant data after it has been loaded
+		if stored is None:
+			if aggregator is None:
+				self.load_data(turns)		# handles loading all the data from file into python variables
+			self.unpack_data(algos)		# stores relevant data after it has been loaded
+		else:
+			self.unpack_stored(algos, details, turns)	# the per turn data is only read from the store if details are needed
 
 	def __eq__(self, other):
 		return self.fname == other.fname
@@ -460,85 +612,77 @@ class Replay:
 	def __repr__(self):
 		return self.__string()
 
-	def load_data(self):
-		with open(self.fname) as f:
-			for line in f:
-				line = line.replace("\n", "")
-				line = line.replace("\t", "")
-
-				if (line != ''):
-					data = json.loads(line)
-
-					try:
-						data['debug']
-						self.ref = data
-					except:
-						turn_num = data['turnInfo'][1]
-						frame_num = data['turnInfo'][2]
-						self.turns[(turn_num, frame_num)] = data
-						if (turn_num, frame_num) not in self.valid_turns:
-							self.valid_turns.append((turn_num, frame_num))
-
-	def get_cores_on_board(self, filters, encryptors, destructors):
-		return len(filters) + len(encryptors) * 4 + len(destructors) * 3
-
-	def get_bits_spent(self, algo, spawn):
-		p_index = 1 if algo == self.algo1 else 2
-		pings = [x for x in spawn if x[3] == p_index and x[1] == 3]
-		emps = [x for x in spawn if x[3] == p_index and x[1] == 4]
-		scramblers = [x for x in spawn if x[3] == p_index and x[1] == 5]
-		return len(pings) + len(emps) * 3 + len(scramblers)
-
-	def get_cores_spent(self, algo, spawn):
-		p_index = 1 if algo == self.algo1 else 2
-		filters = [x for x in spawn if x[3] == p_index and x[1] == 0]
-		encryptors = [x for x in spawn if x[3] == p_index and x[1] == 1]
-		destructors = [x for x in spawn if x[3] == p_index and x[1] == 2]
-		return len(filters) + len(encryptors) * 4 + len(destructors) * 3
-
-	def add_data_to_algo(self, algo, t, f, stats, units, spawn):
-		algo.add_data(self.fname, t, 'health', stats[0])
-		algo.add_data(self.fname, t, 'cores', stats[1])
-		algo.add_data(self.fname, t, 'bits', stats[2])
-
-		filters, encryptors, destructors, pings, emps, scramblers, removes = units
-
-		algo.add_data(self.fname, t, 'cores_on_board', self.get_cores_on_board(filters, encryptors, destructors))
-
-		if f == 0:
-			algo.add_data(self.fname, t, 'cores_spent', self.get_cores_spent(algo, spawn), True)
-			algo.add_data(self.fname, t, 'bits_spent', self.get_bits_spent(algo, spawn), True)
+	def load_data(self, turns=None):
+		self.aggregator = aggregate_replay(self.fname, turns)
 
 	def unpack_data(self, algos):
 		try:
 			self.algo1, self.algo2 = self.create_algos(algos)
 
-			for t, f in self.get_valid_turns():
-				turn = self.get_turn(t, f)
-
-				turn_info = turn['turnInfo']
-				events = turn['events']
-				spawn = events['spawn']
-
-				p1_stats = turn['p1Stats']
-				p1_units = turn['p1Units']
+			self.aggregator.apply(self.algo1, 1, self.fname)
+			self.aggregator.apply(self.algo2, 2, self.fname)
 
-				p2_stats = turn['p2Stats']
-				p2_units = turn['p2Units']
+			self.record_wins(*self.aggregator.final_health)
+			self.algo1.add_end_stats(self.fname, self.aggregator.end_stats['player1'])
+			self.algo2.add_end_stats(self.fname, self.aggregator.end_stats['player2'])
+		except Exception as e:
+			sys.stderr.write(str(e))
 
-				self.add_data_to_algo(self.algo1, t, f, p1_stats, p1_units, spawn)
-				self.add_data_to_algo(self.algo2, t, f, p2_stats, p2_units, spawn)
+	# the algo with more health left wins, the same health is a tie
+	def record_wins(self, hp1, hp2):
+		if hp1 > hp2:
+			self.algo1.wins += 1
+		elif hp2 > hp1:
+			self.algo2.wins += 1
 
-			self.algo1.recored_final_data(self.fname, self.algo2)
-			self.algo2.recored_final_data(self.fname, self.algo1)
-			self.algo1.add_end_stats(self.fname, self.turns[self.valid_turns[-1]]['endStats']['player1'])
-			self.algo2.add_end_stats(self.fname, self.turns[self.valid_turns[-1]]['endStats']['player2'])
+	# the same as unpack_data from the columns of a replay store, without details only the end stats and wins are added
+	def unpack_stored(self, algos, details, turns=None):
+		try:
+			self.algo1, self.algo2 = self.create_algos(algos)
+			end_stats = self.get_end_stats()
+
+			if details:
+				stored = self.stored
+				for algo, player in ((self.algo1, 1), (self.algo2, 2)):
+					stats = stored.stats(player)
+					counts = stored.unit_counts(player)
+					on_board = counts[:, 0] + counts[:, 1] * 4 + counts[:, 2] * 3
+
+					# the spawns of the first action frame of each turn, as in get_spent
+					spawn = stored.events('spawn', player)
+					first = stored['frame'][spawn['frame']] == 0
+					cost = np.array([1, 4, 3, 1, 3, 1, 0, 0])[spawn['unit_type'][first]]
+					is_core = spawn['unit_type'][first] < 3
+					cores_spent = np.bincount(spawn['frame'][first][is_core], weights=cost[is_core], minlength=len(stored))
+					bits_spent = np.bincount(spawn['frame'][first][~is_core], weights=cost[~is_core], minlength=len(stored))
+
+					for i, (t, f) in enumerate(zip(stored['turn'].tolist(), stored['frame'].tolist())):
+						if turns is not None and t not in turns:
+							continue
+						algo.add_data(self.fname, t, 'health', float(stats[i, 0]))
+						algo.add_data(self.fname, t, 'cores', float(stats[i, 1]))
+						algo.add_data(self.fname, t, 'bits', float(stats[i, 2]))
+						algo.add_data(self.fname, t, 'cores_on_board', int(on_board[i]))
+						if f == 0:
+							algo.add_data(self.fname, t, 'cores_spent', int(cores_spent[i]), True)
+							algo.add_data(self.fname, t, 'bits_spent', int(bits_spent[i]), True)
+
+
+			self.record_wins(*self.stored.entry['health'])
+			self.algo1.add_end_stats(self.fname, end_stats['player1'])
+			self.algo2.add_end_stats(self.fname, end_stats['player2'])
 		except Exception as e:
 			sys.stderr.write(str(e))
 
+	# the endStats of the last frame, None if the game did not finish
+	def get_end_stats(self):
+		if self.stored is not None:
+			return self.stored.entry['end_stats']
+		return self.aggregator.end_stats
+
 	# only creates a new algo class if that algo does not already exist. Otherwise data is added to the existing one
 	def create_algos(self, algos):
-		end_stats = self.turns[self.valid_turns[-1]]['endStats']
+		end_stats = self.get_end_stats()
 		p1_algo = end_stats['player1']['name']
 		p2_algo = end_stats['player2']['name']
 
@@ -559,12 +703,12 @@ class Replay:
 	def get_algos(self):
 		return [self.algo1, self.algo2]
 
-	def get_valid_turns(self):
-		return self.valid_turns
-	def get_turns(self):
-		return self.turns
-	def get_turn(self, turn, frame=-1):
-		return self.turns[(turn, frame)]
+	# 1 or 2 for the player that won, 0 for a tie and None if the game did not finish
+	def get_winner(self):
+		end_stats = self.get_end_stats()
+		if end_stats is None:
+			return None
+		return end_stats.get('winner')
 
 # handles opening multiple games (replays)
 class FileHandler:
@@ -574,12 +718,27 @@ class FileHandler:
 
 	def get_algo_win_summary(self):
 		fill_len = len(max(self.algos, key=lambda e:len(e.name)).name) + 9
+		ratings = self.get_ratings()
 		rtn = 'Wins by algo:\n|\n'
 		for algo in sorted(self.algos, key=lambda e:-1*e.wins):
-			rtn += '|{: >{fill}} : {}\n'.format(algo.name, algo.wins, fill=fill_len)
+			rating, deviation = ratings.get(algo.name)
+			rtn += '|{: >{fill}} : {: <6} rating: {:.0f} +- {:.0f}\n'.format(algo.name, algo.wins, rating, 2 * deviation, fill=fill_len)
 
 		return rtn
 
+	# Glicko ratings of the algos (see arena_stats.py), the games are rated from the oldest replay on
+	def get_ratings(self):
+		ratings = Ratings()
+		for replay in sorted(self.replays, key=lambda e:os.path.getmtime(e.fname)):
+			try:
+				algo1, algo2 = replay.get_algos()
+			except AttributeError:
+				continue # the replay could not be parsed
+			winner = replay.get_winner()
+			if winner is not None:
+				ratings.add_game(algo1.name, algo2.name, {1: 1.0, 2: 0.0}.get(winner, 0.5))
+		return ratings
+
 	def get_replays(self):
 		return self.replays
 
@@ -600,16 +759,26 @@ class FileHandler:
 			return files
 		return files[:num]
 
-	def load_files(self, num=1, a=False, f_names=[]):
+	def load_files(self, num=1, a=False, f_names=[], store=None, details=True, turns=None, jobs=1):
 		if len(f_names) > 0:
+			f_names = [f_name if f_name.find('replays') != -1 else 'replays/'+f_name for f_name in f_names]
+		else:
+			f_names = self.__latest_replays(num, a)
+
+		if store is None and jobs > 1 and len(f_names) > 1:
+			# the workers only parse, the aggregates are added to the algos here in the order of the files, the same as without workers
+			with concurrent.futures.ProcessPoolExecutor(max_workers=jobs) as pool:
+				chunksize = max(1, len(f_names) // (jobs * 4))
+				for f_name, aggregator in zip(f_names, pool.map(aggregate_replay, f_names, [turns] * len(f_names), chunksize=chunksize)):
+					self.replays.append(Replay(f_name, self.algos, aggregator=aggregator))
+		elif store is None:
 			for f_name in f_names:
-				if f_name.find('replays') == -1:
-					self.replays.append(Replay('replays/'+f_name, self.algos))
-				else:
-					self.replays.append(Replay(f_name, self.algos))
+				self.replays.append(Replay(f_name, self.algos, turns=turns))
 		else:
-			for f_name in self.__latest_replays(num, a):
-				self.replays.append(Replay(f_name, self.algos))
+			store.ingest(f_names)
+			for f_name in f_names:
+				if f_name in store:
+					self.replays.append(Replay(f_name, self.algos, store.get(f_name), details, turns))
 
 	def add_plot(self, lbl):
 		if lbl == 'wins':
@@ -710,8 +879,20 @@ def get_graph_options(options):
 def main(args):
 	verbose_options, summary_options = get_graph_options(args['graph'])
 
+	# details of every turn are only needed when printing single replays
+	details = args['verbose'] or (not args['all'] and int(args['num']) == 1)
+	if args['store'] is not None and ReplayStore is None:
+		sys.stderr.write("The replay store is not available: {}\n".format(store_error))
+		sys.exit(1)
+	store = ReplayStore(args['store']) if args['store'] is not None else None
+	turns = range(args['turns'][0], args['turns'][1] + 1) if args['turns'] is not None else None
+
+	start_time = time.time()
 	fh = FileHandler()
-	fh.load_files(int(args['num']), args['all'], args['file']) #loads the files - all JSON reading is here
+	fh.load_files(int(args['num']), args['all'], args['file'], store, details, turns, args['jobs']) #loads the files - all JSON reading is here
+	load_time = time.time() - start_time
+	if len(fh.get_replays()) > 1:
+		sys.stderr.write('Read {} replays in {:.2f}s ({:.1f} replays/sec)\n\n'.format(len(fh.get_replays()), load_time, len(fh.get_replays()) / max(load_time, 1e-6)))
 
 	# check to see if matplotlib is installed
 	graphing_enabled = True if len(verbose_options) > 0 or len(summary_options) > 0 else False
@@ -0,0 +1,155 @@
+#!/usr/bin/env python
+
+'''
+------------------------------------------------------------------------------------------------
+Short Description:
+Random access into .replay files. One scan of a replay writes a sidecar index with the byte
+offset of every frame, after which any frame can be decoded on its own without reading the
+frames before it.
+------------------------------------------------------------------------------------------------
+
+README:
+
+You do not need to run this file, watch_replay.py uses it. To index replays ahead of time and
+print what they contain:
+>py scripts/contributions/replay_index.py replays/[REPLAY_FILE].replay
+
+The index is stored next to the replay as [REPLAY_FILE].replay.idx, a json file with a row of
+[turn, frame, byte offset, byte length, player 1 health, player 2 health] per frame. The health of
+both players is read while indexing, so a health graph needs no frame to be decoded. The index is
+built again if the size or modification time of the replay changed. If it cannot be written, it
+is kept in memory only.
+
+IndexedReplay maps the replay into memory and decodes a frame when it is asked for:
+	replay = IndexedReplay('replays/[REPLAY_FILE].replay')
+	frame = replay[(80, -1)]		# the decoded json of turn 80, frame -1
+'''
+
+try:
+	import os
+	import re
+	import sys
+	import json
+	import mmap
+	import argparse
+except ImportError as e:
+	sys.stderr.write("WARNING: Module not found, full error:\n\n")
+	sys.stderr.write(e)
+
+# gamelib of upton-algo, see _upton_path.py
+import _upton_path
+from gamelib.frames import parse_turn_info
+
+# bump when the layout of the index changes
+INDEX_VERSION = 1
+
+HEALTH = [re.compile(r'"p{}Stats"\s*:\s*\[\s*(-?[0-9.eE+-]+)'.format(player)) for player in (1, 2)]
+
+def index_path(fname):
+	return fname + '.idx'
+
+# scans a replay once, returns the rows of its index and the row of the frame with the endStats (None if the game did not finish)
+def scan(fname):
+	rows = []
+	end = None
+	offset = 0
+	with open(fname, 'rb') as f:
+		for raw in f:
+			line = raw.decode()
+			turn_info = parse_turn_info(line)
+			if turn_info is not None:
+				healths = [HEALTH[i].search(line) for i in (0, 1)]
+				healths = [float(match.group(1)) if match is not None else 0.0 for match in healths]
+				if '"endStats"' in line:
+					end = len(rows)
+				rows.append([turn_info[1], turn_info[2], offset, len(raw)] + healths)
+			offset += len(raw)
+	return rows, end
+
+class IndexedReplay:
+	def __init__(self, fname):
+		self.fname = fname
+		self.rows = []					# [turn, frame, offset, length, health 1, health 2] of every frame in file order
+		self.end = None					# the row with the endStats
+		self.__load()
+
+		self.keys = {(row[0], row[1]): i for i, row in enumerate(self.rows)}
+		self.frames_in_turn = {}
+		for row in self.rows:
+			self.frames_in_turn[row[0]] = self.frames_in_turn.get(row[0], 0) + 1
+
+		self.file = open(fname, 'rb')
+		self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ) if os.path.getsize(fname) > 0 else None
+		self.__last = (None, None)		# the last frame decoded, viewers ask for the same frame a few times in a row
+
+	# reads the index of the replay, building it if it is missing or outdated
+	def __load(self):
+		stat = os.stat(self.fname)
+		try:
+			with open(index_path(self.fname)) as f:
+				index = json.load(f)
+			if index['version'] == INDEX_VERSION and index['size'] == stat.st_size and index['mtime'] == stat.st_mtime:
+				self.rows, self.end = index['frames'], index['end']
+				return
+		except (OSError, ValueError, KeyError):
+			pass
+
+		self.rows, self.end = scan(self.fname)
+		try:
+			with open(index_path(self.fname) + '.tmp', 'w') as f:
+				json.dump({'version': INDEX_VERSION, 'size': stat.st_size, 'mtime': stat.st_mtime, 'end': self.end, 'frames': self.rows}, f)
+			os.replace(index_path(self.fname) + '.tmp', index_path(self.fname))
+		except OSError:
+			pass
+
+	def close(self):
+		if self.map is not None:
+			self.map.close()
+		self.file.close()
+
+	def __len__(self):
+		return len(self.rows)
+
+	def __contains__(self, key):
+		return key in self.keys
+
+	def __iter__(self):
+		return iter(self.keys)
+
+	# the decoded json of a frame by (turn, frame)
+	def __getitem__(self, key):
+		return self.frame(self.keys[key])
+
+	# the decoded json of a frame by its row in the index
+	def frame(self, i):
+		if self.__last[0] != i:
+			_, _, offset, length = self.rows[i][:4]
+			self.__last = (i, json.loads(self.map[offset:offset + length].decode()))
+		return self.__last[1]
+
+	def get_turn(self, turn, frame=-1):
+		return self[(turn, frame)]
+
+	# the health of player 1 and player 2 in every frame
+	def healths(self):
+		return [row[4] for row in self.rows], [row[5] for row in self.rows]
+
+	def end_stats(self):
+		if self.end is None:
+			return None
+		return self.frame(self.end)['endStats']
+
+def parse_args():
+	ap = argparse.ArgumentParser(add_help=False, formatter_class=argparse.RawTextHelpFormatter)
+	ap.add_argument('-h', '--help', action='help', help='show this help message and exit\n\n')
+	ap.add_argument('file', nargs='+', help='the replay files to index\n\n')
+	return vars(ap.parse_args())
+
+if __name__ == '__main__':
+	args = parse_args()
+	for fname in args['file']:
+		replay = IndexedReplay(fname)
+		end_stats = replay.end_stats()
+		result = 'winner: player {}'.format(end_stats['winner']) if end_stats is not None else 'not finished'
+		print('{}: {} frames, {} turns, {}'.format(fname, len(replay), len(replay.frames_in_turn), result))
+		replay.close()
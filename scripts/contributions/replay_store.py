@@ -0,0 +1,330 @@
+#!/usr/bin/env python
+
+'''
+------------------------------------------------------------------------------------------------
+Short Description:
+This is a python script to convert .replay files once into a columnar store of numpy arrays, so
+scripts that look at many games do not have to decode the json of every frame on every run.
+------------------------------------------------------------------------------------------------
+
+README:
+
+This program assumes this file is in the contributions/scripts directory and requires numpy.
+
+By default, it adds the latest replay in the /replays/ directory to the store in /replays/store/:
+>py scripts/contributions/replay_store.py
+
+You can choose the replays the same way as with get_results.py:
+>py scripts/contributions/replay_store.py -a
+>py scripts/contributions/replay_store.py -n 20
+>py scripts/contributions/replay_store.py -f [REPLAY_FILE].replay [REPLAY_FILE].replay
+
+and store them somewhere else with -o:
+>py scripts/contributions/replay_store.py -a -o my_store
+
+get_results.py (-s [STORE_DIR]) and watch_replay.py (-st [STORE_DIR]) read from the store, adding the
+replays they are asked for first if they are missing or changed.
+
+The store is a directory with one compressed .npz file per replay and a manifest.json. The
+manifest holds what summaries over many games need, the names of both algos, the winner, their
+final health and their end stats, keyed by the path of the replay. A replay is only converted
+again if its size or modification time changed, or if it was converted by an older version of
+this script. The store works as a cache: when its files grow past a size limit (1024 MB unless
+you change it with -m [MB]) the replays that were used least recently are removed from it.
+Each .npz file holds the columns:
+	- frames: turn, frame, state type and the stats of both players, one row per frame
+	- units: frame row, player, unit type, x, y, health and unit id, one row per unit per frame.
+	  unit_offsets[i]:unit_offsets[i+1] are the units of frame i
+	- events: for every event type (see gamelib/frames.py) its frame row, location, target,
+	  value, unit type, unit id and player, one row per event
+'''
+
+try:
+	import os
+	import sys
+	import json
+	import glob
+	import time
+	import hashlib
+	import argparse
+except ImportError as e:
+	sys.stderr.write("WARNING: Module not found, full error:\n\n")
+	sys.stderr.write(e)
+
+try:
+	import numpy as np
+except ImportError:
+	np = None
+
+# gamelib of upton-algo, see _upton_path.py
+import _upton_path
+from gamelib.frames import EVENT_TYPES
+from gamelib.events import decode_event
+
+REPLAY_DIR = os.path.join(os.path.dirname(os.path.realpath(__file__)), '..', '..', 'replays')
+DEFAULT_STORE = os.path.join(REPLAY_DIR, 'store')
+
+# bump when the layout of the .npz files changes, stored replays of other versions are converted again
+STORE_VERSION = 1
+
+# the default limit of the total size of the .npz files, in MB
+DEFAULT_MAX_SIZE = 1024
+
+# the unit lists of a frame in a replay: 6 unit types, removals and upgrades
+UNIT_TYPES = 8
+
+UNIT_COLUMNS = ('frame', 'player', 'type', 'x', 'y', 'hp', 'id')
+EVENT_COLUMNS = ('frame', 'x', 'y', 'target_x', 'target_y', 'value', 'unit_type', 'unit_id', 'player')
+
+def require_numpy():
+	if np is None:
+		sys.stderr.write('numpy is required for the replay store: pip3 install numpy\n')
+		sys.exit(1)
+
+# unit ids are strings of numbers in replays, -1 if missing
+def unit_id(value):
+	try:
+		return int(value)
+	except (TypeError, ValueError):
+		return -1
+
+# reads a .replay file into the columns of the store and the summary kept in the manifest
+def convert(fname):
+	frames = []
+	units = []
+	events = {event_type: [] for event_type in EVENT_TYPES}
+	end_stats = None
+	with open(fname) as f:
+		for line in f:
+			line = line.strip()
+			if not line:
+				continue
+			data = json.loads(line)
+			if 'debug' in data:
+				continue
+
+			row = len(frames)
+			frames.append([data['turnInfo'][1], data['turnInfo'][2], data['turnInfo'][0]] + list(data['p1Stats'][:4]) + list(data['p2Stats'][:4]))
+			for player in (1, 2):
+				for unit_type, typed_units in enumerate(data['p{}Units'.format(player)]):
+					for unit in typed_units:
+						units.append((row, player, unit_type, unit[0], unit[1], unit[2], unit_id(unit[3] if len(unit) > 3 else None)))
+			for event_type, typed_events in data.get('events', {}).items():
+				if event_type not in events:
+					continue
+				for event in typed_events:
+					x, y, target_x, target_y, value, type_index, id_, _, player = decode_event(event_type, event)
+					events[event_type].append((row, x, y, target_x, target_y, value, type_index, unit_id(id_), player))
+			if 'endStats' in data:
+				end_stats = data['endStats']
+
+	frames = np.array(frames, dtype=np.float64).reshape(-1, 11)
+	units = np.array(units, dtype=np.float64).reshape(-1, len(UNIT_COLUMNS))
+	arrays = {
+		'turn': frames[:, 0].astype(np.int16),
+		'frame': frames[:, 1].astype(np.int16),
+		'state_type': frames[:, 2].astype(np.int8),
+		'p1_stats': frames[:, 3:7],
+		'p2_stats': frames[:, 7:11],
+		'unit_offsets': np.searchsorted(units[:, 0], np.arange(len(frames) + 1)).astype(np.int32),
+	}
+	for i, column in enumerate(UNIT_COLUMNS):
+		arrays['unit_' + column] = units[:, i].astype(np.float32 if column == 'hp' else np.int32 if column in ('frame', 'id') else np.int8)
+	for event_type, rows in events.items():
+		rows = np.array(rows, dtype=np.float64).reshape(-1, len(EVENT_COLUMNS))
+		for i, column in enumerate(EVENT_COLUMNS):
+			arrays['{}_{}'.format(event_type, column)] = rows[:, i].astype(np.float32 if column == 'value' else np.int32 if column in ('frame', 'unit_id') else np.int8)
+
+	summary = {'frames': len(frames), 'turns': int(arrays['turn'].max()) + 1 if len(frames) else 0, 'end_stats': end_stats}
+	if end_stats is not None:
+		summary['player1'] = end_stats['player1']['name']
+		summary['player2'] = end_stats['player2']['name']
+		summary['winner'] = end_stats.get('winner')
+	if len(frames):
+		summary['health'] = [float(frames[-1, 3]), float(frames[-1, 7])]
+	return arrays, summary
+
+# the arrays of one stored replay, loaded when first used
+class StoredReplay:
+	def __init__(self, fname, entry, path):
+		self.fname = fname
+		self.entry = entry
+		self.path = path
+		self.__arrays = None
+
+	def __getitem__(self, key):
+		if self.__arrays is None:
+			with np.load(self.path) as f:
+				self.__arrays = dict(f.items())
+		return self.__arrays[key]
+
+	def __len__(self):
+		return self.entry['frames']
+
+	def stats(self, player):
+		return self['p{}_stats'.format(player)]
+
+	# the number of unit lists per frame, more than UNIT_TYPES if the replay had more
+	def unit_types(self):
+		types = self['unit_type']
+		return max(UNIT_TYPES, int(types.max()) + 1) if len(types) else UNIT_TYPES
+
+	# the units of frame row i as they are in a replay, a list of [x, y, hp, id] per unit type
+	def frame_units(self, i, player, unit_types=None):
+		start, end = self['unit_offsets'][i], self['unit_offsets'][i + 1]
+		rtn = [[] for _ in range(unit_types or self.unit_types())]
+		for p, unit_type, x, y, hp, id_ in zip(self['unit_player'][start:end], self['unit_type'][start:end], self['unit_x'][start:end],
+				self['unit_y'][start:end], self['unit_hp'][start:end], self['unit_id'][start:end]):
+			if p == player:
+				rtn[unit_type].append([int(x), int(y), float(hp), str(id_)])
+		return rtn
+
+	# the number of units of each type per frame row, an array of shape (frames, unit types)
+	def unit_counts(self, player, unit_types=None):
+		counts = np.zeros((len(self), unit_types or self.unit_types()), dtype=np.int32)
+		mask = self['unit_player'] == player
+		np.add.at(counts, (self['unit_frame'][mask], self['unit_type'][mask]), 1)
+		return counts
+
+	# the rows of an event table, a dict of column to array
+	def events(self, event_type, player=None):
+		columns = {column: self['{}_{}'.format(event_type, column)] for column in EVENT_COLUMNS}
+		if player is not None:
+			mask = columns['player'] == player
+			columns = {column: values[mask] for column, values in columns.items()}
+		return columns
+
+# A cache of converted replays. A replay is converted again if its size, modification time or the STORE_VERSION it
+# was converted with changed. Once the .npz files grow past max_size (MB) the least recently used replays are removed.
+class ReplayStore:
+	def __init__(self, directory=DEFAULT_STORE, max_size=None):
+		require_numpy()
+		self.directory = directory
+		self.manifest_path = os.path.join(directory, 'manifest.json')
+		self.replays = {}
+		self.max_size = DEFAULT_MAX_SIZE
+		self.load()
+		if max_size is not None:
+			self.max_size = max_size		# kept in the manifest, so it also applies when other scripts use the store
+
+	def load(self):
+		if not os.path.exists(self.manifest_path):
+			return
+		with open(self.manifest_path) as f:
+			manifest = json.load(f)
+		self.replays = manifest['replays']
+		self.max_size = manifest.get('max_size', DEFAULT_MAX_SIZE)
+		for entry in self.replays.values():
+			entry.setdefault('version', manifest.get('version'))
+
+	def save(self):
+		os.makedirs(self.directory, exist_ok=True)
+		with open(self.manifest_path + '.tmp', 'w') as f:
+			json.dump({'version': STORE_VERSION, 'max_size': self.max_size, 'replays': self.replays}, f)
+		os.replace(self.manifest_path + '.tmp', self.manifest_path)
+
+	@staticmethod
+	def key(fname):
+		return os.path.realpath(fname)
+
+	def is_current(self, fname):
+		entry = self.replays.get(self.key(fname))
+		if entry is None:
+			return False
+		stat = os.stat(fname)
+		return entry['size'] == stat.st_size and entry['mtime'] == stat.st_mtime and entry['version'] == STORE_VERSION \
+			and os.path.exists(os.path.join(self.directory, entry['file']))
+
+	# converts the replays that are not in the store or changed since, returns the number converted.
+	# All of them count as used now, the least recently used others are evicted if the store is too large.
+	def ingest(self, fnames):
+		converted = 0
+		now = time.time()
+		os.makedirs(self.directory, exist_ok=True)
+		for fname in fnames:
+			if self.is_current(fname):
+				self.replays[self.key(fname)]['used'] = now
+				continue
+			stat = os.stat(fname)
+			try:
+				arrays, entry = convert(fname)
+			except (ValueError, KeyError, IndexError) as e:
+				sys.stderr.write('Could not convert {}: {}\n'.format(fname, e))
+				continue
+			# replays of different directories can share a name
+			name = '{}-{}.npz'.format(os.path.splitext(os.path.basename(fname))[0], hashlib.sha1(self.key(fname).encode()).hexdigest()[:8])
+			np.savez_compressed(os.path.join(self.directory, name), **arrays)
+			entry.update({'size': stat.st_size, 'mtime': stat.st_mtime, 'version': STORE_VERSION, 'file': name,
+				'bytes': os.path.getsize(os.path.join(self.directory, name)), 'used': now})
+			self.replays[self.key(fname)] = entry
+			converted += 1
+		self.evict(keep={self.key(fname) for fname in fnames})
+		self.save()
+		return converted
+
+	# the total size of the .npz files in MB
+	def size(self):
+		return sum(entry.get('bytes', 0) for entry in self.replays.values()) / 2 ** 20
+
+	# removes the least recently used replays until the store fits in max_size, except for the ones in keep
+	def evict(self, keep=()):
+		size = self.size()
+		for key, entry in sorted(self.replays.items(), key=lambda e: e[1].get('used', 0)):
+			if size <= self.max_size:
+				break
+			if key in keep:
+				continue
+			try:
+				os.remove(os.path.join(self.directory, entry['file']))
+			except OSError:
+				pass
+			size -= entry.get('bytes', 0) / 2 ** 20
+			del self.replays[key]
+
+	def __contains__(self, fname):
+		return self.key(fname) in self.replays
+
+	def get(self, fname):
+		entry = self.replays[self.key(fname)]
+		return StoredReplay(fname, entry, os.path.join(self.directory, entry['file']))
+
+def latest_replays(num=1, a=False):
+	files = sorted(glob.glob(os.path.join(REPLAY_DIR, '*.replay')), key=os.path.getctime, reverse=True)
+	if a:
+		return files
+	return files[:num]
+
+def parse_args():
+	ap = argparse.ArgumentParser(add_help=False, formatter_class=argparse.RawTextHelpFormatter)
+	ap.add_argument('-h', '--help', action='help', help='show this help message and exit\n\n')
+	ap.add_argument(
+		"-n", "--num",
+		type=int,
+		default=1,
+		help="number of files (in order of date created) to add\n\n")
+	ap.add_argument(
+		"-a", "--all",
+		action='store_true',
+		help="adds every replay file in replay folder\n\n")
+	ap.add_argument(
+		"-f", "--file",
+		nargs="*",
+		default=[],
+		help="specify a replay file (or multiple) you'd like to add\n\n")
+	ap.add_argument(
+		"-o", "--output",
+		default=DEFAULT_STORE,
+		help="the directory of the store, default replays/store\n\n")
+	ap.add_argument(
+		"-m", "--max-size",
+		type=float,
+		default=None,
+		help="the size in MB the store may grow to before the least recently used replays are removed, default {} (kept for later runs)\n\n".format(DEFAULT_MAX_SIZE))
+	return vars(ap.parse_args())
+
+if __name__ == '__main__':
+	args = parse_args()
+	store = ReplayStore(args['output'], args['max_size'])
+	fnames = args['file'] if len(args['file']) > 0 else latest_replays(args['num'], args['all'])
+	converted = store.ingest(fnames)
+	print('Converted {} of {} replays, the store holds {} ({:.1f} of {:g} MB)'.format(converted, len(fnames), len(store.replays), store.size(), store.max_size))
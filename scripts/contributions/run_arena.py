@@ -49,16 +49,38 @@ algo3
 ...
 
 
-Lastly, the final argument you can (and should) in combination with each of these
-is -b, for batch_size. This controls how many games can run at one time to keep
-this from melting your computer. The default is 5.
+Lastly, you can combine each of these with -b, for batch_size. This controls how many games can
+run at one time to keep this from melting your computer. By default it is as many as your cores
+and memory allow (about 2 cores and 1.5GB per game).
 
 For example:
 >py scripts/contributions/run_arena.py -a -b 6
 
 This would run every single game like before, but 6 games at a time.
 
-DO NOT RUN WITH A LARGE BATCH SIZE (like >15, depending on your computer) or else it will take forever and crash.
+A match that takes longer than -t seconds (default 600) is killed along with both algos.
+The result of every match (winner, turns, durations, replay file) is appended as a json line
+to the ledger arena_results.jsonl, or the file given with -o, as soon as the match ends.
+Matches are keyed by the content hashes of both algos, so running the same command again after
+an interruption only plays the matches that are missing. Adding an algo only plays its new
+pairings, and changing the code of one only plays the pairings it is in. See arena_ledger.py.
+
+Use -r to play every pairing several times and --both-seats to also play it with the algos
+swapped between player 1 and player 2:
+>py scripts/contributions/run_arena.py -s algo1 algo2 algo3 -r 3 --both-seats
+
+To find out which of two versions is better without playing a fixed number of games, use
+--sequential. Every pairing is played in alternating seats and a sequential test (SPRT, see
+arena_stats.py) is checked after each game; once the better algo is settled no more games of
+that pairing are played and the free workers go to the pairings that are still close.
+>py scripts/contributions/run_arena.py -s upton-new upton-old --sequential --max-games 40
+
+With many algos a full round robin takes too long. --ladder rates them instead (Glicko ratings,
+see arena_stats.py): each free worker plays the pairing whose result is expected to reduce the
+uncertainty of the ratings the most, which are close pairings of algos that played little. It
+stops after the given number of games or once every rating deviation is below --target-deviation.
+Games in the ledger between the current versions are rated before any new game is played.
+>py scripts/contributions/run_arena.py -a --ladder 300
 
 
 At the end I also run the get_results.py script that outputs some data. I recommend having
@@ -73,74 +95,138 @@ If you have questions just ask me on the forums - @Isaac
 import sys
 try:
 	import os
+	import json
+	import signal
 	import subprocess
 	import argparse
 	import itertools
+	import threading
 	import time
-	import copy
-	import multiprocessing as mp
+	from arena_ledger import Ledger, algo_hash, order_pair, pairing_job, pairing_jobs
+	from arena_stats import Pairing, SPRT, Ratings
+	from concurrent.futures import ThreadPoolExecutor, wait
 except ImportError as e:
 	print("WARNING: Module not found, full error:\n")
 	print(str(e))
 	sys.exit()
 
+# A match runs the engine (a JVM) and two algos, roughly two cores and this much memory
+CORES_PER_MATCH = 2
+MEMORY_PER_MATCH = 1.5 * 1024 ** 3
 
-# Runs a single game
-def run_single_game(process_command, algo1, algo2, max_name_len):
-	p = subprocess.Popen(
-		process_command,
-		shell=True,
-		stdout=subprocess.PIPE,
-		stderr=subprocess.PIPE
-		)
-	output, error = p.communicate()
-	# daemon necessary so game shuts down if this script is shut down by user
-	p.daemon = 1
-	p.wait()
-	print("{: <30}{: <{fill}}   vs   {}".format('Finished running match:', algo1, algo2, fill=str(max_name_len)))
-
-	# print (''.join(['{}\n'.format(x) for x in str(output).split('\\r\\n')])[1:])
-	if str(error) != "b''":
-		print ('Error with match - {} {}:\n\tError:\n{}'.format(algo1, algo2, error))
-
-def run_match(arg1='', arg2='', max_name_len=0):
-	# Get location of this run file
-	file_dir = os.path.dirname(os.path.realpath(__file__)).replace('\\contributions', '')
-	parent_dir = os.path.join(file_dir, os.pardir)
-	parent_dir = os.path.abspath(parent_dir)
-
-	# Get if running in windows OS
-	is_windows = sys.platform.startswith('win')
-
-	# Set default path for algos if script is run with no params
-	default_algo = parent_dir + "\\algos\\starter-algo-ZIPME\\run.ps1" if is_windows else parent_dir + "/algos/starter-algo-ZIPME/run.sh" 
-	algo1 = default_algo
-	algo2 = default_algo
-
-	# If script run with params, use those algo locations when running the game
-	if arg1 != '':
-		algo1 = arg1
-	if arg2 != '':
-		algo2 = arg2
-
-	# If folder path is given instead of run file path, add the run file to the path based on OS
-	# trailing_char deals with if there is a trailing \ or / or not after the directory name
+is_windows = sys.platform.startswith('win')
+
+# Get location of this run file
+file_dir = os.path.dirname(os.path.realpath(__file__)).replace('\\contributions', '')
+parent_dir = os.path.abspath(os.path.join(file_dir, os.pardir))
+replays_dir = os.path.join(parent_dir, 'replays')
+
+# the number of matches that can run at once without overloading the cpu or running out of memory
+def default_workers():
+	workers = max(1, (os.cpu_count() or 1) // CORES_PER_MATCH)
+	try:
+		memory = os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_PHYS_PAGES')
+		workers = min(workers, max(1, int(memory // MEMORY_PER_MATCH)))
+	except (ValueError, OSError, AttributeError):
+		pass # no sysconf on windows, only the cpu count is used
+	return workers
+
+# If folder path is given instead of run file path, add the run file to the path based on OS
+def get_run_file(algo):
+	run_file = "run.ps1" if is_windows else "run.sh"
+	if run_file in algo:
+		return algo
+	return os.path.join(algo, run_file)
+
+# reads the endStats of a replay from the end of the file, None if the game did not finish
+def read_end_stats(replay):
+	try:
+		with open(replay, 'rb') as f:
+			f.seek(0, os.SEEK_END)
+			f.seek(max(0, f.tell() - 65536))
+			lines = f.read().decode(errors='ignore').strip().split('\n')
+		return json.loads(lines[-1]).get('endStats')
+	except (OSError, ValueError, IndexError):
+		return None
+
+# the name the engine gives an algo in the endStats, the name of its directory
+def algo_name(algo):
+	return os.path.basename(os.path.normpath(algo))
+
+# finds the replay written by a match and its endStats. Matches run at the same time, so a replay only counts
+# if it was modified since the match started, is finished and was played by the same algos in the same seats.
+claimed_replays = set()
+claim_lock = threading.Lock()
+def claim_replay(start_time, algo1, algo2):
+	with claim_lock:
+		try:
+			candidates = [os.path.join(replays_dir, f) for f in os.listdir(replays_dir) if f.endswith('.replay')]
+		except OSError:
+			return None, None
+		candidates = [f for f in candidates if f not in claimed_replays and os.path.getmtime(f) >= start_time]
+		for replay in sorted(candidates, key=os.path.getmtime, reverse=True):
+			end_stats = read_end_stats(replay)
+			if end_stats is None:
+				continue # still being written by another match
+			try:
+				names = (end_stats['player1']['name'], end_stats['player2']['name'])
+			except (KeyError, TypeError):
+				continue
+			if names == (algo_name(algo1), algo_name(algo2)):
+				claimed_replays.add(replay)
+				return replay, end_stats
+		return None, None
+
+# engines that are running, killed if this script is shut down by the user
+running_matches = set()
+
+# kills the engine and both algos it started
+def kill_match(p):
 	if is_windows:
-		if "run.ps1" not in algo1:
-			trailing_char = "" if algo1.endswith("\\") else "\\"
-			algo1 = algo1 + trailing_char + "run.ps1"
-		if "run.ps1" not in algo2:
-			trailing_char = "" if algo2.endswith("\\") else "\\"
-			algo2 = algo2 + trailing_char + "run.ps1"
+		subprocess.call(['taskkill', '/F', '/T', '/PID', str(p.pid)], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
 	else:
-		if "run.sh" not in algo1:
-			trailing_char = "" if algo1.endswith('/') else "/"
-			algo1 = algo1 + trailing_char + "run.sh"
-		if "run.sh" not in algo2:
-			trailing_char = "" if algo2.endswith('/') else "/"
-			algo2 = algo2 + trailing_char + "run.sh"
-
-	run_single_game("cd {} && java -jar engine.jar work {} {}".format(parent_dir, algo1, algo2), algo1.split('\\')[-2].replace('algos/',''),  algo2.split('\\')[-2].replace('algos/',''), max_name_len)
+		try:
+			os.killpg(p.pid, signal.SIGKILL)
+		except OSError:
+			pass
+
+# Runs a single game, returns its result
+def run_match(job, timeout):
+	algo1, algo2 = job['algo1'], job['algo2']
+	result = dict(job)
+	result.update({'winner': None, 'turns': None, 'duration': None,
+		'wall_time': None, 'timed_out': False, 'returncode': None, 'replay': None, 'error': None})
+	command = ['java', '-jar', 'engine.jar', 'work', get_run_file(os.path.join('algos', algo1)), get_run_file(os.path.join('algos', algo2))]
+	start_time = time.time()
+	# the engine and algos get their own process group so a hung match can be killed as a whole
+	if is_windows:
+		p = subprocess.Popen(command, cwd=parent_dir, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+			creationflags=subprocess.CREATE_NEW_PROCESS_GROUP)
+	else:
+		p = subprocess.Popen(command, cwd=parent_dir, stdout=subprocess.PIPE, stderr=subprocess.PIPE, start_new_session=True)
+	running_matches.add(p)
+	try:
+		output, error = p.communicate(timeout=timeout)
+	except subprocess.TimeoutExpired:
+		kill_match(p)
+		output, error = p.communicate()
+		result['timed_out'] = True
+	finally:
+		running_matches.discard(p)
+	result['wall_time'] = round(time.time() - start_time, 2)
+	result['returncode'] = p.returncode
+	if error:
+		result['error'] = error.decode(errors='ignore').strip()[-2000:]
+
+	replay, end_stats = claim_replay(start_time, algo1, algo2)
+	result['replay'] = replay
+	if end_stats is not None:
+		winner = end_stats.get('winner')
+		result['winner'] = {1: algo1, 2: algo2}.get(winner)
+		result['winner_hash'] = {1: job['hash1'], 2: job['hash2']}.get(winner)
+		result['turns'] = end_stats.get('turns')
+		result['duration'] = end_stats.get('duration')
+	return result
 
 # handles all the arguments
 def parse_args():
@@ -162,8 +248,60 @@ def parse_args():
 	ap.add_argument(
 		"-b", "--batch",
 		type=int,
-		default=5,
-		help="number of games to run at a single time (on seperate threads)\n\n")
+		default=None,
+		help="number of games to run at a single time, by default as many as your cores and memory allow\n\n")
+	ap.add_argument(
+		"-t", "--timeout",
+		type=float,
+		default=600,
+		help="seconds after which a match is killed, default 600\n\n")
+	ap.add_argument(
+		"-o", "--output",
+		default=os.path.join(parent_dir, 'arena_results.jsonl'),
+		help="ledger file the result of every match is appended to as a json line,\nmatches already finished in it are skipped\n\n")
+	ap.add_argument(
+		"-r", "--repeats",
+		type=int,
+		default=1,
+		help="number of games of each pairing (and seat), default 1\n\n")
+	ap.add_argument(
+		"--both-seats",
+		action='store_true',
+		help="also play every pairing with the algos swapped between player 1 and player 2\n\n")
+	ap.add_argument(
+		"--sequential",
+		action='store_true',
+		help="play each pairing in both seats until it is statistically settled, see arena_stats.py\n\n")
+	ap.add_argument(
+		"--max-games",
+		type=int,
+		default=20,
+		help="with --sequential, the most games played per pairing, default 20\n\n")
+	ap.add_argument(
+		"--delta",
+		type=float,
+		default=0.1,
+		help="with --sequential, the win rate above 50%% that counts as better, default 0.1\n\n")
+	ap.add_argument(
+		"--alpha",
+		type=float,
+		default=0.05,
+		help="with --sequential, the accepted rate of wrongly calling algo A better, default 0.05\n\n")
+	ap.add_argument(
+		"--beta",
+		type=float,
+		default=0.05,
+		help="with --sequential, the accepted rate of wrongly calling algo B better, default 0.05\n\n")
+	ap.add_argument(
+		"--ladder",
+		type=int,
+		default=None,
+		help="rate the algos with at most this many games, choosing the most informative pairings\n\n")
+	ap.add_argument(
+		"--target-deviation",
+		type=float,
+		default=50,
+		help="with --ladder, stop once every rating deviation is below this, default 50\n\n")
 	return vars(ap.parse_args())
 
 # called by the -a arg, runs every algo in directory
@@ -188,42 +326,254 @@ def run_from_file(filePath):
 		print ('File {} was not found'.format(filePath))
 		sys.exit()
 
-# returns the number of processess that are active
-def get_num_running(processes):
-	c = 0
-	for i, proc in processes.items():
-		if proc.is_alive():
-			c += 1
-	return c
-
-# starts a subprocess for each match up to batch_size and then starts them as they finish
-def run_matches(matches, batch_size):
-	tmp = copy.deepcopy(matches)
-	max_name_len = len(max(tmp, key=lambda e:len(e[0]))[0])
-
-	algos = []
-	processes = {}
-	i = 0
-	for match in matches:
-		algos.append((match[0],match[1]))
-		algo1 = 'algos/{}'.format(match[0])
-		algo2 = 'algos/{}'.format(match[1])
-		processes[i] = mp.Process(target=run_match, args=(algo1, algo2, max_name_len))
-		i += 1
-
-	for i in range(len(processes)):
-		print ('{: <30}{: <{fill}}   vs   {}'.format('Starting match:', algos[i][0], algos[i][1], fill=str(max_name_len)))
-		processes[i].start()
-		i += 1
-		while get_num_running(processes) >= batch_size:
-			time.sleep(.1)
-
-	while get_num_running(processes) > 0:
-			time.sleep(.1)
+# the games of every pairing that are not finished in the ledger yet
+def get_jobs(matches, ledger, seats, repeats):
+	hashes = {}
+	jobs = []
+	skipped = 0
+	for algo_a, algo_b in matches:
+		for algo in (algo_a, algo_b):
+			if algo not in hashes:
+				hashes[algo] = algo_hash(os.path.join(parent_dir, 'algos', algo))
+		for job in pairing_jobs(algo_a, algo_b, hashes[algo_a], hashes[algo_b], seats, repeats):
+			if job['key'] in ledger:
+				skipped += 1
+			else:
+				jobs.append(job)
+	return jobs, skipped
+
+# runs the matches on a pool of workers, each result is added to the ledger as soon as its match ends
+def run_matches(matches, batch_size, timeout, ledger, seats=1, repeats=1):
+	jobs, skipped = get_jobs(list(matches), ledger, seats, repeats)
+	max_name_len = max([len(job['algo1']) for job in jobs] + [0])
+	output_lock = threading.Lock()
+
+	def on_done(job, future):
+		with output_lock:
+			record_result(ledger, job, future, max_name_len)
+
+	print('Running {} matches, {} at a time, {} already in {}'.format(len(jobs), batch_size, skipped, ledger.path))
+	pool = ThreadPoolExecutor(max_workers=batch_size)
+	futures = []
+	for job in jobs:
+		future = pool.submit(run_match, job, timeout)
+		future.add_done_callback(lambda future, job=job: on_done(job, future))
+		futures.append(future)
+	try:
+		wait(futures)
+	except KeyboardInterrupt:
+		stop_pool(pool, futures)
+		raise
+	pool.shutdown()
 
 	print ()
-	print ('Finished all matches!')
+	print ('Finished all matches! Results are in {}'.format(ledger.path))
 	print ()
+	return len(jobs)
+
+# plays the games of every pairing, alternating seats, until a sequential test settles which algo is better
+# or max_games were played. Workers that become free always go to the pairing that is the furthest from settled.
+def run_sequential(matches, batch_size, timeout, ledger, sprt, max_games):
+	hashes = {}
+	pairings = []
+	for algo_a, algo_b in matches:
+		for algo in (algo_a, algo_b):
+			if algo not in hashes:
+				hashes[algo] = algo_hash(os.path.join(parent_dir, 'algos', algo))
+		pairings.append(Pairing(*order_pair(algo_a, algo_b, hashes[algo_a], hashes[algo_b])))
+	max_name_len = max([len(algo) for algo in hashes] + [0])
+	# callbacks of futures that are already done run right away, in the thread that holds the lock
+	lock = threading.RLock()
+	finished = threading.Event()
+	pool = ThreadPoolExecutor(max_workers=batch_size)
+	futures = []
+	played = []
+
+	def count_result(pairing, result):
+		if not Ledger.is_finished(result):
+			return # crashed or no replay, the game says nothing about the algos
+		pairing.add_result(winner_hash(result))
+		if pairing.decision is None:
+			pairing.decision = sprt.decide(pairing.score, pairing.games)
+			if pairing.decision is not None:
+				print('{: <30}{}'.format('Settled pairing:', pairing))
+
+	# the next game to play, games already in the ledger are counted on the way
+	def next_job():
+		while True:
+			candidates = [pairing for pairing in pairings if pairing.decision is None and pairing.scheduled < max_games]
+			if not candidates:
+				return None, None
+			pairing = max(candidates, key=lambda pairing: (sprt.uncertainty(pairing.score, pairing.games) / (1 + pairing.in_flight), -pairing.scheduled))
+			n = pairing.scheduled
+			pairing.scheduled += 1
+			job = pairing_job(pairing.algo_a, pairing.algo_b, pairing.hash_a, pairing.hash_b, n % 2, n // 2)
+			if job['key'] in ledger:
+				count_result(pairing, ledger.finished[job['key']])
+				continue
+			pairing.in_flight += 1
+			return pairing, job
+
+	# keeps every worker busy, must be called with the lock held
+	def fill():
+		while sum(pairing.in_flight for pairing in pairings) < batch_size:
+			pairing, job = next_job()
+			if job is None:
+				break
+			future = pool.submit(run_match, job, timeout)
+			future.add_done_callback(lambda future, pairing=pairing, job=job: on_done(pairing, job, future))
+			futures.append(future)
+		if sum(pairing.in_flight for pairing in pairings) == 0:
+			finished.set()
+
+	def on_done(pairing, job, future):
+		with lock:
+			result = record_result(ledger, job, future, max_name_len)
+			played.append(result)
+			pairing.in_flight -= 1
+			count_result(pairing, result)
+			fill()
+
+	print('Running up to {} games per pairing, {} at a time, results go to {}'.format(max_games, batch_size, ledger.path))
+	with lock:
+		fill()
+	try:
+		finished.wait()
+	except KeyboardInterrupt:
+		stop_pool(pool, futures)
+		raise
+	pool.shutdown()
+
+	print ()
+	print ('Finished all pairings!')
+	for pairing in pairings:
+		if pairing.decision is None:
+			verdict = 'not settled'
+		else:
+			verdict = '{} is better'.format(pairing.algo_a if pairing.decision == 'A' else pairing.algo_b)
+		print('{: <{fill}}   vs   {: <{fill}}   {: >6} - {: <6} {}'.format(pairing.algo_a, pairing.algo_b,
+			'{:g}'.format(pairing.score), '{:g}'.format(pairing.games - pairing.score), verdict, fill=str(max_name_len)))
+	print ()
+	return len(played)
+
+# rates every algo with as few games as possible: each free worker plays the pairing whose result is expected
+# to tell the most about the ratings, until max_games were played or every rating deviation is below target_deviation
+def run_ladder(algos, batch_size, timeout, ledger, max_games, target_deviation):
+	hashes = {algo: algo_hash(os.path.join(parent_dir, 'algos', algo)) for algo in algos}
+	names = {version: algo for algo, version in hashes.items()}
+	ratings = Ratings()
+	for version in names:
+		ratings.get(version)
+	# earlier games between the current versions are rated first
+	for result in ledger.finished.values():
+		if result.get('hash1') in names and result.get('hash2') in names and result.get('turns') is not None:
+			winner = winner_hash(result)
+			ratings.add_game(result['hash1'], result['hash2'], 1.0 if winner == result['hash1'] else 0.5 if winner is None else 0.0)
+
+	pairings = {}
+	for algo_a, algo_b in itertools.combinations(algos, 2):
+		pairing = Pairing(*order_pair(algo_a, algo_b, hashes[algo_a], hashes[algo_b]))
+		pairings[(pairing.hash_a, pairing.hash_b)] = pairing
+	max_name_len = max([len(algo) for algo in algos] + [0])
+	in_flight = {version: 0 for version in names}
+	# callbacks of futures that are already done run right away, in the thread that holds the lock
+	lock = threading.RLock()
+	finished = threading.Event()
+	pool = ThreadPoolExecutor(max_workers=batch_size)
+	futures = []
+	played = []
+
+	def settled():
+		return all(deviation <= target_deviation for _, _, deviation, _ in ratings.ranking())
+
+	def next_job():
+		if len(played) + sum(in_flight.values()) // 2 >= max_games or settled():
+			return None, None
+		candidates = [pairing for pairing in pairings.values() if pairing.in_flight == 0]
+		if not candidates:
+			return None, None
+		# games of algos that are already playing will change their ratings, so they are worth less.
+		# Repeating a pairing also tells less than one that links the ratings through new opponents
+		pairing = max(candidates, key=lambda pairing: ratings.information(pairing.hash_a, pairing.hash_b) /
+			(1 + in_flight[pairing.hash_a] + in_flight[pairing.hash_b]) / (1 + pairing.scheduled))
+		while True:
+			n = pairing.scheduled
+			pairing.scheduled += 1
+			job = pairing_job(pairing.algo_a, pairing.algo_b, pairing.hash_a, pairing.hash_b, n % 2, n // 2)
+			if job['key'] not in ledger:
+				break
+		pairing.in_flight += 1
+		in_flight[pairing.hash_a] += 1
+		in_flight[pairing.hash_b] += 1
+		return pairing, job
+
+	def fill():
+		while sum(in_flight.values()) // 2 < batch_size:
+			pairing, job = next_job()
+			if job is None:
+				break
+			future = pool.submit(run_match, job, timeout)
+			future.add_done_callback(lambda future, pairing=pairing, job=job: on_done(pairing, job, future))
+			futures.append(future)
+		if sum(in_flight.values()) == 0:
+			finished.set()
+
+	def on_done(pairing, job, future):
+		with lock:
+			result = record_result(ledger, job, future, max_name_len)
+			played.append(result)
+			pairing.in_flight -= 1
+			in_flight[pairing.hash_a] -= 1
+			in_flight[pairing.hash_b] -= 1
+			if Ledger.is_finished(result):
+				winner = winner_hash(result)
+				ratings.add_game(job['hash1'], job['hash2'], 1.0 if winner == job['hash1'] else 0.5 if winner is None else 0.0)
+			fill()
+
+	print('Rating {} algos with up to {} games, {} at a time, results go to {}'.format(len(algos), max_games, batch_size, ledger.path))
+	with lock:
+		fill()
+	try:
+		finished.wait()
+	except KeyboardInterrupt:
+		stop_pool(pool, futures)
+		raise
+	pool.shutdown()
+
+	print ()
+	print ('Ratings after {} new games:'.format(len(played)))
+	print ('|')
+	for version, rating, deviation, games in ratings.ranking():
+		print('|{: >{fill}} : {:6.0f} +- {:3.0f}  ({} games)'.format(names[version], rating, 2 * deviation, games, fill=str(max_name_len + 9)))
+	print ()
+	return len(played)
+
+# the hash of the winner of a ledger result, None for ties
+def winner_hash(result):
+	if 'winner_hash' in result:
+		return result['winner_hash']
+	return {result['algo1']: result['hash1'], result['algo2']: result['hash2']}.get(result.get('winner'))
+
+# adds the result of a finished future to the ledger and prints it
+def record_result(ledger, job, future, max_name_len):
+	try:
+		result = future.result()
+	except Exception as e:
+		result = dict(job, error=str(e))
+	ledger.append(result)
+	status = 'Timed out match:' if result.get('timed_out') else 'Finished running match:'
+	print('{: <30}{: <{fill}}   vs   {}   winner: {}'.format(status, job['algo1'], job['algo2'], result.get('winner'), fill=str(max_name_len)))
+	if result.get('error'):
+		print('Error with match - {} {}:\n\tError:\n{}'.format(job['algo1'], job['algo2'], result['error']))
+	return result
+
+# matches run in their own process group, so they have to be shut down here when the user stops the script
+def stop_pool(pool, futures):
+	for future in list(futures):
+		future.cancel()
+	for p in list(running_matches):
+		kill_match(p)
+	pool.shutdown()
 
 if __name__ == '__main__':
 	args = parse_args() # get command line arguments
@@ -239,17 +589,27 @@ if __name__ == '__main__':
 		print ('No arguments - no action taken')
 		sys.exit()
 
-	tmp = copy.deepcopy(matches)
-	run_matches(matches, args['batch'])		# run all matches
+	batch_size = args['batch'] if args['batch'] is not None else default_workers()
+	ledger = Ledger(args['output'])
+	if args['ladder'] is not None:
+		algos = sorted(set(algo for match in matches for algo in match))
+		num_played = run_ladder(algos, batch_size, args['timeout'], ledger, args['ladder'], args['target_deviation'])
+	elif args['sequential']:
+		sprt = SPRT(args['delta'], args['alpha'], args['beta'])
+		num_played = run_sequential(matches, batch_size, args['timeout'], ledger, sprt, args['max_games'])
+	else:
+		num_played = run_matches(matches, batch_size, args['timeout'], ledger, 2 if args['both_seats'] else 1, args['repeats'])		# run all matches
 
 	# if get_results is avalible, run a summary of the matches played
+	if num_played == 0:
+		sys.exit()
 	try:
 		args = {	'all':		False, 				\
 					'verbose':	False, 				\
 					'averages':	[], 				\
 					'file':		[],					\
 					'graph':	['wins'],	\
-					'num':		len(list(tmp))		\
+					'num':		num_played		\
 				}
 		from get_results import main
 		main(args)
@@ -0,0 +1,202 @@
+#!/usr/bin/env python
+
+'''
+------------------------------------------------------------------------------------------------
+Short Description:
+This is a python script to tune the O-function decision model of upton-algo offline.
+It reads the turn states of recorded replays, extracts the inputs of the decision function for
+every turn played by upton and evaluates the choice of f for a whole grid of constants at once.
+------------------------------------------------------------------------------------------------
+
+README:
+
+This program assumes this file is in the contributions/scripts directory and requires numpy.
+
+By default, it reads every replay in the /replays/ directory:
+>py scripts/contributions/tune_decision.py
+
+You can choose the replays the same way as with get_results.py:
+>py scripts/contributions/tune_decision.py -n 20
+>py scripts/contributions/tune_decision.py -f [REPLAY_FILE].replay [REPLAY_FILE].replay
+
+The algo whose turns are evaluated is found by name in the end stats of each replay, use -p
+if your copy of upton-algo has another name:
+>py scripts/contributions/tune_decision.py -p my-upton
+
+Every constant of o_function.DEFAULT_PARAMETERS can be given a list of values to try, every
+combination is evaluated. For example:
+>py scripts/contributions/tune_decision.py --wall-weight 4.5 5.5 6.5 --mp-margin 2 4 6
+
+For each setting it prints how often f would have been 0 (defend both sides), 1 (attack left),
+2 (attack right) or a coin flip between 1 and 2, both over the turns upton lost health in and over all turns.
+Only turns from 5 on are counted, the decision function is not used before.
+'''
+
+try:
+	import os
+	import sys
+	import json
+	import glob
+	import argparse
+	import itertools
+except ImportError as e:
+	sys.stderr.write("WARNING: Module not found, full error:\n\n")
+	sys.stderr.write(e)
+
+try:
+	import numpy as np
+except ImportError:
+	sys.stderr.write('numpy is required: pip3 install numpy\n')
+	sys.exit(1)
+
+# o_function and gamelib of upton-algo, see _upton_path.py
+import _upton_path
+import o_function
+from gamelib.frames import parse_turn_info
+
+# Enemy turrets and walls read by AlgoStrategy.gather_info_from_gamestate, as seen by upton
+TURRET_LOCATIONS = {
+	'z': ([[0,14],[1,15],[2,15],[1,14],[2,14],[3,14]], False),
+	'z_1': ([[25,15],[26,15],[24,14],[25,14],[26,14],[27,14]], False),
+	'x': ([[1,15],[2,15]], True),
+	'y': ([[0,14],[1,14],[2,14],[3,14]], True),
+	'x_1': ([[25,15],[26,15]], True),
+	'y_1': ([[24,14],[25,14],[26,14],[27,14]], True),
+}
+WALL_LOCATIONS = {'w': [0,14], 'w_1': [27,14]}
+INPUTS = ['x', 'y', 'z', 'x_1', 'y_1', 'z_1', 'w', 'w_1', 'mp', 'r']
+FIRST_DECISION_TURN = 5
+F_LABELS = ['f=0', 'f=1', 'f=2', 'tie']
+
+def parse_args():
+	ap = argparse.ArgumentParser(add_help=False, formatter_class=argparse.RawTextHelpFormatter)
+	ap.add_argument('-h', '--help', action='help', help='show this help message and exit\n\n')
+	ap.add_argument(
+		"-n", "--num",
+		default=None,
+		help="number of files (in order of date created) to analyze, all of them by default\n\n")
+	ap.add_argument(
+		"-f", "--file",
+		nargs="*",
+		default=[],
+		help="specify a replay file (or multiple) you'd like to analyze\n\n")
+	ap.add_argument(
+		"-p", "--player",
+		default="upton",
+		help="part of the name of the algo whose decisions are evaluated\n\n")
+	for name, value in o_function.DEFAULT_PARAMETERS.items():
+		ap.add_argument(
+			"--" + name.replace('_', '-'),
+			dest=name,
+			nargs="+",
+			type=float,
+			default=[value],
+			help="values of {} to try, default {}\n\n".format(name, value))
+	return vars(ap.parse_args())
+
+def replay_files(args):
+	if len(args['file']) > 0:
+		return args['file']
+	replay_dir = os.path.join(os.path.dirname(os.path.realpath(__file__)), '..', '..', 'replays')
+	files = sorted(glob.glob(os.path.join(replay_dir, '*.replay')), key=os.path.getctime, reverse=True)
+	if args['num'] is not None:
+		files = files[:int(args['num'])]
+	return files
+
+# reads the turn states of a replay, action frames are skipped without being decoded
+def read_turn_states(fname):
+	states = []
+	end_stats = None
+	with open(fname) as f:
+		for line in f:
+			turn_info = parse_turn_info(line)
+			if turn_info is None:
+				continue
+			if turn_info[0] == 0:
+				states.append(json.loads(line))
+			elif turn_info[0] == 2:
+				end_stats = json.loads(line).get('endStats')
+	return states, end_stats
+
+# the location in replay coordinates of a location seen by the given player, player 2 sees the board rotated
+def replay_location(location, player):
+	if player == 1:
+		return tuple(location)
+	return (27 - location[0], 27 - location[1])
+
+# one row of decision inputs per turn of the given player, and whether they lost health that turn
+def extract_inputs(states, player):
+	enemy = 2 if player == 1 else 1
+	rows = []
+	breached = []
+	for i, state in enumerate(states):
+		turn = state['turnInfo'][1]
+		if turn < FIRST_DECISION_TURN or i + 1 >= len(states):
+			continue
+		units = state['p{}Units'.format(enemy)]
+		upgraded = set(tuple(unit[:2]) for unit in units[7]) if len(units) > 7 else set()
+		turrets = set(tuple(unit[:2]) for unit in units[2])
+		walls = set(tuple(unit[:2]) for unit in units[0])
+
+		row = {}
+		for name, (locations, want_upgraded) in TURRET_LOCATIONS.items():
+			cells = [replay_location(location, player) for location in locations]
+			row[name] = sum(1 for cell in cells if cell in turrets and (cell in upgraded) == want_upgraded)
+		for name, location in WALL_LOCATIONS.items():
+			cell = replay_location(location, player)
+			row[name] = 0 if cell not in walls else (2 if cell in upgraded else 1)
+		stats = state['p{}Stats'.format(player)]
+		row['mp'] = stats[2]
+		row['r'] = turn
+		rows.append(row)
+
+		next_health = states[i + 1]['p{}Stats'.format(player)][0]
+		breached.append(next_health < stats[0])
+	return rows, breached
+
+def load_inputs(files, player_name):
+	rows = []
+	breached = []
+	for fname in files:
+		try:
+			states, end_stats = read_turn_states(fname)
+		except (IOError, ValueError) as e:
+			sys.stderr.write('Skipping {}: {}\n'.format(fname, e))
+			continue
+		if end_stats is None:
+			continue
+		for player in [1, 2]:
+			if player_name in end_stats['player{}'.format(player)].get('name', ''):
+				player_rows, player_breached = extract_inputs(states, player)
+				rows += player_rows
+				breached += player_breached
+
+	inputs = {name: np.array([row[name] for row in rows], dtype=float) for name in INPUTS}
+	return inputs, np.array(breached, dtype=bool)
+
+def shares(f, mask):
+	counts = np.bincount(f[mask].astype(int), minlength=len(F_LABELS))
+	total = max(1, mask.sum())
+	return ' '.join('{}: {:5.1%}'.format(label, count / total) for label, count in zip(F_LABELS, counts))
+
+def main(args):
+	files = replay_files(args)
+	inputs, breached = load_inputs(files, args['player'])
+	everything = np.ones(len(breached), dtype=bool)
+	sys.stderr.write('{} turns of {} from {} replays, {} of them lost health\n\n'.format(len(breached), args['player'], len(files), breached.sum()))
+	if len(breached) == 0:
+		return
+
+	names = list(o_function.DEFAULT_PARAMETERS.keys())
+	for values in itertools.product(*[args[name] for name in names]):
+		parameters = dict(zip(names, values))
+		f = o_function.choose_f_batch(inputs, parameters)
+		default = ' (current)' if parameters == o_function.DEFAULT_PARAMETERS else ''
+		sys.stderr.write('{}{}\n'.format(', '.join('{}={:g}'.format(name, value) for name, value in parameters.items()), default))
+		sys.stderr.write('|{: >18} : {}\n'.format('lost health', shares(f, breached)))
+		sys.stderr.write('|{: >18} : {}\n'.format('all turns', shares(f, everything)))
+
+
+if __name__ == '__main__':
+	args = parse_args() # get command line arguments
+	main(args)
@@ -170,6 +170,21 @@ If you want to change the order just:
 1. Ctrl-Find in this script:	this is the default order of priority for running a save
 2. Change the order of the list to be the priority you want
 
+----------------------------------------------------------------------------------------
+Replays that are already finished are opened through a byte offset index stored next to them
+([REPLAY_FILE].replay.idx, see replay_index.py). Only the frames that are shown are decoded, so
+jumping to a late turn with the slider does not have to read the whole replay first.
+
+----------------------------------------------------------------------------------------
+-st: Read from a replay store (requires numpy)
+
+You can read the replay from a store created by replay_store.py instead of decoding the json of every frame:
+>py scripts/contributions/watch_replay.py -f [REPLAY_FILE].replay -st
+
+The replay is added to the store first if it is missing. The store is in replays/store unless you give
+another directory. The units of a frame are only read from the store when it is shown.
+This does not apply to real-time watching.
+
 ----------------------------------------------------------------------------------------
 
 I cannot stress enough that this program is slow and unoptimized. Expect slowness :).
@@ -201,6 +216,16 @@ except ImportError as e:
 	sys.stderr.write("WARNING: Module not found, full error:\n\n")
 	sys.stderr.write(e)
 
+# the replay store and index decode frames with the gamelib of upton-algo, without it replays are read in full and -s is not available
+try:
+	from replay_store import ReplayStore, DEFAULT_STORE
+	from replay_index import IndexedReplay
+	store_error = None
+except ImportError as e:
+	ReplayStore = IndexedReplay = None
+	DEFAULT_STORE = os.path.join(os.path.dirname(os.path.realpath(__file__)), '..', '..', 'replays', 'store')
+	store_error = e
+
 try:
 	import matplotlib.pyplot as plt
 	import matplotlib.animation as animation
@@ -299,6 +324,12 @@ def parse_args():
 		'-kt', '--keep_trying',
 		action='store_true',
 		help="forces the save file to keep trying different writers until one works - flag only works if you are saving a replay\n\n")
+	ap.add_argument(
+		'-st', '--store',
+		nargs='?',
+		const=DEFAULT_STORE,
+		default=None,
+		help="read the replay from a replay_store.py store (default replays/store), adding it first if it is missing - requires numpy, not used in real-time\n\n")
 	return vars(ap.parse_args())
 
 # stores all information for a single unit on the graph
@@ -999,18 +1030,21 @@ class Graph:
 	def data_stream(self):
 		while True:
 
-			# everything in this block (real-time) is extrememly inefficient, becuase it has to constantly load new data
+			# in real-time only the lines the engine added since the last frame are read, they are added to the data in place
 			if self.real_time:
-				self.info_ax.clear()															# clear the inforation side
-
-				self.fh.load_files(1,False,args['file']) 										# load latest replay (again)
-				replay = self.fh.get_last_replay()												# get latest replay (again)
+				replay = self.fh.get_last_replay()
+				replay.update()																	# read the new frames of the replay
 
 				# user paused game, don't advance
 				if not self.is_manual:
 					self.advance()
 
-				self.general_init(replay.frames, replay.frames_in_turn, replay.healths)			# call general initialization
+				self.num_frames = len(self.data)												# the plot shares the health lists, so it sees the new frames already
+
+				# once the game is over, initialize again to create the slider and show the names and winner
+				if replay.finished:
+					self.info_ax.clear()														# clear the inforation side
+					self.general_init(replay.frames, replay.frames_in_turn, replay.healths)		# call general initialization
 
 				# this is for the first call - cannot send before yield is reached (function called)
 				try:
@@ -1053,7 +1087,7 @@ class Graph:
 
 	# format all of the raw unit data into how my functions recieve it
 	def cache_units(self, units, p_index):
-		filters, encryptors, destructors, pings, emps, scramblers, removes = units
+		filters, encryptors, destructors, pings, emps, scramblers = units[:6]		# removals and upgrades are not drawn
 		units_new = []
 		for unit in filters: units_new.append((FILTER, (unit[0], unit[1]), unit[2], p_index, unit[3]))
 		for unit in encryptors: units_new.append((ENCRYPTOR, (unit[0], unit[1]), unit[2], p_index, unit[3]))
@@ -1140,17 +1174,50 @@ class Frame:
 	def __getitem__(self, key):
 		return self.data[key]
 
+# the data of a single frame read from a replay store, the units are only rebuilt when the frame is shown
+class StoredFrameData:
+	def __init__(self, stored, i):
+		self.stored = stored 			# the StoredReplay
+		self.i = i 						# the row of this frame in the store
+
+	def __getitem__(self, key):
+		if key == 'p1Units' or key == 'p2Units':
+			return self.stored.frame_units(self.i, int(key[1]))
+		if key == 'p1Stats' or key == 'p2Stats':
+			return self.stored.stats(int(key[1]))[self.i].tolist()
+		if key == 'turnInfo':
+			return [int(self.stored['state_type'][self.i]), int(self.stored['turn'][self.i]), int(self.stored['frame'][self.i])]
+		if key == 'endStats' and self.i == len(self.stored) - 1 and self.stored.entry['end_stats'] is not None:
+			return self.stored.entry['end_stats']
+		raise KeyError(key)
+
+# the data of a single frame of an IndexedReplay, decoded from the replay file when it is first used
+class IndexedFrameData:
+	def __init__(self, replay, key):
+		self.replay = replay 			# the IndexedReplay
+		self.key = key 					# the turn, frame tuple of this frame
+
+	def __getitem__(self, key):
+		return self.replay[self.key][key]
+
 
 # Stores data from a single replay
 class Replay:
-	def __init__(self, f_name):
+	def __init__(self, f_name, stored=None, index=False):
 		self.fname = f_name 			# the file name of the replay
 		self.ref = None					# stores the raw dict data as a reference
 		self.frames = {}				# dict containing all data, keys are turn, frame tuple with Frame objects as values
 		self.frames_in_turn = {}		# number of frames in each turn
 		self.healths = ([], [])			# contains the healths for player1 and player2
+		self.offset = 0					# the number of bytes of the file read so far
+		self.finished = False			# whether the frame with the endStats was read
 
-		self.load_data()				# handles loading all the data from file into python variables
+		if stored is not None:
+			self.load_stored(stored)	# loads the data from the columns of a replay store
+		elif index and IndexedReplay is not None:
+			self.load_indexed()			# only reads the index of the replay, frames are decoded when they are shown
+		else:
+			self.load_data()			# handles loading all the data from file into python variables
 
 	def __eq__(self, other):
 		return self.fname == other.fname
@@ -1163,30 +1230,72 @@ class Replay:
 
 	# loads all data from a replay into the python variables
 	def load_data(self):
-		with open(self.fname) as f:
-			i = 0
-			for line in f:
-				line = line.replace("\n", "")
-				line = line.replace("\t", "")
+		self.update()
+
+	# reads the lines added to the replay file since the last call and adds their frames to the python variables in place,
+	# returns the number of new frames. A line the engine is still writing is left for the next call.
+	def update(self):
+		with open(self.fname, 'rb') as f:
+			f.seek(self.offset)
+			new_data = f.read()
+
+		end = new_data.rfind(b'\n') + 1
+		lines = new_data[:end].split(b'\n')
+		rest = new_data[end:]
+		if rest.strip() != b'':
+			# the last line of a finished replay may not end with a new line
+			try:
+				json.loads(rest.decode())
+				lines.append(rest)
+				end = len(new_data)
+			except ValueError:
+				pass
+		self.offset += end
 
-				if (line != ''):
-					data = json.loads(line)
+		new_frames = 0
+		for line in lines:
+			line = line.decode().replace("\n", "")
+			line = line.replace("\t", "")
 
-					try:
-						data['debug']
-						self.ref = data
-					except:
-						turn_num = data['turnInfo'][1]
-						frame_num = data['turnInfo'][2]
-						self.frames[(turn_num, frame_num)] = Frame(turn_num, frame_num, data)
+			if (line != ''):
+				data = json.loads(line)
 
-						self.healths[0].append(data['p1Stats'][0])
-						self.healths[1].append(data['p2Stats'][0])
+				try:
+					data['debug']
+					self.ref = data
+				except:
+					turn_num = data['turnInfo'][1]
+					frame_num = data['turnInfo'][2]
+					self.frames[(turn_num, frame_num)] = Frame(turn_num, frame_num, data)
+
+					self.healths[0].append(data['p1Stats'][0])
+					self.healths[1].append(data['p2Stats'][0])
 
-						try:
-							self.frames_in_turn[turn_num] += 1
-						except KeyError:
-							self.frames_in_turn[turn_num] = 1
+					try:
+						self.frames_in_turn[turn_num] += 1
+					except KeyError:
+						self.frames_in_turn[turn_num] = 1
+
+					if 'endStats' in data:
+						self.finished = True
+					new_frames += 1
+		return new_frames
+
+	# loads a replay through its byte offset index (see replay_index.py), the healths are part of the index
+	def load_indexed(self):
+		replay = IndexedReplay(self.fname)
+		for turn_num, frame_num in replay:
+			self.frames[(turn_num, frame_num)] = Frame(turn_num, frame_num, IndexedFrameData(replay, (turn_num, frame_num)))
+		self.frames_in_turn = replay.frames_in_turn
+		self.healths = replay.healths()
+
+	# loads a replay from a replay store, only the healths are read up front
+	def load_stored(self, stored):
+		turns = stored['turn'].tolist()
+		for i, (turn_num, frame_num) in enumerate(zip(turns, stored['frame'].tolist())):
+			self.frames[(turn_num, frame_num)] = Frame(turn_num, frame_num, StoredFrameData(stored, i))
+			self.frames_in_turn[turn_num] = self.frames_in_turn.get(turn_num, 0) + 1
+		self.healths = (stored.stats(1)[:, 0].tolist(), stored.stats(2)[:, 0].tolist())
 
 # handles opening multiple games (replays)
 class FileHandler:
@@ -1213,17 +1322,20 @@ class FileHandler:
 			return files
 		return files[:num]
 
-	def load_files(self, num=1, a=False, f_names=[]):
+	def load_files(self, num=1, a=False, f_names=[], store=None, index=False):
 		self.replays = []
 		if len(f_names) > 0:
-			for f_name in f_names:
-				if f_name.find('replays') == -1:
-					self.replays.append(Replay('replays/'+f_name))
-				else:
-					self.replays.append(Replay(f_name))
+			f_names = [f_name if f_name.find('replays') != -1 else 'replays/'+f_name for f_name in f_names]
 		else:
-			for f_name in self.__latest_replays(num, a):
-				self.replays.append(Replay(f_name))
+			f_names = self.__latest_replays(num, a)
+
+		if store is not None:
+			store.ingest(f_names)
+		for f_name in f_names:
+			if store is not None and f_name in store:
+				self.replays.append(Replay(f_name, store.get(f_name)))
+			else:
+				self.replays.append(Replay(f_name, index=index))
 
 
 # This is all almost directly copied from run_match.py
@@ -1332,8 +1444,13 @@ def main(args):
 		elif save == '' and keep_trying:
 			print ('You specified to keep trying writers, but it will not be used since you are not saving the animation')
 
+		if args['store'] is not None and ReplayStore is None:
+			sys.stderr.write("The replay store is not available: {}\n".format(store_error))
+			sys.exit(1)
+		store = ReplayStore(args['store']) if args['store'] is not None else None					# read from a replay store if asked to
+
 		fh = FileHandler()																			# create a file handler object
-		fh.load_files(1,False,args['file'])															# load latest replay
+		fh.load_files(1,False,args['file'],store,True)												# load latest replay, through its index if not from a store
 		replay = fh.get_last_replay()																# get latest replay
 
 		animatedReplay = Graph(replay.frames, replay.frames_in_turn, replay.healths, writers, keep_trying, save=save)		# create our Graph object
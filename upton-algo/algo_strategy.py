@@ -1,4 +1,6 @@
 import gamelib
+import os
+import o_function
 import random
 import math
 import warnings
@@ -33,7 +35,7 @@ class AlgoStrategy(gamelib.AlgoCore):
         """
         gamelib.debug_write('Configuring your custom algo strategy...')
         self.config = config
-        global WALL, SUPPORT, TURRET, SCOUT, DEMOLISHER, INTERCEPTOR, MP, SP
+        global WALL, SUPPORT, TURRET, SCOUT, DEMOLISHER, INTERCEPTOR, MP, SP, BUILDING_HIERARCHY
         WALL = config["unitInformation"][0]["shorthand"]
         SUPPORT = config["unitInformation"][1]["shorthand"]
         TURRET = config["unitInformation"][2]["shorthand"]
@@ -42,9 +44,82 @@ class AlgoStrategy(gamelib.AlgoCore):
         INTERCEPTOR = config["unitInformation"][5]["shorthand"]
         MP = 1
         SP = 0
+        # Buildings that cannot be afforded fall back to the next type in this list
+        BUILDING_HIERARCHY = [TURRET, WALL, SUPPORT]
         # This is a good place to do initial setup
         #  self.scored_on_locations = []
         self.continuous_f_0 = 0
+        # Constants of the O-function, see o_function.py
+        self.o_parameters = dict(o_function.DEFAULT_PARAMETERS)
+        # Anytime planner, spends at most half of the soft time limit of a turn.
+        # Register plan generators and evaluators here, with none registered
+        # the scripted strategy in execute_strategy is used.
+        self.planner = gamelib.AnytimePlanner(budget=config["timingAndReplay"]["waitTimeBotSoft"] / 1000 * 0.5)
+        # Rebuild plans for the next turn, speculated on a worker thread while the action phase is streamed and
+        # searched as a warm start in on_turn. Like other plans they are only used once an evaluator is registered.
+        self.enable_background_planning(self.speculate)
+        # Submit whatever was recorded with record_fallback before the soft time limit is hit
+        self.enable_watchdog(config["timingAndReplay"]["waitTimeBotSoft"] / 1000 * 0.9)
+        # Events of the last action phase and unit histories, only frames with these events are decoded
+        self.round_events = gamelib.RoundEvents()
+        self.unit_tracker = gamelib.UnitTracker(config)
+        # What the opponent did in past turns, used to pick the side to keep defended
+        self.opponent = gamelib.OpponentModel()
+        self.subscribe_frames(events=["spawn", "damage", "death", "breach", "attack", "selfDestruct"])
+        # Turns 0-4 recorded from earlier games with this config, replayed while our board matches
+        self.opening_book = gamelib.OpeningBook(config, version=gamelib.opening_book.source_hash(os.path.dirname(os.path.abspath(__file__))))
+        # Defenses of the first turns, (unit type, locations, turns, ...) rules executed in order
+        self.starter_build_order = gamelib.BuildOrder([
+            gamelib.BuildOrderRule(TURRET, [[3, 12], [24, 12], [10, 10], [17, 10]], 0, 0, upgrade=True),
+            gamelib.BuildOrderRule(WALL, [[2, 12], [2, 13], [4, 12], [23, 12], [24, 13], [25, 12]], 0, 0, remove=True),
+
+            gamelib.BuildOrderRule(WALL, [[1, 13], [2, 12], [3, 13], [24, 13], [25, 12], [26, 13]], 1, 1, remove=True),
+            gamelib.BuildOrderRule(SUPPORT, [[17, 6]], 1, 1, remove=True),
+
+            gamelib.BuildOrderRule(WALL, [[4, 11], [5, 10], [6, 9], [7, 8], [8, 7], [9, 6], [10, 5], [11, 4], [12, 3], [13, 2], [14, 2]], 2, 2),
+            gamelib.BuildOrderRule(WALL, [[15, 3], [16, 4], [17, 5], [18, 6], [19, 7], [20, 8]], 2, 2),
+            gamelib.BuildOrderRule(WALL, [[0, 13], [1, 13], [2, 13], [26, 13], [27, 13]], 2, 2, remove=True),
+            gamelib.BuildOrderRule(TURRET, [[10, 10], [17, 10]], 2, 2, build=False, remove=True),
+
+            gamelib.BuildOrderRule(WALL, [[0, 13], [1, 13], [2, 13], [4, 13], [24, 13], [25, 13], [26, 13], [27, 13]], 3, 3, remove=True),
+            gamelib.BuildOrderRule(WALL, [[4, 12], [21, 12], [22, 12], [23, 12], [19, 9], [19, 10], [20, 10]], 3, 3, remove=True),
+            gamelib.BuildOrderRule(TURRET, [[20, 9], [22, 11]], 3, 3, remove=True),
+
+            gamelib.BuildOrderRule(TURRET, [[20, 9], [22, 11]], 4, 4),
+            gamelib.BuildOrderRule(TURRET, [[20, 9]], 4, 4, upgrade=True, build=False),
+            gamelib.BuildOrderRule(WALL, [[0, 13], [1, 13], [2, 13], [4, 13], [24, 13], [25, 13], [26, 13], [27, 13], [4, 12], [23, 12]], 4, 4, remove=True),
+            ])
+        # Static defenses from turn 5 on, a later rule is only built once the required rules before it are complete
+        wall_locations_def = [[2,13],[3,13],[24,13],[25,13],[4,12],[23,12]]
+        self.static_build_order = gamelib.BuildOrder([
+            # (a) self repair 1
+            gamelib.BuildOrderRule(WALL, [[4,11],[5,10],[6,9],[7,8],[8,7],[9,6],[10,5],[11,4],[12,3],[13,2],[14,2],[15,3],[16,4],[17,5],[18,6],[19,7],[20,8]],
+                5, repair_threshold=.5, required=True, fallback=True),
+            # (b) self repair 2
+            gamelib.BuildOrderRule(TURRET, [[3,12],[24,12]], 5, upgrade=True, repair_threshold=.5, required=True, fallback=True),
+            # (c) self repair 3
+            gamelib.BuildOrderRule(TURRET, [[20,9],[22,11]], 5, upgrade=True, repair_threshold=.5, required=True, fallback=True),
+            # (d) (e) (f) turn based static defenses
+            gamelib.BuildOrderRule(WALL, wall_locations_def, 5, 20, remove=True, required=True),
+            gamelib.BuildOrderRule(WALL, wall_locations_def, 21, 50, repair_threshold=.5, required=True, fallback=True),
+            gamelib.BuildOrderRule(WALL, wall_locations_def, 51, 100, upgrade=True, repair_threshold=.5, required=True, fallback=True),
+            ], hierarchy=BUILDING_HIERARCHY)
+        # (g) extra static defenses, value per location
+        self.extra_defense_priorities = [
+            gamelib.BuildPriority(WALL, [[19,11],[20,11]], value=3.0),
+            gamelib.BuildPriority(TURRET, [[20,10],[19,10]], value=6.0),
+            gamelib.BuildPriority(TURRET, [[20,10],[19,10]], upgrade=True, value=5.0),
+            gamelib.BuildPriority(SUPPORT, [[14,9],[15,9]], value=6.0),
+            gamelib.BuildPriority(SUPPORT, [[14,9],[15,9]], upgrade=True, value=4.0),
+            gamelib.BuildPriority(WALL, [[19,11],[20,11]], upgrade=True, value=1.5),
+            gamelib.BuildPriority(TURRET, [[22,12]], value=4.0),
+            gamelib.BuildPriority(TURRET, [[22,12]], upgrade=True, value=3.0),
+            gamelib.BuildPriority(WALL, [[4,13],[5,13],[6,13],[17,12],[18,12],[19,12],[17,11],[18,11]], value=1.0),
+            gamelib.BuildPriority(SUPPORT, [[14,8],[15,8]], value=4.0),
+            gamelib.BuildPriority(SUPPORT, [[14,8],[15,8]], upgrade=True, value=2.0),
+            gamelib.BuildPriority(WALL, [[4,13],[5,13],[6,13],[17,12],[18,12],[19,12],[17,11],[18,11]], upgrade=True, value=0.5),
+            ]
+        self.extra_defense_allocator = gamelib.SPAllocator(self.extra_defense_priorities, hierarchy=BUILDING_HIERARCHY)
 
     def on_turn(self, turn_state):
         """
@@ -54,13 +129,36 @@ class AlgoStrategy(gamelib.AlgoCore):
         unit deployments, and transmitting your intended deployments to the
         game engine.
         """
-        game_state = gamelib.GameState(self.config, turn_state)
-        gamelib.debug_write('Performing turn {} of your custom algo strategy'.format(game_state.turn_number))
+        if self.opening_book.play(turn_state):
+            # No GameState on book turns, the next one built is diffed against the last one built
+            self.opponent.observe_turn_state(turn_state)
+            self.opponent.summary()
+            gamelib.debug_write('Played turn from the opening book, {} so far'.format(self.opening_book.hits))
+            return
+
+        game_state = self.create_game_state(turn_state)
         game_state.suppress_warnings(True)  #Comment or remove this line to enable warnings.
+        self.opponent.observe_state(game_state)
+        self.opponent.summary()
+        # Drops the events of an older round if no subscribed frame came in during the last action phase
+        self.round_events.start_turn(game_state.turn_number)
+
+        gamelib.debug_write('Performing turn {} of your custom algo strategy'.format(game_state.turn_number))
+
+        if self.round_events.breach_cells[1]:
+            gamelib.debug_write('Got scored on at: {}'.format(self.round_events.breach_cells[1]))
 
-        self.execute_strategy(game_state)
+        plan = self.planner.search(game_state, start_time=self.turn_start_time, warm_start=self.warm_start)
+        if plan is not None:
+            gamelib.debug_write('Applying {} after {} candidates'.format(plan, self.planner.evaluated))
+            plan.apply(game_state)
+        else:
+            self.execute_strategy(game_state)
 
-        game_state.submit_turn()
+        # Only the scripted turns are reproducible from the signature alone, and only if they were
+        # sent rather than replaced by the watchdog fallback
+        if game_state.submit_turn() and plan is None:
+            self.opening_book.record(turn_state, game_state)
 
 
     """
@@ -78,69 +176,20 @@ class AlgoStrategy(gamelib.AlgoCore):
         turn_number = game_state.turn_number
         if turn_number < 5:
             self.starter_build_defences(game_state)
+            game_state.record_fallback()
             self.starter_spawn_attackers(game_state)
         else:
             self.static_defense(game_state)
+            game_state.record_fallback()
             self.main_decision(game_state)
             self.extra_static_defense(game_state)
 
 
     def starter_build_defences(self, game_state):
         """
-        Starter strategy for building defenses
+        Starter strategy for building defenses, see starter_build_order
         """
-        turn_number = game_state.turn_number
-
-        if turn_number == 0:
-            turret_locations = [[3, 12], [24, 12], [10, 10], [17, 10]]
-            game_state.attempt_spawn(TURRET, turret_locations)
-            game_state.attempt_upgrade(turret_locations)
-
-            wall_locations = [[2, 12], [2, 13], [4, 12], [23, 12], [24, 13], [25, 12]]
-            game_state.attempt_spawn(WALL, wall_locations)
-
-            game_state.attempt_remove(wall_locations)
-        elif turn_number == 1:
-            wall_locations = [[1, 13], [2, 12], [3, 13], [24, 13], [25, 12], [26, 13]]
-            game_state.attempt_spawn(WALL, wall_locations)
-
-            support_locations = [[17, 6]]
-            game_state.attempt_spawn(SUPPORT, support_locations)
-
-            game_state.attempt_remove(wall_locations + support_locations)
-        elif turn_number == 2:
-            wall_locations_1 = [[4, 11], [5, 10], [6, 9], [7, 8], [8, 7], [9, 6], [10, 5], [11, 4], [12, 3], [13, 2], [14, 2]]
-            game_state.attempt_spawn(WALL, wall_locations_1)
-
-            wall_locations_2 = [[15, 3], [16, 4], [17, 5], [18, 6], [19, 7], [20, 8]]
-            game_state.attempt_spawn(WALL, wall_locations_2)
-
-            wall_locations_3 = [[0, 13], [1, 13], [2, 13], [26, 13], [27, 13]]
-            game_state.attempt_spawn(WALL, wall_locations_3)
-
-            game_state.attempt_remove(wall_locations_3 + [[10,10],[17,10]])
-        elif turn_number == 3:
-            wall_locations_1 = [[0, 13], [1, 13], [2, 13], [4, 13], [24, 13], [25, 13], [26, 13], [27, 13]]
-            game_state.attempt_spawn(WALL, wall_locations_1)
-
-            wall_locations_2 = [[4, 12], [21, 12], [22, 12],[23, 12], [19, 9], [19, 10], [20, 10]]
-            game_state.attempt_spawn(WALL, wall_locations_2)
-
-            turret_locations = [[20, 9], [22, 11]]
-            game_state.attempt_spawn(TURRET, turret_locations)
-
-            game_state.attempt_remove(wall_locations_1 + wall_locations_2 + turret_locations)
-        elif turn_number == 4:
-            turret_locations = [[20, 9], [22, 11]]
-            game_state.attempt_spawn(TURRET, turret_locations)
-            game_state.attempt_upgrade([[20, 9]])
-
-            wall_locations = [[0, 13], [1, 13], [2, 13], [4, 13], [24, 13], [25, 13], [26, 13], [27, 13], [4, 12], [23, 12]]
-            game_state.attempt_spawn(WALL, wall_locations)
-
-            game_state.attempt_remove(wall_locations)
-        elif turn_number >= 5:
-            return
+        self.starter_build_order.execute(game_state)
 
 
     def starter_spawn_attackers(self, game_state):
@@ -172,75 +221,22 @@ class AlgoStrategy(gamelib.AlgoCore):
 
 
     def static_defense(self, game_state):
-        """ Building and repairing static defenses.
+        """ Building and repairing static defenses, see static_build_order.
         """
-
-        # High priority static defenses
-        # (a) self repair 1
-        wall_locations_a = [[4,11],[5,10],[6,9],[7,8],[8,7],[9,6],[10,5],[11,4],[12,3],[13,2],\
-        [14,2],[15,3],[16,4],[17,5],[18,6],[19,7],[20,8]]
-        if not self.self_repair(game_state=game_state, locations=wall_locations_a, unit_type=WALL, hp_percent=.5, upgrade=False):
-            return
-        
-        # (b) self repair 2
-        upgraded_turret_locations_b = [[3,12],[24,12]]
-        if not self.self_repair(game_state=game_state, locations=upgraded_turret_locations_b, unit_type=TURRET, hp_percent=.5, upgrade=True):
-          return
-        
-        # TODO (c) self repair 3
-        upgraded_turret_locations_c = [[20,9],[22,11]]
-        if not self.self_repair(game_state=game_state, locations=upgraded_turret_locations_c, unit_type=TURRET, hp_percent=.5, upgrade=True):
-          return
-        
-        # TODO turn based static defenses (d) (e) (f)
-        turn_number = game_state.turn_number
-        if turn_number >= 5 and turn_number <= 20:
-            wall_locations_d = [[2,13],[3,13],[24,13],[25,13],[4,12],[23,12]]
-            defenses_built = self.build_defenses(game_state, wall_locations_d, WALL, mark_remove=True)
-            if defenses_built != len(wall_locations_d):
-                return
-        elif turn_number >= 21 and turn_number <= 50:
-            wall_locations_e = [[2,13],[3,13],[24,13],[25,13],[4,12],[23,12]]
-            if not self.self_repair(game_state=game_state, locations=wall_locations_e, unit_type=WALL, hp_percent=.5, upgrade=False):
-                return
-        elif turn_number >= 51 and turn_number <= 100:
-            upgraded_wall_locations_f = [[2,13],[3,13],[24,13],[25,13],[4,12],[23,12]]
-            if not self.self_repair(game_state=game_state, locations=upgraded_wall_locations_f, unit_type=WALL, hp_percent=.5, upgrade=True):
-                return
+        self.static_build_order.execute(game_state)
 
 
     def extra_static_defense(self, game_state):
-        # (g)
-        SP_before_extra = game_state.get_resource(SP)
-        for unit_type, locations, upgrade in [
-                (WALL, [[19,11],[20,11]], False),
-                (TURRET, [[20,10]], False),
-                (TURRET, [[19,10]], False),
-                (TURRET, [[20,10]], True),
-                (TURRET, [[19,10]], True),
-                (SUPPORT, [[14,9],[15,9]], False),
-                (SUPPORT, [[14,9],[15,9]], True),
-                (WALL, [[19,11],[20,11]], True),
-                (TURRET, [[22,12]], False),
-                (TURRET, [[22,12]], True),
-                (WALL, [[4,13],[5,13],[6,13],[17,12],[18,12],[19,12],[17,11],[18,11]], False),
-                (SUPPORT, [[14,8],[15,8]], False),
-                (SUPPORT, [[14,8],[15,8]], True),
-                (WALL, [[4,13],[5,13],[6,13],[17,12],[18,12],[19,12],[17,11],[18,11]], True),
-                ]:
-            if upgrade:
-                locations_to_upgrade = [location for location in locations \
-                    if game_state.contains_stationary_unit(location) and not game_state.contains_stationary_unit(location).upgraded]
-                if locations_to_upgrade:
-                    number_upgraded = game_state.attempt_upgrade(locations_to_upgrade)
-                    if len(locations_to_upgrade) != number_upgraded:
-                        return
-            else:
-                if not self.self_repair(game_state, locations, unit_type, hp_percent=0.5):
-                    return
-            if game_state.get_resource(SP) < SP_before_extra * 0.6:
-                gamelib.debug_write("\u001b[32m extra static defense in turn {}: {} {} \u001b[0m".format(game_state.turn_number, game_state.get_resource(SP), SP_before_extra))
-                return
+        # (g) Spend at most 40% of the SP left on extra defenses, the allocator picks the best combination
+        locations = [location for entry in self.extra_defense_priorities for location in entry.locations if not entry.upgrade]
+        locations_to_remove = self.find_low_hp_buildings(game_state=game_state, locations=locations, hp_percent=0.5)
+        if locations_to_remove:
+            game_state.attempt_remove(locations_to_remove)
+
+        budget = game_state.get_resource(SP) * 0.4
+        plan = self.extra_defense_allocator.solve(game_state, budget)
+        plan.apply(game_state)
+        gamelib.debug_write("\u001b[32m extra static defense in turn {}: value {} for {} SP \u001b[0m".format(game_state.turn_number, plan.score, budget))
 
 
 
@@ -267,48 +263,23 @@ class AlgoStrategy(gamelib.AlgoCore):
             else:
                 return False
         else:
-            build_status = game_state.attempt_spawn(unit_type, locations[:number_affordable])
+            savepoint = game_state.savepoint()
+            build_status = game_state.attempt_spawn_many(unit_type, locations[:number_affordable]).count(game_state.OK)
             if upgrade:
-                upgrade_status = game_state.attempt_upgrade(locations[:number_affordable])
+                upgrade_status = game_state.attempt_upgrade_many(locations[:number_affordable]).count(game_state.OK)
                 if build_status != upgrade_status:
-                    raise Exception("Number of spawn buildings does not match upgraded buildings.")
-                if number_affordable < len(locations):
-                    build_status += self.build_defenses(game_state, locations[number_affordable:], unit_type, upgrade=False, mark_remove=mark_remove)
+                    # Some buildings could not be upgraded, build all of them without upgrades instead
+                    gamelib.debug_write("Number of spawn buildings does not match upgraded buildings, building without upgrades.")
+                    game_state.rollback(savepoint)
+                    return self.build_defenses(game_state, locations, unit_type, upgrade=False, mark_remove=mark_remove)
+            game_state.release(savepoint)
+            if upgrade and number_affordable < len(locations):
+                build_status += self.build_defenses(game_state, locations[number_affordable:], unit_type, upgrade=False, mark_remove=mark_remove)
             if mark_remove:
-                game_state.attempt_remove(locations[:number_affordable])
+                game_state.attempt_remove_many(locations[:number_affordable])
             return build_status
 
 
-    def self_repair(self, game_state, locations, unit_type, hp_percent, upgrade=False):
-        """ Self repair buildings
-
-        If the buildings don't exist, build them.
-        If the buildings are below the hp_percent, mark them for remove.
-
-        Build defenses with hierarchy.
-        """
-        building_hierarchy = [TURRET, WALL, SUPPORT]
-
-        hierarchy_index = building_hierarchy.index(unit_type)
-
-        # find buildings to build
-        locations_to_build = [location for location in locations if not game_state.contains_stationary_unit(location)]
-        number_to_build = len(locations_to_build)
-
-        # find buildings to remove
-        locations_to_remove = self.find_low_hp_buildings(game_state=game_state, locations=locations, hp_percent=hp_percent)
-        if locations_to_remove:
-            game_state.attempt_remove(locations_to_remove)
-
-        # build defenses in hierarchy
-        defenses_built = 0
-        for target_type in building_hierarchy[hierarchy_index:]:
-            if locations_to_build:
-                defenses_built += self.build_defenses(game_state, locations=locations_to_build[:], unit_type=target_type, upgrade=upgrade, mark_remove=False)
-                locations_to_build = locations_to_build[defenses_built:]
-        return defenses_built == number_to_build
-
-
     def find_low_hp_buildings(self, game_state, locations, hp_percent):
         """ Find the buildings with hit points below hp_percent.
         """
@@ -393,84 +364,27 @@ class AlgoStrategy(gamelib.AlgoCore):
         """ The decision function for the main stage of the game.
         """
         x, y, z, x_1, y_1, z_1, w, w_1, mp, sp, health, r, m = self.gather_info_from_gamestate(game_state)
-        a, b, c, d, e, f, d, h, mp_l, sp_l = 0, 0, 0, 0, 0, 0, 0, 0, 0, 0
-
         gamelib.debug_write(f"\u001b[32m decision_function at round {r}: " \
             f"x={x} y={y} z={z} x_1={x_1} y_1={y_1} z_1={z_1} w={w} w_1={w_1} mp={mp} sp={sp} health={health} r={r} \u001b[0m")
 
         # TODO main decision for the strategy
         #  e = (5<= r < 20) + 2*(20 <= r <40) + 3*(40 <= r < 60) + 4*(60 <= r < 80) + 5*(r <= 100)
         # TODO if r in [0, 100) the following is the optimal approach
-        e = r // 20 + 1
-        term_a = self.g_function((x + .25*z)*w, y*w, w)
-        term_b = self.g_function(x + 0.25*z, y, w)
-        term_a_1 = self.g_function((x_1+.25*z_1)*w_1, y_1*w_1, w_1)
-        term_b_1 = self.g_function(x_1+0.25*z_1, y_1, w_1)
-
-        gamelib.debug_write(f"\u001b[32m decision_function at round {r}: term_a={term_a}, term_b={term_b}, term_a_1={term_a_1}, term_b_1={term_b_1} \u001b[0m")
-
-        if (mp <= term_a - 5.5*w + term_b + 4 + r//20) and (mp <= term_a_1 - 5.5*w_1 + term_b_1 + 4 + r//20):
-            f = 0
-            self.continuous_f_0 += 1
-            c = 0
-            a = 0
-            b = 0
-        elif ((term_a - 5.5*w + term_b) == 0) or ((term_a_1 - 5.5*w_1 + term_b_1) == 0):
-            if mp >= 10:
-                self.continuous_f_0 = 0
-                c = 2
-                a = 6
-                b = mp - a
-                if ((term_a - 5.5*w + term_b) == 0) and ((term_a_1 - 5.5*w_1 + term_b_1) != 0):
-                    f = 1
-                elif ((term_a - 5.5*w + term_b) != 0) and ((term_a_1 - 5.5*w_1 + term_b_1) == 0):
-                    f = 2
-                else:
-                    f = random.randint(1, 2)
-            else:
-                f = 0
-                self.continuous_f_0 += 1
-                c = 0
-                a = 0
-                b = 0
-        # TODO the above condition may not be necessary since all variables are intialed as 0
-        elif (term_b - 5.5*w)/(term_a - 5.5*w + term_b) >= (term_b_1 - 5.5*w_1)/(term_a_1 - 5.5*w_1 + term_b_1):
-            f = 1
-            self.continuous_f_0 = 0
-            c = 2
-            a = term_a_1
-            b = mp - a
-        elif (term_b - 5.5*w)/(term_a - 5.5*w + term_b) < (term_b_1 - 5.5*w_1)/(term_a_1 - 5.5*w_1 + term_b_1):
-            f = 2
-            self.continuous_f_0 = 0
-            c = 2
-            a = term_a
-            b = mp - a
-
-        if f == 0 and self.continuous_f_0 == 9:
-            if m == 1:
-                d = int((mp - e)//3)
-            elif m == 0:
-                h = int(mp - e)
-            self.continuous_f_0 = 0
-        else:
-            d = 0
-
-
-        a = int(a)
-        b = int(b)
-
-        sp_l = sp - c
-        mp_l = mp - a - b - 2*d - e
+        # The O-function itself lives in o_function.py so it can be tuned offline
+        a, b, c, d, e, f, h, mp_l, sp_l, self.continuous_f_0 = o_function.decide(
+            x, y, z, x_1, y_1, z_1, w, w_1, mp, sp, r, m, self.continuous_f_0, self.o_parameters,
+            tie_break=self.likely_attacked_side)
 
         return a, b, c, d, e, f, h, mp, sp, mp_l, sp_l
 
-    def g_function(self, i, j, t):
-        """A function used in decision_function.
-        """
-        g = 5.5*t + 2*i + 3*j
+    def likely_attacked_side(self):
+        """ Break ties of the O-function towards the side the opponent attacks more often.
 
-        return g
+        f == 1 keeps the left active defense, f == 2 the right one.
+        """
+        left = self.opponent.attack_side_probability(gamelib.opponent.LEFT)
+        right = self.opponent.attack_side_probability(gamelib.opponent.RIGHT)
+        return 1 if left >= right else 2
 
     def gather_info_from_gamestate(self, game_state):
         """ Gather information from GameState for the decision function.
@@ -559,6 +473,31 @@ class AlgoStrategy(gamelib.AlgoCore):
 
         return x, y, z, x_1, y_1, z_1, w, w_1, mp, sp, health, r, m
 
+    def speculate(self, config, frames, warm_start):
+        """
+        Runs on the background planner thread, see AlgoCore.enable_background_planning.
+        Keeps a plan rebuilding our structures destroyed so far this round, extended with every batch of frames.
+        """
+        plan = warm_start[0] if warm_start else gamelib.Plan("rebuild")
+        for frame in frames:
+            if not gamelib.frames.frame_has_events(frame, ["death"]):
+                continue
+            for location, unit_type, _, player, removed in json.loads(frame)["events"]["death"]:
+                # Structures we removed ourselves are not rebuilt
+                if int(player) == 1 and unit_type in (0, 1, 2) and not removed:
+                    plan.spawn(config["unitInformation"][unit_type]["shorthand"], [location])
+        return [plan]
+
+    def on_action_frame(self, turn_string):
+        """
+        Decode the subscribed action frames once and feed the round event
+        aggregates and the unit tracker.
+        """
+        state = json.loads(turn_string)
+        self.round_events.add_frame(state)
+        self.unit_tracker.add_frame(state)
+        self.opponent.add_frame(state)
+
     def get_active_defense_locations(self, defense_type):
         """ Return the coordinates for active defense strategy
 
@@ -16,6 +16,39 @@ Investigating it is useful for advanced players interested in getting data from
 The Navigation class in navigation.py contains functions related to pathfinding, which are used by GameState in pathing related functions. 
 Investigating it is useful for advanced player who want to optimize the slow default pathing algorithm we provide. \n 
 
+The AnytimePlanner class in planner.py searches candidate Plans until a time budget runs out and keeps the best one found. 
+Investigating it is useful for players who want to compare several build and deploy plans each turn without risking a timeout. \n
+
+The BackgroundPlanner class in background.py runs speculative planning for the next turn on a worker thread while action frames arrive. 
+AlgoCore.enable_background_planning sets it up, investigating it is useful for players with expensive turns. \n
+
+The TurnWatchdog class in watchdog.py submits a fallback turn if the strategy overruns a soft deadline. 
+AlgoCore.enable_watchdog sets it up, and GameState.record_fallback records the turn it should submit. \n
+
+frames.py contains helpers to inspect raw action frames without decoding them, used by AlgoCore.subscribe_frames 
+to skip the frames a strategy is not interested in. \n
+
+The RoundEvents class in events.py decodes the events of action frames into typed columns and keeps per-round aggregates 
+such as structure damage, breach locations and units lost. Investigating it is useful for players reacting to the last action phase. \n
+
+The UnitTracker class in tracking.py follows units across turns and frames by their engine IDs, 
+recording when each was built and upgraded, its health over time and what destroyed it. \n
+
+The BoardDiff class in board_diff.py describes what changed on the board between two turns. 
+AlgoCore.create_game_state builds each GameState from the previous one, reusing unchanged units and carrying over LocationCaches. \n
+
+The SPAllocator class in allocation.py spends an SP budget on a declarative list of BuildPriorities, 
+choosing the combination of builds and upgrades with the highest total value instead of filling the list greedily. \n
+
+The BuildOrder class in build_order.py executes a table of BuildOrderRules, each describing which structures should 
+stand where during a window of turns, with repairs, upgrades and removals done in batches from the indexed board. \n
+
+The OpponentModel class in opponent.py accumulates what the opponent did in past turns, such as the MP they attack with, 
+the side they attack and their rebuilds, and answers questions like the probability they attack our left side this turn. \n
+
+The OpeningBook class in opening_book.py caches the build and deploy strings of the scripted opening turns on disk per game config, 
+so later games submit them without building a GameState as long as the board matches the recorded one. \n
+
 util.py contains a small handful of functions that help with communication, including the debug-printing function, debug_write().
 """
 
@@ -24,6 +57,17 @@ from .util import debug_write
 from .game_state import GameState
 from .unit import GameUnit
 from .game_map import GameMap
+from .planner import Plan, AnytimePlanner
+from .background import BackgroundPlanner
+from .watchdog import TurnWatchdog
+from .frames import FrameSubscription
+from .events import RoundEvents
+from .tracking import UnitTracker
+from .board_diff import BoardDiff, LocationCache
+from .allocation import BuildPriority, SPAllocator
+from .build_order import BuildOrder, BuildOrderRule
+from .opponent import OpponentModel, OpponentTurn
+from .opening_book import OpeningBook
 
-__all__ = ["algocore", "game_state", "game_map", "navigation", "unit", "util"]
+__all__ = ["algocore", "allocation", "background", "board_diff", "build_order", "events", "frames", "game_state", "game_map", "navigation", "opening_book", "opponent", "planner", "tracking", "unit", "util", "watchdog"]
  
\ No newline at end of file
@@ -1,7 +1,11 @@
 import json
+import time
 
 from .game_state import GameState
-from .util import get_command, debug_write, BANNER_TEXT, send_command
+from .background import BackgroundPlanner
+from .watchdog import TurnWatchdog
+from .frames import FrameSubscription, parse_turn_info
+from .util import get_command, debug_write, BANNER_TEXT, send_turn, set_turn_watchdog
 
 class AlgoCore(object):
     """
@@ -10,10 +14,23 @@ class AlgoCore(object):
 
     Attributes :
         * config (JSON): json object containing information about the game
+        * turn_start_time (float): time.monotonic() value at which the current turn message arrived
+        * background_planner (:obj: BackgroundPlanner): Speculative planner fed with action frames, None if disabled
+        * warm_start: The result of background planning for the current turn, None if disabled or unfinished
+        * watchdog (:obj: TurnWatchdog): Submits a fallback turn when the soft deadline is reached, None if disabled
+        * frame_subscriptions (list): FrameSubscriptions selecting the action frames to handle, every frame is passed to on_action_frame if empty
+        * previous_state (:obj: GameState): The last GameState built with create_game_state
 
     """
     def __init__(self):
         self.config = None
+        self.turn_start_time = None
+        self.background_planner = None
+        self.background_wait = 0
+        self.warm_start = None
+        self.watchdog = None
+        self.frame_subscriptions = []
+        self.previous_state = None
 
     def on_game_start(self, config):
         """
@@ -23,6 +40,70 @@ class AlgoCore(object):
         """
         self.config = config
 
+    def enable_background_planning(self, speculate, wait=0.1):
+        """
+        Starts speculative planning for the next turn on a worker thread. \n
+        Every action frame is passed to speculate(config, frames, warm_start) in the background,
+        its latest result is available as self.warm_start during the next on_turn.
+        When the turn message arrives, up to wait seconds are given to the last frames to be processed.
+        Call it from on_game_start, once the config is known.
+        """
+        if self.background_planner is not None:
+            self.background_planner.stop()
+        self.background_wait = wait
+        self.background_planner = BackgroundPlanner(speculate, self.config)
+        self.background_planner.start()
+
+    def enable_watchdog(self, soft_deadline):
+        """
+        Starts a watchdog for every turn, measured from the arrival of the turn message. \n
+        If the strategy has not submitted its turn soft_deadline seconds later, the turn last recorded with
+        GameState.record_fallback (or an empty turn) is submitted instead and later submissions in that
+        turn are suppressed. Pass None to disable it again.
+        """
+        if self.watchdog is not None:
+            self.watchdog.cancel()
+        self.watchdog = TurnWatchdog(soft_deadline) if soft_deadline is not None else None
+        set_turn_watchdog(self.watchdog)
+
+    def subscribe_frames(self, events=None, every=None, last_only=False, handler=None):
+        """
+        Only handle the action frames you need. \n
+        Once a subscription exists, on_action_frame (or the given handler) only receives frames containing one of
+        the given event types (e.g. ["breach", "death"]) and/or whose frame number is a multiple of every.
+        With last_only, only the final frame of each action phase is received, right before the next on_turn.
+        Frames no subscription wants are skipped after a cheap check of the raw string, without being decoded.
+        """
+        subscription = FrameSubscription(handler or self.on_action_frame, events, every, last_only)
+        self.frame_subscriptions.append(subscription)
+        return subscription
+
+    def _dispatch_action_frame(self, frame_string, frame_number):
+        if not self.frame_subscriptions:
+            self.on_action_frame(frame_string)
+            return
+        delivered = []
+        for subscription in self.frame_subscriptions:
+            if subscription.last_only:
+                subscription.pending = frame_string
+            elif subscription.handler not in delivered and subscription.matches(frame_string, frame_number):
+                delivered.append(subscription.handler)
+                subscription.handler(frame_string)
+
+    def _flush_action_frames(self):
+        for subscription in self.frame_subscriptions:
+            subscription.flush()
+
+    def create_game_state(self, turn_state):
+        """
+        Builds the GameState of a turn from the one of the previous turn. \n
+        Unchanged units are reused, game_state.board_diff lists what changed since the previous turn
+        and values stored in game_state.location_cache survive where the board did not change.
+        """
+        game_state = GameState(self.config, turn_state, self.previous_state)
+        self.previous_state = game_state
+        return game_state
+
     def on_turn(self, game_state):
         """
         This step function is called at the start of each turn.
@@ -31,8 +112,7 @@ class AlgoCore(object):
         algo_strategy.py inherits from AlgoCore and overrides this on turn function. 
         Adjusting the on_turn function in algo_strategy is the main way to adjust your algo's logic. 
         """
-        send_command("[]")
-        send_command("[]")
+        send_turn("[]", "[]")
     
     def on_action_frame(self, action_frame_game_state):
         """
@@ -57,6 +137,7 @@ class AlgoCore(object):
             # Note: Python blocks and hangs on stdin. Can cause issues if connections aren't setup properly and may need to
             # manually kill this Python program.
             game_state_string = get_command()
+            message_time = time.monotonic()
             if "replaySave" in game_state_string:
                 """
                 This means this must be the config file. So, load in the config file as a json and add it to your AlgoStrategy class.
@@ -64,24 +145,40 @@ class AlgoCore(object):
                 parsed_config = json.loads(game_state_string)
                 self.on_game_start(parsed_config)
             elif "turnInfo" in game_state_string:
-                state = json.loads(game_state_string)
-                stateType = int(state.get("turnInfo")[0])
+                # Read turnInfo straight from the string, most messages are action frames we may not need to decode
+                turn_info = parse_turn_info(game_state_string)
+                if turn_info is None:
+                    turn_info = json.loads(game_state_string).get("turnInfo")
+                stateType = int(turn_info[0])
+                if stateType != 1:
+                    self._flush_action_frames()
                 if stateType == 0:
                     """
                     This is the game turn game state message. Algo must now print to stdout 2 lines, one for build phase one for
                     deploy phase. Printing is handled by the provided functions.
                     """
+                    self.turn_start_time = message_time
+                    if self.watchdog is not None:
+                        self.watchdog.start_turn(message_time)
+                    if self.background_planner is not None:
+                        self.warm_start = self.background_planner.collect(self.background_wait)
                     self.on_turn(game_state_string)
                 elif stateType == 1:
                     """
                     If stateType == 1, this game_state_string string represents a single frame of an action phase
                     """
-                    self.on_action_frame(game_state_string)
+                    if self.background_planner is not None:
+                        self.background_planner.submit(game_state_string)
+                    self._dispatch_action_frame(game_state_string, int(turn_info[2]))
                 elif stateType == 2:
                     """
                     This is the end game message. This means the game is over so break and finish the program.
                     """
                     debug_write("Got end state, game over. Stopping algo.")
+                    if self.background_planner is not None:
+                        self.background_planner.stop()
+                    if self.watchdog is not None:
+                        self.watchdog.cancel()
                     break
                 else:
                     """
@@ -0,0 +1,182 @@
+import math
+
+from .planner import Plan
+
+
+class BuildPriority:
+    """One entry of a declarative build priority spec.
+
+    Every location of the entry that ends the turn holding a structure of unit_type (upgraded, if upgrade is set)
+    earns value. Structures that are already there earn it for free.
+
+    Attributes :
+        * unit_type (string): The structure wanted at the locations
+        * locations (list): The locations of the entry
+        * upgrade (bool): If the structures should also be upgraded
+        * value (float): The value earned per location
+
+    """
+    def __init__(self, unit_type, locations, upgrade=False, value=1.0):
+        self.unit_type = unit_type
+        self.locations = locations
+        self.upgrade = upgrade
+        self.value = value
+
+    def __str__(self):
+        return "BuildPriority {}{} x{} value: {}".format(self.unit_type, " upgraded" if self.upgrade else "", len(self.locations), self.value)
+
+    def __repr__(self):
+        return self.__str__()
+
+
+class SPAllocator:
+    """Chooses what to build and upgrade for a list of BuildPriorities with the highest total value within an SP budget.
+
+    Each location is a group of mutually exclusive options, one per structure type and upgrade state it could
+    end the turn with, so the whole spec is solved as a multiple-choice knapsack by dynamic programming over
+    the budget in steps of resolution SP. Entries can fall back to the types after their own in hierarchy,
+    e.g. [TURRET, WALL, SUPPORT] lets a turret entry be filled by a wall, for fallback_value times its value
+    for each step down the hierarchy.
+
+    Attributes :
+        * priorities (list): The BuildPriorities to satisfy
+        * hierarchy (list): Structure types in fallback order, no fallback if None
+        * fallback_value (float): Factor applied to the value of an entry for each step down the hierarchy
+        * resolution (float): The SP granularity of the solver, costs are rounded up to a multiple of it
+
+    """
+    def __init__(self, priorities, hierarchy=None, fallback_value=0.5, resolution=1.0):
+        self.priorities = priorities
+        self.hierarchy = hierarchy
+        self.fallback_value = fallback_value
+        self.resolution = resolution
+
+    def __match(self, entry, unit_type):
+        """The factor of the value of entry earned by a structure of unit_type, 0 if it does not count
+        """
+        if unit_type == entry.unit_type:
+            return 1.0
+        if self.hierarchy is None or entry.unit_type not in self.hierarchy or unit_type not in self.hierarchy:
+            return 0.0
+        steps = self.hierarchy.index(unit_type) - self.hierarchy.index(entry.unit_type)
+        return self.fallback_value ** steps if steps > 0 else 0.0
+
+    def options(self, game_state):
+        """Lists the choices for every location of the spec
+
+        Returns:
+            A list of (location, options) pairs where options is a list of (sp_cost, value, unit_type, upgrade)
+            for each final state of the location, not counting the option of leaving it empty
+
+        """
+        entries_at = {}
+        order = []
+        for entry in self.priorities:
+            for location in entry.locations:
+                key = (int(location[0]), int(location[1]))
+                if key not in entries_at:
+                    entries_at[key] = []
+                    order.append(key)
+                entries_at[key].append(entry)
+
+        from .game_state import UNIT_TYPE_TO_INDEX
+        costs = {}
+        groups = []
+        for key in order:
+            entries = entries_at[key]
+            existing = game_state.contains_stationary_unit(list(key))
+            if existing:
+                candidates = [existing.unit_type]
+            else:
+                candidates = []
+                for entry in entries:
+                    for unit_type in [entry.unit_type] + self.__fallbacks(entry.unit_type):
+                        if unit_type not in candidates:
+                            candidates.append(unit_type)
+
+            options = []
+            for unit_type in candidates:
+                if unit_type not in costs:
+                    upgradable = game_state.config["unitInformation"][UNIT_TYPE_TO_INDEX[unit_type]].get("upgrade") is not None
+                    costs[unit_type] = (game_state.type_cost(unit_type)[game_state.SP],
+                        game_state.type_cost(unit_type, True)[game_state.SP] if upgradable else None)
+                build_cost, upgrade_cost = costs[unit_type]
+                for upgrade in (False, True):
+                    if upgrade and upgrade_cost is None:
+                        continue
+                    if existing:
+                        if existing.upgraded and not upgrade:
+                            continue
+                        cost = upgrade_cost if upgrade and not existing.upgraded else 0
+                    else:
+                        cost = build_cost + (upgrade_cost if upgrade else 0)
+                    value = 0.0
+                    for entry in entries:
+                        if upgrade or not entry.upgrade:
+                            value += entry.value * self.__match(entry, unit_type)
+                    if value > 0 or cost == 0:
+                        options.append((cost, value, unit_type, upgrade))
+            groups.append((list(key), options))
+        return groups
+
+    def __fallbacks(self, unit_type):
+        if self.hierarchy is None or unit_type not in self.hierarchy:
+            return []
+        return self.hierarchy[self.hierarchy.index(unit_type) + 1:]
+
+    def solve(self, game_state, budget=None):
+        """Finds the allocation with the highest total value
+
+        Args:
+            game_state: The GameState to plan for, existing structures are taken into account
+            budget: The SP that may be spent, all of the SP held if None
+
+        Returns:
+            A Plan spawning and upgrading the chosen structures, its score is the total value of the allocation
+
+        """
+        if budget is None:
+            budget = game_state.get_resource(game_state.SP)
+        capacity = max(0, int(math.floor(budget / self.resolution + 1e-9)))
+        groups = self.options(game_state)
+
+        # best[b] is the highest value reachable with at most b units of SP, picks[g][b] the option group g used for it
+        best = [0.0] * (capacity + 1)
+        picks = []
+        for _, options in groups:
+            new_best = best[:]
+            pick = [-1] * (capacity + 1)
+            for i, (cost, value, _, _) in enumerate(options):
+                units = int(math.ceil(cost / self.resolution - 1e-9))
+                for b in range(units, capacity + 1):
+                    candidate = best[b - units] + value
+                    if candidate > new_best[b] + 1e-9:
+                        new_best[b] = candidate
+                        pick[b] = i
+            best = new_best
+            picks.append(pick)
+
+        chosen = []
+        b = capacity
+        for (location, options), pick in zip(reversed(groups), reversed(picks)):
+            i = pick[b]
+            if i >= 0:
+                cost = options[i][0]
+                b -= int(math.ceil(cost / self.resolution - 1e-9))
+                chosen.append((location, options[i]))
+        chosen.reverse()
+
+        plan = Plan("allocation")
+        plan.score = best[capacity]
+        builds = {}
+        upgrades = []
+        for location, (cost, _, unit_type, upgrade) in chosen:
+            if not game_state.contains_stationary_unit(location):
+                builds.setdefault(unit_type, []).append(location)
+            if upgrade and cost > 0:
+                upgrades.append(location)
+        for unit_type, locations in builds.items():
+            plan.spawn(unit_type, locations)
+        if upgrades:
+            plan.upgrade(upgrades)
+        return plan
@@ -0,0 +1,98 @@
+import threading
+
+from .util import debug_write
+
+
+class BackgroundPlanner:
+    """Runs speculative planning for the next turn on a worker thread while the action phase is streamed.
+
+    The speculate function is called as speculate(config, frames, warm_start), where frames is the list of
+    action frame strings received since its previous call and warm_start is the value it returned last time
+    (None at the start of a round). Whatever it returns is handed to the next on_turn through collect().
+    Frames that arrive while speculate is running are batched for its next call, so no breach or
+    death event is ever skipped.
+
+    Attributes :
+        * speculate (function): The speculative planning function
+        * config (JSON): json object containing information about the game, passed to speculate
+
+    """
+    def __init__(self, speculate, config=None):
+        self.speculate = speculate
+        self.config = config
+        self._condition = threading.Condition()
+        self._frames = []
+        self._warm_start = None
+        self._busy = False
+        self._round = 0
+        self._running = False
+        self._thread = None
+
+    def start(self):
+        """Starts the worker thread, does nothing if it is already running
+        """
+        with self._condition:
+            if self._running:
+                return
+            self._running = True
+        # daemon so the algo can exit even if speculate is stuck
+        self._thread = threading.Thread(target=self._run, name="background-planner", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stops the worker thread once its current speculation is done
+        """
+        with self._condition:
+            self._running = False
+            self._condition.notify_all()
+
+    def submit(self, frame_string):
+        """Queues an action frame for speculative planning
+        """
+        with self._condition:
+            self._frames.append(frame_string)
+            self._condition.notify_all()
+
+    def collect(self, timeout=0):
+        """Returns the warm start of the finished round and resets it for the next one.
+
+        Args:
+            timeout: Seconds to wait for queued frames to be processed. With the default of 0 the
+                latest finished result is returned immediately and queued frames are dropped.
+
+        Returns:
+            The value last returned by speculate, or None if it never finished
+
+        """
+        with self._condition:
+            if timeout:
+                self._condition.wait_for(lambda: not self._frames and not self._busy, timeout)
+            warm_start = self._warm_start
+            self._warm_start = None
+            self._frames = []
+            self._round += 1
+            return warm_start
+
+    def _run(self):
+        while True:
+            with self._condition:
+                self._condition.wait_for(lambda: self._frames or not self._running)
+                if not self._running:
+                    return
+                frames = self._frames
+                self._frames = []
+                warm_start = self._warm_start
+                current_round = self._round
+                self._busy = True
+
+            try:
+                warm_start = self.speculate(self.config, frames, warm_start)
+            except Exception as e:
+                debug_write("Background planning failed: {}".format(e))
+
+            with self._condition:
+                # collect() may have reset the round while speculate was running, drop stale results
+                if current_round == self._round:
+                    self._warm_start = warm_start
+                self._busy = False
+                self._condition.notify_all()
@@ -0,0 +1,99 @@
+import random
+
+_ZOBRIST_SEED = 28
+_zobrist_table = {}
+
+
+def zobrist_key(location, player_index, unit_type, upgraded):
+    """A random 64 bit key for a structure, XOR the keys of every structure to hash a board
+
+    Keys are generated from a fixed seed on first use, so they are the same in every game.
+    """
+    key = (location[0], location[1], player_index, unit_type, upgraded)
+    value = _zobrist_table.get(key)
+    if value is None:
+        value = random.Random("{}-{}".format(_ZOBRIST_SEED, key)).getrandbits(64)
+        _zobrist_table[key] = value
+    return value
+
+
+class BoardDiff:
+    """The changes between the boards of two consecutive turn states, by engine unit ID.
+
+    Attributes :
+        * added (list): IDs of units that were not on the previous board
+        * removed (list): IDs of units that are gone
+        * damaged (list): IDs of units whose health changed
+        * upgraded (list): IDs of units that were upgraded
+        * flagged (list): IDs of units whose pending removal flag changed
+        * touched_locations (set): (x, y) of every cell affected by any of the above
+
+    """
+    def __init__(self):
+        self.added = []
+        self.removed = []
+        self.damaged = []
+        self.upgraded = []
+        self.flagged = []
+        self.touched_locations = set()
+
+    def __len__(self):
+        return len(self.added) + len(self.removed) + len(self.damaged) + len(self.upgraded) + len(self.flagged)
+
+    def touches(self, location, radius=0):
+        """Checks if the diff changed any cell within radius of a location
+        """
+        if radius == 0:
+            return tuple(location) in self.touched_locations
+        x, y = location
+        limit = radius * radius
+        for tx, ty in self.touched_locations:
+            if (tx - x) ** 2 + (ty - y) ** 2 <= limit:
+                return True
+        return False
+
+    def __str__(self):
+        return "BoardDiff added: {} removed: {} damaged: {} upgraded: {} flagged: {}".format(
+            len(self.added), len(self.removed), len(self.damaged), len(self.upgraded), len(self.flagged))
+
+    def __repr__(self):
+        return self.__str__()
+
+
+class LocationCache:
+    """Values derived from the board, such as threat or path fields, keyed by location.
+
+    When a GameState is built from the previous one, each of its caches is carried over and only
+    the entries within radius of a cell touched by the BoardDiff are dropped.
+    Values should be derived from the parsed board, not from hypothetical units added with attempt_spawn.
+
+    Attributes :
+        * radius (float): How far a change to the board reaches when invalidating entries
+        * values (dict): Maps (x, y) to the cached value
+
+    """
+    def __init__(self, radius=0):
+        self.radius = radius
+        self.values = {}
+
+    def __contains__(self, location):
+        return tuple(location) in self.values
+
+    def __getitem__(self, location):
+        return self.values[tuple(location)]
+
+    def __setitem__(self, location, value):
+        self.values[tuple(location)] = value
+
+    def __len__(self):
+        return len(self.values)
+
+    def get(self, location, default=None):
+        return self.values.get(tuple(location), default)
+
+    def invalidate(self, diff):
+        """Drops every entry within radius of a cell touched by the diff
+        """
+        if not diff.touched_locations:
+            return
+        self.values = {location: value for location, value in self.values.items() if not diff.touches(location, self.radius)}
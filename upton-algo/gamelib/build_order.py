@@ -0,0 +1,129 @@
+from .allocation import BuildPriority, SPAllocator
+
+
+class BuildOrderRule:
+    """One row of a build order: which structures should stand where during a window of turns.
+
+    Attributes :
+        * unit_type (string): The structure wanted at the locations
+        * locations (list): The locations of the rule
+        * first_turn (int): The first turn the rule is active
+        * last_turn (int): The last turn the rule is active, None if it stays active
+        * upgrade (bool): If the structures of unit_type at the locations should be upgraded
+        * repair_threshold (float): Structures at the locations whose health is below this fraction of their
+          max health are flagged for removal so they can be rebuilt. None to never repair
+        * remove (bool): If the structures at the locations should be flagged for removal once built
+        * build (bool): If missing structures should be built, False for rules that only upgrade or remove
+        * required (bool): If the rule is not complete (a location is still empty), the rules after it are skipped
+        * fallback (bool): If locations that cannot afford unit_type may get a type further down the hierarchy of the BuildOrder
+
+    """
+    def __init__(self, unit_type, locations, first_turn=0, last_turn=None, upgrade=False, repair_threshold=None,
+            remove=False, build=True, required=False, fallback=False):
+        self.unit_type = unit_type
+        self.locations = locations
+        self.first_turn = first_turn
+        self.last_turn = last_turn
+        self.upgrade = upgrade
+        self.repair_threshold = repair_threshold
+        self.remove = remove
+        self.build = build
+        self.required = required
+        self.fallback = fallback
+
+    def active(self, turn_number):
+        """Checks if the rule applies to the given turn
+        """
+        return turn_number >= self.first_turn and (self.last_turn is None or turn_number <= self.last_turn)
+
+    def __str__(self):
+        return "BuildOrderRule {} x{} turns {}-{}".format(self.unit_type, len(self.locations), self.first_turn, self.last_turn)
+
+    def __repr__(self):
+        return self.__str__()
+
+
+class BuildOrder:
+    """Executes a table of BuildOrderRules against a GameState, in order.
+
+    The structures at the locations of the active rules are read from the indexed board once. Each rule in turn
+    flags its low health structures for removal, then spawns, upgrades and removes its structures with the
+    batched GameState calls. Rules with fallback fill their missing locations with an SPAllocator, so structures
+    that cannot be afforded fall back down the hierarchy. A required rule left incomplete stops the order, the
+    repairs of the rules after it included.
+
+    Attributes :
+        * rules (list): The BuildOrderRules, in priority order
+        * hierarchy (list): Structure types in fallback order, e.g. [TURRET, WALL, SUPPORT]
+
+    """
+    def __init__(self, rules, hierarchy=None):
+        self.rules = rules
+        self.hierarchy = hierarchy
+
+    def active_rules(self, turn_number):
+        return [rule for rule in self.rules if rule.active(turn_number)]
+
+    def execute(self, game_state):
+        """Applies the rules active this turn
+
+        Args:
+            game_state: The GameState to spend
+
+        Returns:
+            True if every required rule was completed, False if a required rule stopped the build order
+
+        """
+        game_map = game_state.game_map
+        pending_removal = game_map.pending_removal_locations()
+        # Each location is read from the board once, even if several rules share it
+        structures = {}
+
+        for rule in self.active_rules(game_state.turn_number):
+            keys = [(int(location[0]), int(location[1])) for location in rule.locations]
+            for key in keys:
+                if key not in structures:
+                    structures[key] = game_map.structure_at(key)
+            missing = [location for location, key in zip(rule.locations, keys) if structures[key] is None]
+
+            # Repairs belong to the rule, a required rule that stops the order also stops the repairs after it
+            if rule.repair_threshold is not None:
+                low_health = [list(key) for key in keys if structures[key] is not None and key not in pending_removal and
+                    structures[key].health / structures[key].max_health < rule.repair_threshold]
+                if low_health:
+                    game_state.attempt_remove_many(low_health)
+
+            if rule.fallback and rule.build:
+                # Only the missing structures are built and upgraded, the standing ones are left as they are
+                if missing:
+                    priorities = [BuildPriority(rule.unit_type, missing)]
+                    if rule.upgrade:
+                        priorities.append(BuildPriority(rule.unit_type, missing, upgrade=True))
+                    SPAllocator(priorities, hierarchy=self.hierarchy).solve(game_state).apply(game_state)
+            elif rule.fallback and rule.upgrade:
+                # Without build, only the structures already standing can be upgraded
+                to_upgrade = [location for location in rule.locations if self.__upgradable(game_map, location, rule.unit_type)]
+                if to_upgrade:
+                    SPAllocator([BuildPriority(rule.unit_type, to_upgrade, upgrade=True)], hierarchy=self.hierarchy).solve(game_state).apply(game_state)
+            else:
+                if rule.build and missing:
+                    game_state.attempt_spawn_many(rule.unit_type, missing)
+                if rule.upgrade:
+                    to_upgrade = [location for location in rule.locations if self.__upgradable(game_map, location, rule.unit_type)]
+                    if to_upgrade:
+                        game_state.attempt_upgrade_many(to_upgrade)
+            for location in missing:
+                structures[(int(location[0]), int(location[1]))] = game_map.structure_at(location)
+
+            if rule.remove:
+                to_remove = [location for location in rule.locations
+                    if game_map.structure_at(location) is not None and (int(location[0]), int(location[1])) not in pending_removal]
+                if to_remove:
+                    game_state.attempt_remove_many(to_remove)
+            if rule.required and any(game_map.structure_at(location) is None for location in rule.locations):
+                return False
+        return True
+
+    def __upgradable(self, game_map, location, unit_type):
+        unit = game_map.structure_at(location)
+        return unit is not None and unit.unit_type == unit_type and not unit.upgraded
@@ -0,0 +1,222 @@
+import json
+from array import array
+
+from .frames import EVENT_TYPES
+
+
+def _location(event, i):
+    return event[i][0], event[i][1]
+
+
+# Each decoder turns one raw event list (see json-docs.html) into
+# (x, y, target_x, target_y, value, unit_type, unit_id, target_id, engine player number)
+def _decode_self_destruct(event):
+    x, y = _location(event, 0)
+    return x, y, -1, -1, event[2], event[3], event[4], None, event[5]
+
+def _decode_breach(event):
+    x, y = _location(event, 0)
+    return x, y, -1, -1, event[1], event[2], event[3], None, event[4]
+
+def _decode_shield(event):
+    x, y = _location(event, 0)
+    tx, ty = _location(event, 1)
+    return x, y, tx, ty, event[2], event[3], event[4], event[5], event[6]
+
+def _decode_move(event):
+    x, y = _location(event, 0)
+    tx, ty = _location(event, 1)
+    return x, y, tx, ty, 0.0, event[3], event[4], None, event[5]
+
+def _decode_spawn(event):
+    x, y = _location(event, 0)
+    return x, y, -1, -1, 0.0, event[1], event[2], None, event[3]
+
+def _decode_death(event):
+    x, y = _location(event, 0)
+    return x, y, -1, -1, 1.0 if event[4] else 0.0, event[1], event[2], None, event[3]
+
+def _decode_attack(event):
+    x, y = _location(event, 0)
+    tx, ty = _location(event, 1)
+    return x, y, tx, ty, event[2], event[3], event[4], event[5], event[6]
+
+def _decode_melee(event):
+    x, y = _location(event, 0)
+    tx, ty = _location(event, 1)
+    return x, y, tx, ty, event[2], event[3], event[4], None, event[5]
+
+_DECODERS = {
+    "selfDestruct": _decode_self_destruct,
+    "breach": _decode_breach,
+    "damage": _decode_breach,
+    "shield": _decode_shield,
+    "move": _decode_move,
+    "spawn": _decode_spawn,
+    "death": _decode_death,
+    "attack": _decode_attack,
+    "melee": _decode_melee,
+}
+
+
+def decode_event(event_type, event):
+    """Decodes a single raw event of an action frame
+
+    Args:
+        event_type: The name of the event list the event is in, see EVENT_TYPES
+        event: The raw event list
+
+    Returns:
+        (x, y, target_x, target_y, value, unit_type, unit_id, target_id, engine player number), as stored by EventColumns,
+        or None for an unknown event type
+
+    """
+    decode = _DECODERS.get(event_type)
+    if decode is None:
+        return None
+    return decode(event)
+
+
+# Unit type indices of structures, see p1Units in json-docs.html
+_STRUCTURE_INDICES = (0, 1, 2)
+
+
+class EventColumns:
+    """Columnar storage of all events of one type received during a round.
+
+    Row i of every column describes the i-th event. Locations that do not apply to an event type are -1,
+    as are their targets. Players use the GameState convention, 0 for you and 1 for your opponent.
+
+    Attributes :
+        * frame (array): The frame number of each event
+        * x, y (array): The location of the unit the event is about (the attacker, mover, shielder, ...)
+        * target_x, target_y (array): The target location of attack, shield, move and melee events
+        * value (array): Damage dealt or taken, shield amount, breach damage; 1 for deaths caused by the owner removing a structure
+        * unit_type (array): Index of the unit type, as in UNIT_TYPE_TO_INDEX
+        * player_index (array): The owner of the unit the event is about
+        * unit_id (list): Engine ID of the unit the event is about
+        * target_id (list): Engine ID of the attacked or shielded unit, None for other event types
+
+    """
+    def __init__(self):
+        self.frame = array('h')
+        self.x = array('b')
+        self.y = array('b')
+        self.target_x = array('b')
+        self.target_y = array('b')
+        self.value = array('f')
+        self.unit_type = array('b')
+        self.player_index = array('b')
+        self.unit_id = []
+        self.target_id = []
+
+    def __len__(self):
+        return len(self.frame)
+
+    def append(self, frame_number, x, y, target_x, target_y, value, unit_type, unit_id, target_id, player):
+        self.frame.append(frame_number)
+        self.x.append(int(x))
+        self.y.append(int(y))
+        self.target_x.append(int(target_x))
+        self.target_y.append(int(target_y))
+        self.value.append(float(value))
+        self.unit_type.append(int(unit_type))
+        self.player_index.append(int(player) - 1)
+        self.unit_id.append(unit_id)
+        self.target_id.append(target_id)
+
+
+class RoundEvents:
+    """Decodes the events of action frames into typed columns and accumulates them over a round.
+
+    Feed it every action frame (or only the ones with interesting events, see AlgoCore.subscribe_frames).
+    The first frame of a new round resets it, so during on_turn it describes the previous action phase. Call
+    start_turn at the start of on_turn, so a round without any added frame does not leave an older round behind.
+    Aggregates are kept up to date while decoding, so reading them is O(1).
+
+    Attributes :
+        * turn_number (int): The turn the accumulated action phase belongs to, None before the first frame
+        * frames (int): The number of frames added this round
+        * columns (dict): Maps each event type (see EVENT_TYPES) to its EventColumns
+        * structure_damage (list): Per player index, dict of (x, y) to the damage their structures took there
+        * breach_cells (list): Per player index, dict of (x, y) to the number of breaches scored there by their units
+        * breach_damage (list): Per player index, the health damage their units dealt by breaching
+        * units_lost (list): Per player index, dict of unit type index to the number of units destroyed, owner removals
+          and units that breached excluded
+
+    """
+    def __init__(self):
+        self.reset()
+
+    def reset(self, turn_number=None):
+        """Clears all events and aggregates
+        """
+        self.turn_number = turn_number
+        self.frames = 0
+        self.columns = {event_type: EventColumns() for event_type in EVENT_TYPES}
+        self.structure_damage = [{}, {}]
+        self.breach_cells = [{}, {}]
+        self.breach_damage = [0.0, 0.0]
+        self.units_lost = [{}, {}]
+        self._breached_units = set()
+
+    def start_turn(self, turn_number):
+        """Clears the events unless they belong to the action phase right before the given turn
+
+        Args:
+            turn_number: The turn that is starting
+
+        """
+        if self.turn_number != turn_number - 1:
+            self.reset(turn_number - 1)
+
+    def add_frame(self, frame):
+        """Decodes the events of an action frame and adds them to the round
+
+        Args:
+            frame: An action frame, either the raw string from the engine or the decoded json object
+
+        """
+        if isinstance(frame, str):
+            frame = json.loads(frame)
+        turn_info = frame["turnInfo"]
+        turn_number = int(turn_info[1])
+        frame_number = int(turn_info[2])
+        if turn_number != self.turn_number:
+            self.reset(turn_number)
+        self.frames += 1
+        events = frame.get("events", {})
+        # A breaching unit also dies, collect breaches first whatever order the events come in
+        self._breached_units.update(event[3] for event in events.get("breach", []))
+
+        for event_type, typed_events in events.items():
+            decode = _DECODERS.get(event_type)
+            if decode is None or not typed_events:
+                continue
+            columns = self.columns[event_type]
+            for event in typed_events:
+                decoded = decode(event)
+                columns.append(frame_number, *decoded)
+                self.__aggregate(event_type, decoded)
+
+    def __aggregate(self, event_type, decoded):
+        x, y, _, _, value, unit_type, unit_id, _, player = decoded
+        player_index = int(player) - 1
+        location = (int(x), int(y))
+        if event_type == "damage":
+            if unit_type in _STRUCTURE_INDICES:
+                damage = self.structure_damage[player_index]
+                damage[location] = damage.get(location, 0.0) + value
+        elif event_type == "breach":
+            cells = self.breach_cells[player_index]
+            cells[location] = cells.get(location, 0) + 1
+            self.breach_damage[player_index] += value
+        elif event_type == "death":
+            if not value and unit_id not in self._breached_units:
+                lost = self.units_lost[player_index]
+                lost[unit_type] = lost.get(unit_type, 0) + 1
+
+    def count(self, event_type):
+        """The number of events of the given type this round
+        """
+        return len(self.columns[event_type])
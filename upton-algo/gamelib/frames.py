@@ -0,0 +1,86 @@
+import re
+
+EVENT_TYPES = ["selfDestruct", "breach", "damage", "shield", "move", "spawn", "death", "attack", "melee"]
+
+_TURN_INFO = re.compile(r'"turnInfo"\s*:\s*\[\s*(-?\d+)\s*,\s*(-?\d+)\s*,\s*(-?\d+)')
+_EVENT_LISTS = {event_type: re.compile(r'"{}"\s*:\s*\[\s*(.)'.format(event_type)) for event_type in EVENT_TYPES}
+
+
+def parse_turn_info(message):
+    """Reads the turnInfo of a raw engine message without decoding the rest of it
+
+    Args:
+        message: A game state or action frame string from the engine
+
+    Returns:
+        [state_type, turn_number, frame_number] as ints, or None if the message has no turnInfo
+
+    """
+    match = _TURN_INFO.search(message)
+    if match is None:
+        return None
+    return [int(value) for value in match.groups()]
+
+
+def frame_has_events(message, event_types):
+    """Checks if a raw action frame contains at least one event of the given types, without decoding it
+
+    Args:
+        message: An action frame string from the engine
+        event_types: A list of event names, see EVENT_TYPES
+
+    Returns:
+        True if any of the event lists is not empty
+
+    """
+    for event_type in event_types:
+        match = _EVENT_LISTS[event_type].search(message)
+        if match is not None and match.group(1) != "]":
+            return True
+    return False
+
+
+class FrameSubscription:
+    """Describes which action frames a handler wants to receive.
+
+    A frame matches if it contains any of the given event types and its frame number is a multiple of every.
+    Leaving a filter as None disables it. A last_only subscription ignores both filters and only
+    receives the final frame of each action phase, once the next turn message arrives.
+
+    Attributes :
+        * handler (function): Called with the raw frame string of every matching frame
+        * events (list): Event names of interest, see EVENT_TYPES
+        * every (int): Only frames whose frame number is a multiple of this are received
+        * last_only (bool): Only the last frame of each action phase is received
+
+    """
+    def __init__(self, handler, events=None, every=None, last_only=False):
+        if events is not None:
+            for event_type in events:
+                if event_type not in EVENT_TYPES:
+                    raise ValueError("Unknown event type {}, expected one of {}".format(event_type, EVENT_TYPES))
+        if every is not None and every < 1:
+            raise ValueError("every must be a positive number of frames, got {}".format(every))
+        self.handler = handler
+        self.events = events
+        self.every = every
+        self.last_only = last_only
+        self.pending = None
+
+    def matches(self, message, frame_number):
+        """Checks a raw action frame against the filters of this subscription
+        """
+        if self.last_only:
+            return False
+        if self.every is not None and frame_number % self.every != 0:
+            return False
+        if self.events is not None and not frame_has_events(message, self.events):
+            return False
+        return True
+
+    def flush(self):
+        """Delivers the buffered last frame of a last_only subscription, if any
+        """
+        if self.pending is not None:
+            frame, self.pending = self.pending, None
+            self.handler(frame)
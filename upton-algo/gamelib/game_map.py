@@ -9,6 +9,14 @@ class GameMap:
     game_map[x, y] will return a list of Units located at that location, 
     or an empty list if there are no units at the location
 
+    Structures are also indexed by location, by (player, type, upgraded) and by pending removal,
+    so structure_at and structure_locations take constant time. The indexes are kept up to date by
+    add_unit, place_unit, remove_unit, upgrade_unit, flag_removal and assigning to game_map[x, y].
+    Appending to the list returned by game_map[x, y] or changing units directly bypasses them.
+
+    While an undo log is open (see start_undo_log), the same methods record the previous contents of
+    every cell they change, so undo can restore the map to an earlier position of the log.
+
     Attributes :
         * config (JSON): Contains information about the current game rules
         * enable_warnings (bool): If true, debug messages for game_map functions will print out
@@ -37,6 +45,10 @@ class GameMap:
         self.BOTTOM_RIGHT = 3
         self.__map = self.__empty_grid()
         self.__start = [13,0]
+        self.__structures = {}
+        self.__structure_kinds = {}
+        self.__pending_removal = set()
+        self.__undo_log = None
     
     def __getitem__(self, location):
         if len(location) == 2 and self.in_arena_bounds(location):
@@ -46,7 +58,13 @@ class GameMap:
 
     def __setitem__(self, location, val):
         if type(location) == tuple and len(location) == 2 and self.in_arena_bounds(location):
-            self.__map[location[0]][location[1]] = val
+            x, y = location
+            self.__log_cell(x, y)
+            self.__unindex_cell(x, y)
+            self.__map[x][y] = val
+            for unit in val:
+                if unit.stationary:
+                    self.__index_structure(x, y, unit)
             return
         self._invalid_coordinates(location)
 
@@ -168,10 +186,26 @@ class GameMap:
 
         x, y = location
         new_unit = GameUnit(unit_type, self.config, player_index, None, location[0], location[1])
+        self.__log_cell(x, y)
         if not new_unit.stationary:
             self.__map[x][y].append(new_unit)
         else:
+            self.__unindex_cell(x, y)
             self.__map[x][y] = [new_unit]
+            self.__index_structure(x, y, new_unit)
+
+    def place_unit(self, unit):
+        """Add an existing GameUnit to the map at its own location, used when parsing the game state.
+
+        Args:
+            unit: The GameUnit to add, its x and y must be on the board
+
+        """
+        x, y = unit.x, unit.y
+        self.__log_cell(x, y)
+        self.__map[x][y].append(unit)
+        if unit.stationary:
+            self.__index_structure(x, y, unit)
 
     def remove_unit(self, location):
         """Remove all units on the map in the given location.
@@ -186,8 +220,130 @@ class GameMap:
             self._invalid_coordinates(location)
         
         x, y = location
+        self.__log_cell(x, y)
+        self.__unindex_cell(x, y)
         self.__map[x][y] = []
 
+    def upgrade_unit(self, location):
+        """Upgrade the structure at the given location, keeping the structure indexes up to date.
+
+        Args:
+            location: The location of the structure
+
+        Returns:
+            The upgraded structure, None if there is no structure at the location
+
+        """
+        x, y = map(int, location)
+        unit = self.__structures.get((x, y))
+        if unit is not None and not unit.upgraded:
+            self.__log_cell(x, y)
+            self.__structure_kinds[(unit.player_index, unit.unit_type, False)].discard((x, y))
+            unit.upgrade()
+            self.__structure_kinds.setdefault((unit.player_index, unit.unit_type, True), set()).add((x, y))
+        return unit
+
+    def flag_removal(self, location):
+        """Flag the structure at the given location as pending removal, keeping the structure indexes up to date.
+
+        Args:
+            location: The location of the structure
+
+        Returns:
+            The flagged structure, None if there is no structure at the location
+
+        """
+        x, y = map(int, location)
+        unit = self.__structures.get((x, y))
+        if unit is not None:
+            self.__log_cell(x, y)
+            unit.pending_removal = True
+            self.__pending_removal.add((x, y))
+        return unit
+
+    def structure_at(self, location):
+        """Gets the structure at a location in constant time.
+
+        Args:
+            location: A map location
+
+        Returns:
+            The structure GameUnit at the location, None if there is none
+
+        """
+        return self.__structures.get((int(location[0]), int(location[1])))
+
+    def structure_locations(self, unit_type, player_index=0, upgraded=None):
+        """Gets the locations of every structure of a type owned by a player.
+
+        Args:
+            unit_type: The type of the structures
+            player_index: The index corresponding to the player controlling the structures, 0 for you 1 for the enemy
+            upgraded: If True or False, only structures that are or are not upgraded. Both if None
+
+        Returns:
+            A set of (x, y) tuples, do not modify it
+
+        """
+        if upgraded is not None:
+            return self.__structure_kinds.get((player_index, unit_type, upgraded), set())
+        return self.__structure_kinds.get((player_index, unit_type, False), set()) | self.__structure_kinds.get((player_index, unit_type, True), set())
+
+    def pending_removal_locations(self):
+        """Gets the locations of every structure flagged for removal.
+
+        Returns:
+            A set of (x, y) tuples, do not modify it
+
+        """
+        return self.__pending_removal
+
+    def start_undo_log(self):
+        """Starts recording map changes if needed and returns the current position of the undo log.
+        """
+        if self.__undo_log is None:
+            self.__undo_log = []
+        return len(self.__undo_log)
+
+    def undo(self, position):
+        """Reverts every change recorded after the given position of the undo log.
+
+        Args:
+            position: A position returned by start_undo_log
+
+        """
+        while len(self.__undo_log) > position:
+            x, y, units, structure_states = self.__undo_log.pop()
+            self.__unindex_cell(x, y)
+            for unit, state in structure_states:
+                unit.__dict__.update(state)
+            self.__map[x][y] = units
+            for unit in units:
+                if unit.stationary:
+                    self.__index_structure(x, y, unit)
+
+    def stop_undo_log(self):
+        """Stops recording map changes and forgets the recorded ones, they can no longer be undone.
+        """
+        self.__undo_log = None
+
+    def __log_cell(self, x, y):
+        if self.__undo_log is not None:
+            units = self.__map[x][y]
+            self.__undo_log.append((x, y, list(units), [(unit, dict(unit.__dict__)) for unit in units if unit.stationary]))
+
+    def __index_structure(self, x, y, unit):
+        self.__structures[(x, y)] = unit
+        self.__structure_kinds.setdefault((unit.player_index, unit.unit_type, unit.upgraded), set()).add((x, y))
+        if unit.pending_removal:
+            self.__pending_removal.add((x, y))
+
+    def __unindex_cell(self, x, y):
+        unit = self.__structures.pop((x, y), None)
+        if unit is not None:
+            self.__structure_kinds[(unit.player_index, unit.unit_type, unit.upgraded)].discard((x, y))
+            self.__pending_removal.discard((x, y))
+
     def get_locations_in_range(self, location, radius):
         """Gets locations in a circular area around a location
 
@@ -3,9 +3,10 @@ import json
 import sys
 
 from .navigation import ShortestPathFinder
-from .util import send_command, debug_write
+from .util import send_turn, record_fallback_turn, debug_write
 from .unit import GameUnit
 from .game_map import GameMap
+from .board_diff import BoardDiff, LocationCache, zobrist_key
 
 def is_stationary(unit_type):
     """
@@ -37,6 +38,9 @@ class GameState:
         * HALF_ARENA (int): Half the size of the arena
         * MP (int): A constant representing the Mobile Points resource, used in the get_resource function
         * SP (int): A constant representing the SP resource, used in the get_resource function
+        * OK, NOT_AFFORDABLE, BLOCKED, ENEMY_TERRITORY, NOT_ON_EDGE, OUT_OF_BOUNDS, NO_STRUCTURE, NOT_UPGRADABLE,
+          INVALID_REQUEST (int): Per location status codes returned by attempt_spawn_many, attempt_upgrade_many
+          and attempt_remove_many
          
         * game_map (:obj: GameMap): The current GameMap. To retrieve a list of GameUnits at a location, use game_map[x, y]
         * turn_number (int): The current turn number. Starts at 0.
@@ -44,15 +48,30 @@ class GameState:
         * my_time (int): The time you took to submit your previous turn
         * enemy_health (int): Your opponents current remaining health
         * enemy_time (int): Your opponents current remaining time
+        * board_diff (:obj: BoardDiff): The changes to the board since the previous GameState, None if it was built without one
+        * board_hash (int): Zobrist hash of the structures on the parsed board
+        * caches (dict): LocationCaches of values derived from the board, see location_cache
 
     """
 
-    def __init__(self, config, serialized_string):
+    OK = 0
+    NOT_AFFORDABLE = 1
+    BLOCKED = 2
+    ENEMY_TERRITORY = 3
+    NOT_ON_EDGE = 4
+    OUT_OF_BOUNDS = 5
+    NO_STRUCTURE = 6
+    NOT_UPGRADABLE = 7
+    INVALID_REQUEST = 8
+
+    def __init__(self, config, serialized_string, previous=None):
         """ Setup a turns variables using arguments passed
 
         Args:
             * config (JSON): A json object containing information about the game
             * serialized_string (string): A string containing information about the game state at the start of this turn
+            * previous (:obj: GameState): The GameState of the previous turn. Units it parsed that did not change are
+              reused, board_diff describes what did change, and its caches are carried over except where the diff touches them.
 
         """
         self.serialized_string = serialized_string
@@ -96,9 +115,21 @@ class GameState:
         self._player_resources = [
                 {'SP': 0, 'MP': 0},  # player 0, which is you
                 {'SP': 0, 'MP': 0}]  # player 1, which is the opponent
-        self.__parse_state(serialized_string)
-
-    def __parse_state(self, state_line):
+        self._parsed_units = {}
+        self.__spawn_edges = None
+        # IDs of the savepoints that can still be rolled back to, innermost last
+        self.__savepoints = []
+        self.__next_savepoint = 0
+        self.board_diff = BoardDiff() if previous is not None else None
+        self.board_hash = previous.board_hash if previous is not None else 0
+        self.caches = {}
+        self.__parse_state(serialized_string, previous)
+        if previous is not None:
+            for name, cache in previous.caches.items():
+                cache.invalidate(self.board_diff)
+                self.caches[name] = cache
+
+    def __parse_state(self, state_line, previous=None):
         """
         Fills in map based on the serialized game state so that self.game_map[x,y] is a list of GameUnits at that location.
         state_line is the game state as a json string.
@@ -126,31 +157,122 @@ class GameState:
         self.p1units = p1units
         self.p2units = p2units
 
-        self.__create_parsed_units(p1units, 0)
-        self.__create_parsed_units(p2units, 1)
+        previous_units = previous._parsed_units if previous is not None else {}
+        self.__create_parsed_units(p1units, 0, previous_units)
+        self.__create_parsed_units(p2units, 1, previous_units)
+
+        if previous is not None:
+            for unit_id, (unit, hp, upgraded, pending_removal) in previous_units.items():
+                if unit_id not in self._parsed_units:
+                    self.board_diff.removed.append(unit_id)
+                    self.board_diff.touched_locations.add((unit.x, unit.y))
+                    if unit.stationary:
+                        self.board_hash ^= zobrist_key([unit.x, unit.y], unit.player_index, unit.unit_type, upgraded)
 
-    def __create_parsed_units(self, units, player_number):
+    def __create_parsed_units(self, units, player_number, previous_units):
         """
         Helper function for __parse_state to add units to the map.
+        Units of the previous state that did not change are reused instead of being created again.
         """
         typedef = self.config.get("unitInformation")
+        removals = set()
+        upgrades = set()
         for i, unit_types in enumerate(units):
+            unit_type = typedef[i].get("shorthand")
+            if unit_type == REMOVE:
+                removals.update((int(uinfo[0]), int(uinfo[1])) for uinfo in unit_types)
+            elif unit_type == UPGRADE:
+                upgrades.update((int(uinfo[0]), int(uinfo[1])) for uinfo in unit_types)
+
+        for i, unit_types in enumerate(units):
+            unit_type = typedef[i].get("shorthand")
+            if unit_type == REMOVE or unit_type == UPGRADE:
+                continue
+            stationary = is_stationary(unit_type)
             for uinfo in unit_types:
-                unit_type = typedef[i].get("shorthand")
                 sx, sy, shp = uinfo[:3]
                 x, y = map(int, [sx, sy])
                 hp = float(shp)
-                # This depends on RM and UP always being the last types to be processed
-                if unit_type == REMOVE:
-                    # Quick fix will deploy engine fix soon
-                    if self.contains_stationary_unit([x,y]):
-                        self.game_map[x,y][0].pending_removal = True
-                elif unit_type == UPGRADE:
-                    if self.contains_stationary_unit([x,y]):
-                        self.game_map[x,y][0].upgrade()
-                else:
-                    unit = GameUnit(unit_type, self.config, player_number, hp, x, y)
-                    self.game_map[x,y].append(unit)
+                unit_id = uinfo[3] if len(uinfo) > 3 else None
+                # Removal and upgrade flags only apply to structures
+                upgraded = stationary and (x, y) in upgrades
+                pending_removal = stationary and (x, y) in removals
+
+                unit = self.__reuse_parsed_unit(previous_units.get(unit_id), unit_type, player_number, x, y, hp, upgraded, pending_removal)
+                if unit is None:
+                    unit = GameUnit(unit_type, self.config, player_number, hp, x, y, unit_id)
+                    if upgraded:
+                        unit.upgrade()
+                    if pending_removal:
+                        unit.pending_removal = True
+                self.game_map.place_unit(unit)
+
+                if unit_id is not None:
+                    self._parsed_units[unit_id] = (unit, hp, upgraded, pending_removal)
+                    if self.board_diff is not None:
+                        self.__diff_parsed_unit(previous_units.get(unit_id), unit, hp, upgraded, pending_removal)
+                    elif stationary:
+                        self.board_hash ^= zobrist_key([x, y], player_number, unit_type, upgraded)
+
+    def __reuse_parsed_unit(self, previous, unit_type, player_number, x, y, hp, upgraded, pending_removal):
+        """
+        Returns the unit parsed by the previous state if it is identical to the one described, None otherwise.
+        The unit itself is compared, not its parsed values, since the strategy may have changed it with attempt_*.
+        """
+        if previous is None:
+            return None
+        unit = previous[0]
+        if (unit.unit_type == unit_type and unit.player_index == player_number and unit.x == x and unit.y == y and
+                unit.health == hp and unit.upgraded == upgraded and unit.pending_removal == pending_removal):
+            return unit
+        return None
+
+    def __diff_parsed_unit(self, previous, unit, hp, upgraded, pending_removal):
+        """
+        Records how a parsed unit changed compared to the values parsed by the previous state.
+        """
+        diff = self.board_diff
+        location = (unit.x, unit.y)
+        if previous is None:
+            diff.added.append(unit.unit_id)
+            diff.touched_locations.add(location)
+            if unit.stationary:
+                self.board_hash ^= zobrist_key(location, unit.player_index, unit.unit_type, upgraded)
+            return
+
+        previous_unit, previous_hp, previous_upgraded, previous_pending_removal = previous
+        if (previous_unit.x, previous_unit.y) != location:
+            diff.touched_locations.add((previous_unit.x, previous_unit.y))
+            diff.touched_locations.add(location)
+        if previous_hp != hp:
+            diff.damaged.append(unit.unit_id)
+            diff.touched_locations.add(location)
+        if previous_upgraded != upgraded:
+            diff.upgraded.append(unit.unit_id)
+            diff.touched_locations.add(location)
+            if unit.stationary:
+                self.board_hash ^= zobrist_key(location, unit.player_index, unit.unit_type, previous_upgraded)
+                self.board_hash ^= zobrist_key(location, unit.player_index, unit.unit_type, upgraded)
+        if previous_pending_removal != pending_removal:
+            diff.flagged.append(unit.unit_id)
+            diff.touched_locations.add(location)
+
+    def location_cache(self, name, radius=0):
+        """Gets a cache for values derived from the board, creating it if needed.
+        The cache is carried over to the GameState of the next turn when it is built from this one,
+        except for the entries within radius of a cell that changed.
+
+        Args:
+            name: The name of the cache
+            radius: How far a change to the board reaches when invalidating entries
+
+        Returns:
+            The LocationCache with the given name
+
+        """
+        if name not in self.caches:
+            self.caches[name] = LocationCache(radius)
+        return self.caches[name]
 
     def __resource_required(self, unit_type):
         return self.SP if is_stationary(unit_type) else self.MP
@@ -177,11 +299,78 @@ class GameState:
     def submit_turn(self):
         """Submit and end your turn.
             Must be called at the end of your turn or the algo will hang.
+
+        Returns:
+            True if this turn was sent, False if the turn watchdog already sent its fallback instead
+        """
+        build_string, deploy_string = self.turn_strings()
+        return send_turn(build_string, deploy_string)
+
+    def turn_strings(self):
+        """The build and deploy strings submit_turn would send for the turn planned so far
         """
-        build_string = json.dumps(self._build_stack)
-        deploy_string = json.dumps(self._deploy_stack)
-        send_command(build_string)
-        send_command(deploy_string)
+        return json.dumps(self._build_stack), json.dumps(self._deploy_stack)
+
+    def record_fallback(self):
+        """Records the turn planned so far as the fallback of the turn watchdog.
+            If AlgoCore.enable_watchdog was called and the soft deadline is reached before
+            submit_turn, this turn is submitted instead. Does nothing without a watchdog.
+        """
+        record_fallback_turn(self._build_stack, self._deploy_stack)
+
+    def savepoint(self):
+        """Marks the current plan so that later changes can be undone with rollback.
+            Resources, the build and deploy stacks and the units on the map are restored.
+            Savepoints can be nested, rolling back to one also discards the savepoints made after it.
+
+        Returns:
+            An opaque savepoint to pass to rollback
+
+        """
+        savepoint_id = self.__next_savepoint
+        self.__next_savepoint += 1
+        self.__savepoints.append(savepoint_id)
+        return (savepoint_id, self.game_map.start_undo_log(), len(self._build_stack), len(self._deploy_stack),
+                [dict(resources) for resources in self._player_resources])
+
+    def rollback(self, savepoint):
+        """Undoes every change to the plan made since the given savepoint.
+
+        Args:
+            savepoint: A savepoint returned by savepoint since the last commit, and not discarded
+                by rolling back to an earlier savepoint
+
+        """
+        savepoint_id, map_position, build_length, deploy_length, resources = savepoint
+        if savepoint_id not in self.__savepoints:
+            raise ValueError("Cannot roll back to a savepoint discarded by a commit or an earlier rollback")
+        del self.__savepoints[self.__savepoints.index(savepoint_id) + 1:]
+        self.game_map.undo(map_position)
+        del self._build_stack[build_length:]
+        del self._deploy_stack[deploy_length:]
+        self._player_resources = [dict(player_resources) for player_resources in resources]
+
+    def release(self, savepoint):
+        """Keeps the changes made since the given savepoint and discards it along with the savepoints made after it.
+            Savepoints made before it stay usable, so helpers should release their own savepoints rather than commit.
+            Once no savepoint is left, changes to the map are no longer recorded.
+
+        Args:
+            savepoint: A savepoint returned by savepoint that has not been discarded yet
+
+        """
+        savepoint_id = savepoint[0]
+        if savepoint_id not in self.__savepoints:
+            raise ValueError("Cannot release a savepoint discarded by a commit or an earlier rollback")
+        del self.__savepoints[self.__savepoints.index(savepoint_id):]
+        if not self.__savepoints:
+            self.game_map.stop_undo_log()
+
+    def commit(self):
+        """Keeps every change made so far and discards all savepoints, which stops recording changes to the map.
+        """
+        self.__savepoints = []
+        self.game_map.stop_undo_log()
 
     def get_resource(self, resource_type, player_index = 0):
         """Gets a players resources
@@ -410,6 +599,7 @@ class GameState:
         for location in locations:
             if location[1] < self.HALF_ARENA and self.contains_stationary_unit(location):
                 x, y = map(int, location)
+                self.game_map.flag_removal([x, y])
                 self._build_stack.append((REMOVE, x, y))
                 removed_units += 1
             else:
@@ -431,26 +621,175 @@ class GameState:
             locations = [locations]
         spawned_units = 0
         for location in locations:
-            if location[1] < self.HALF_ARENA and self.contains_stationary_unit(location):
+            existing_unit = location[1] < self.HALF_ARENA and self.contains_stationary_unit(location)
+            if existing_unit:
                 x, y = map(int, location)
-                existing_unit = None
-                for unit in self.game_map[x,y]:
-                    if unit.stationary:
-                        existing_unit = unit
-
                 if not existing_unit.upgraded and self.config["unitInformation"][UNIT_TYPE_TO_INDEX[existing_unit.unit_type]].get("upgrade", None) is not None:
                     costs = self.type_cost(existing_unit.unit_type, True)
                     resources = self.get_resources()
                     if resources[SP] >= costs[SP] and resources[MP] >= costs[MP]:
                         self.__set_resource(SP, 0 - costs[SP])
                         self.__set_resource(MP, 0 - costs[MP])
-                        existing_unit.upgrade()
+                        self.game_map.upgrade_unit([x, y])
                         self._build_stack.append((UPGRADE, x, y))
                         spawned_units += 1
             else:
                 self.warn("Could not upgrade a unit from {}. Location has no structures or is enemy territory.".format(location))
         return spawned_units
 
+    def attempt_spawn_many(self, unit_type, locations, num=1):
+        """Attempts to spawn new units of one type at a batch of locations in a single pass.
+
+        Behaves like attempt_spawn, but costs and spawn edges are looked up once for the whole batch,
+        resources are deducted once at the end and a single warning summarizes the failures.
+        Locations are handled in order, a location only gets its units if all num of them are affordable.
+
+        Args:
+            unit_type: The type of unit we want to spawn
+            locations: A single location or list of locations to spawn units at
+            num: The number of units of unit_type to deploy at each location, structures are always spawned once
+
+        Returns:
+            A list with one status per location, OK if the units were spawned or the reason they were not
+            (NOT_AFFORDABLE, BLOCKED, ENEMY_TERRITORY, NOT_ON_EDGE or OUT_OF_BOUNDS). Every location gets
+            INVALID_REQUEST if unit_type is not a unit or num is below one
+
+        """
+        if locations and type(locations[0]) == int:
+            locations = [locations]
+        if unit_type not in ALL_UNITS:
+            self._invalid_unit(unit_type)
+            return [self.INVALID_REQUEST] * len(locations)
+        if num < 1:
+            self.warn("Attempted to spawn fewer than one units! ({})".format(num))
+            return [self.INVALID_REQUEST] * len(locations)
+
+        stationary = is_stationary(unit_type)
+        count = 1 if stationary else num
+        costs = self.type_cost(unit_type)
+        held_SP, held_MP = self.get_resources()
+        stack = self._build_stack if stationary else self._deploy_stack
+        if not stationary and self.__spawn_edges is None:
+            self.__spawn_edges = set(map(tuple, self.game_map.get_edge_locations(self.game_map.BOTTOM_LEFT) +
+                self.game_map.get_edge_locations(self.game_map.BOTTOM_RIGHT)))
+
+        statuses = []
+        for location in locations:
+            x, y = map(int, location)
+            if not self.game_map.in_arena_bounds([x, y]):
+                status = self.OUT_OF_BOUNDS
+            elif y >= self.HALF_ARENA:
+                status = self.ENEMY_TERRITORY
+            elif self.game_map.structure_at([x, y]) is not None or (stationary and self.game_map[x,y]):
+                status = self.BLOCKED
+            elif not stationary and (x, y) not in self.__spawn_edges:
+                status = self.NOT_ON_EDGE
+            elif held_SP < costs[SP] * count or held_MP < costs[MP] * count:
+                status = self.NOT_AFFORDABLE
+            else:
+                for _ in range(count):
+                    held_SP -= costs[SP]
+                    held_MP -= costs[MP]
+                    self.game_map.add_unit(unit_type, [x, y], 0)
+                    stack.append((unit_type, x, y))
+                status = self.OK
+            statuses.append(status)
+
+        self._player_resources[0]['SP'] = held_SP
+        self._player_resources[0]['MP'] = held_MP
+        self.__warn_failed("spawn {}".format(unit_type), locations, statuses)
+        return statuses
+
+    def attempt_upgrade_many(self, locations):
+        """Attempts to upgrade the structures at a batch of locations in a single pass.
+
+        Behaves like attempt_upgrade, but upgrade costs are looked up once per unit type, resources are
+        deducted once at the end and a single warning summarizes the failures.
+
+        Args:
+            locations: A single location or list of locations to upgrade structures at
+
+        Returns:
+            A list with one status per location, OK if the structure was upgraded or the reason it was not
+            (NOT_AFFORDABLE, NO_STRUCTURE, NOT_UPGRADABLE, ENEMY_TERRITORY or OUT_OF_BOUNDS)
+
+        """
+        if locations and type(locations[0]) == int:
+            locations = [locations]
+        held_SP, held_MP = self.get_resources()
+        upgrade_costs = {}
+
+        statuses = []
+        for location in locations:
+            x, y = map(int, location)
+            unit = None
+            if not self.game_map.in_arena_bounds([x, y]):
+                status = self.OUT_OF_BOUNDS
+            elif y >= self.HALF_ARENA:
+                status = self.ENEMY_TERRITORY
+            else:
+                unit = self.game_map.structure_at([x, y])
+                status = self.NO_STRUCTURE
+            if unit is not None:
+                if unit.unit_type not in upgrade_costs:
+                    upgradable = self.config["unitInformation"][UNIT_TYPE_TO_INDEX[unit.unit_type]].get("upgrade", None) is not None
+                    upgrade_costs[unit.unit_type] = self.type_cost(unit.unit_type, True) if upgradable else None
+                costs = upgrade_costs[unit.unit_type]
+                if unit.upgraded or costs is None:
+                    status = self.NOT_UPGRADABLE
+                elif held_SP < costs[SP] or held_MP < costs[MP]:
+                    status = self.NOT_AFFORDABLE
+                else:
+                    held_SP -= costs[SP]
+                    held_MP -= costs[MP]
+                    self.game_map.upgrade_unit([x, y])
+                    self._build_stack.append((UPGRADE, x, y))
+                    status = self.OK
+            statuses.append(status)
+
+        self._player_resources[0]['SP'] = held_SP
+        self._player_resources[0]['MP'] = held_MP
+        self.__warn_failed("upgrade", locations, statuses)
+        return statuses
+
+    def attempt_remove_many(self, locations):
+        """Attempts to flag the friendly structures at a batch of locations for removal in a single pass.
+
+        Args:
+            locations: A single location or list of locations we want to remove structures from
+
+        Returns:
+            A list with one status per location, OK if the structure was flagged for removal or the reason it was not
+            (NO_STRUCTURE, ENEMY_TERRITORY or OUT_OF_BOUNDS)
+
+        """
+        if locations and type(locations[0]) == int:
+            locations = [locations]
+
+        statuses = []
+        for location in locations:
+            x, y = map(int, location)
+            if not self.game_map.in_arena_bounds([x, y]):
+                status = self.OUT_OF_BOUNDS
+            elif y >= self.HALF_ARENA:
+                status = self.ENEMY_TERRITORY
+            elif self.game_map.structure_at([x, y]) is None:
+                status = self.NO_STRUCTURE
+            else:
+                self.game_map.flag_removal([x, y])
+                self._build_stack.append((REMOVE, x, y))
+                status = self.OK
+            statuses.append(status)
+
+        self.__warn_failed("remove", locations, statuses)
+        return statuses
+
+    def __warn_failed(self, action, locations, statuses):
+        if self.enable_warnings:
+            failed = [(location, status) for location, status in zip(locations, statuses) if status != self.OK]
+            if failed:
+                self.warn("Could not {} at {} of {} locations, (location, status): {}".format(action, len(failed), len(locations), failed))
+
     def get_target_edge(self, start_location):
         """Gets the target edge given a starting location
 
@@ -510,37 +849,24 @@ class GameState:
         if not self.game_map.in_arena_bounds(location):
             self.warn('Checked for stationary unit outside of arena bounds')
             return False
-        x, y = map(int, location)
-        for unit in self.game_map[x,y]:
-            if unit.stationary:
-                return unit
-        return False
+        return self.game_map.structure_at(location) or False
 
     def contains_certain_upgraded_unit(self, location):
-        """If the location is bloked and the struction is upgraded, return the updated unit name
+        """If the location is bloked by one of your structures and it is upgraded, return the upgraded unit
 
         Args:
             location: The location to check
 
         Returns:
-            unit name if the location is bloked and the struction is upgraded, False otherwise
+            The structure unit if the location is bloked by your upgraded structure, False otherwise
             
         """
         if not self.game_map.in_arena_bounds(location):
             self.warn('Checked for stationary unit outside of arena bounds')
             return False
-        my_upgraded_units = self.p1units[7] # List of units which are UPGRADE
-        # A single unit's stats are represented as a list as follows: [
-        # [0] : X coordinate.
-        # [1] : Y coordinate.
-        # [2] : Unit health. For REMOVE this is number of turns before removal.
-        # [3] : Unique string identifier for each game object. Will stay the same between frames throughout the game.
-        # ]
-        my_upgraded_units_locations = list()
-        for unit in my_upgraded_units:
-            my_upgraded_units_locations.append(unit[0:2])
-        if location in my_upgraded_units_locations:
-            return self.contains_stationary_unit(location)
+        unit = self.game_map.structure_at(location)
+        if unit is not None and unit.player_index == 0 and unit.upgraded:
+            return unit
         else:
             self.warn('location {} has no upgraded unit'.format(location))
             return False
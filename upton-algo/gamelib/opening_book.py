@@ -0,0 +1,141 @@
+import hashlib
+import json
+import os
+
+from .frames import parse_turn_info
+from .util import debug_write, send_turn
+
+_DEFAULT_DIRECTORY = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "opening_book")
+
+# Files that change while the algo plays, or do not affect the turns it plays
+_SKIPPED_DIRECTORIES = {"__pycache__", ".git", "opening_book"}
+_SKIPPED_EXTENSIONS = (".pyc", ".log")
+
+
+def _hash_file(digest, path):
+    with open(path, "rb") as f:
+        digest.update(f.read())
+
+
+def source_hash(*paths):
+    """A short hash of the contents of source files, to version an OpeningBook with the code that fills it
+
+    Directories are hashed with every file in them, except caches, logs and the opening books themselves,
+    so passing the algo directory covers the strategy and gamelib alike.
+    """
+    digest = hashlib.sha1()
+    for path in paths:
+        if not os.path.isdir(path):
+            _hash_file(digest, path)
+            continue
+        for root, directories, files in os.walk(path):
+            directories[:] = sorted(d for d in directories if d not in _SKIPPED_DIRECTORIES)
+            for name in sorted(files):
+                if name.endswith(_SKIPPED_EXTENSIONS):
+                    continue
+                file_path = os.path.join(root, name)
+                digest.update(os.path.relpath(file_path, path).replace("\\", "/").encode())
+                _hash_file(digest, file_path)
+    return digest.hexdigest()[:12]
+
+
+class OpeningBook:
+    """Build and deploy strings of the scripted early turns, cached on disk per game config.
+
+    A turn is looked up by a signature of the turn state: the turn number, your units and your resources.
+    When a turn played normally is not in the book yet, record stores the strings it submitted, and the next
+    time the same signature comes up play sends them straight away, without building a GameState or
+    validating a single spawn. Any deviation from a recorded board, such as a wall destroyed by the opponent,
+    changes the signature and falls back to normal planning. The book is only valid as long as the strategy
+    plays the same turns for the same signature, so give it a version that changes with the strategy code.
+
+    Attributes :
+        * config_hash (string): Hash of the game config the book belongs to
+        * version (string): Version of the strategy that filled the book
+        * max_turn (int): The last turn of the opening, later turns are never looked up
+        * path (string): The file the book is stored in
+        * entries (dict): Maps turn signatures to [build_string, deploy_string]
+        * hits (int): The number of turns played from the book this game
+
+    """
+    def __init__(self, config, version="", max_turn=4, directory=None):
+        self.config_hash = self.hash_config(config)
+        self.version = str(version)
+        self.max_turn = max_turn
+        if directory is None:
+            directory = _DEFAULT_DIRECTORY
+        name = "{}-{}.json".format(self.config_hash, self.version) if self.version else "{}.json".format(self.config_hash)
+        self.path = os.path.join(directory, name)
+        self.entries = {}
+        self.hits = 0
+        self.load()
+
+    @staticmethod
+    def hash_config(config):
+        """A short hash of a game config, the same for equal configs regardless of key order
+        """
+        return hashlib.sha1(json.dumps(config, sort_keys=True).encode()).hexdigest()[:12]
+
+    def signature(self, turn_state):
+        """The signature of a turn state string, None if the turn is past the opening
+        """
+        turn_info = parse_turn_info(turn_state)
+        if turn_info is None or turn_info[1] > self.max_turn:
+            return None
+        state = json.loads(turn_state)
+        # Unit IDs depend on what the opponent spawned, everything else has to match
+        units = [[unit[:3] for unit in units] for units in state["p1Units"]]
+        key = json.dumps([turn_info[1], state["p1Stats"][1:3], units], separators=(",", ":"))
+        return hashlib.sha1(key.encode()).hexdigest()
+
+    def load(self):
+        """Reads the entries of the book from disk, the book stays empty if the file is missing or unreadable
+        """
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path) as f:
+                self.entries = json.load(f)["entries"]
+        except (OSError, ValueError, KeyError) as e:
+            debug_write("Could not read the opening book {}: {}".format(self.path, e))
+            self.entries = {}
+
+    def save(self):
+        """Writes the book to disk, errors are reported and otherwise ignored
+        """
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(self.path + ".tmp", "w") as f:
+                json.dump({"config": self.config_hash, "version": self.version, "entries": self.entries}, f)
+            os.replace(self.path + ".tmp", self.path)
+        except OSError as e:
+            debug_write("Could not write the opening book {}: {}".format(self.path, e))
+
+    def play(self, turn_state):
+        """Submits the recorded turn for a turn state
+
+        Args:
+            turn_state: The turn state string from the engine
+
+        Returns:
+            True if the turn was in the book and has been submitted, False if it has to be planned
+
+        """
+        signature = self.signature(turn_state)
+        entry = self.entries.get(signature) if signature is not None else None
+        if entry is None:
+            return False
+        send_turn(entry[0], entry[1])
+        self.hits += 1
+        return True
+
+    def record(self, turn_state, game_state):
+        """Stores the turn planned in game_state for its turn state, if it is part of the opening and not stored yet
+
+        Call it only after game_state.submit_turn actually sent the turn, the book is saved right away.
+        """
+        signature = self.signature(turn_state)
+        if signature is None or signature in self.entries:
+            return
+        self.entries[signature] = list(game_state.turn_strings())
+        self.save()
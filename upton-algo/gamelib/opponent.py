@@ -0,0 +1,227 @@
+import json
+
+from .util import debug_write
+
+# Unit type indices, see p1Units in json-docs.html
+_STRUCTURE_INDICES = (0, 1, 2)
+_MOBILE_INDICES = (3, 4, 5)
+_HALF_ARENA = 14
+
+LEFT = 0
+RIGHT = 1
+
+
+class OpponentTurn:
+    """What the opponent did during one turn.
+
+    Attributes :
+        * turn_number (int): The turn
+        * mp (float): The MP the opponent held at the start of the turn, None if no turn state was observed
+        * spawns (dict): Maps (x, y) to a dict of mobile unit type index to the number spawned there
+        * attack_sides (list): Number of mobile units heading for our left and right side, by the edge they spawned on
+        * breaches (list): Number of breaches scored on our left and right side
+        * rebuilt (int): Number of structures rebuilt where one of theirs had died
+
+    """
+    def __init__(self, turn_number, mp=None):
+        self.turn_number = turn_number
+        self.mp = mp
+        self.spawns = {}
+        self.attack_sides = [0, 0]
+        self.breaches = [0, 0]
+        self.rebuilt = 0
+
+    @property
+    def attacked(self):
+        return self.attack_sides[LEFT] + self.attack_sides[RIGHT] > 0
+
+    def __str__(self):
+        return "OpponentTurn {} mp: {} attack sides: {} breaches: {} rebuilt: {}".format(
+            self.turn_number, self.mp, self.attack_sides, self.breaches, self.rebuilt)
+
+    def __repr__(self):
+        return self.__str__()
+
+
+class OpponentModel:
+    """Remembers how the opponent plays, updated incrementally from turn states and action frames.
+
+    Call observe_state with each GameState (or observe_turn_state with the raw turn state) at the start of a turn and add_frame with the action frames of that
+    turn containing spawn, breach and death events. Each turn is folded into running counts once the next one
+    starts, so every query is O(1). Sides are ours: units spawned on the top right edge head for the bottom left
+    edge, so they count as attacks on our left. Side and unit mix counts decay by recency each turn, so recent
+    turns weigh more than the opening.
+
+    Attributes :
+        * recency (float): Factor applied to the side and unit mix counts of past turns each turn
+        * mp_bucket (float): Width of the MP ranges the attack frequency is counted in
+        * turns (list): The finished OpponentTurns, oldest first
+        * current (:obj: OpponentTurn): The turn in progress, None before the first observation
+        * min_attack_mp (float): The lowest MP the opponent attacked with, None until they attack
+        * spawn_counts (dict): Maps (x, y) to the number of mobile units spawned there over the game
+        * favorite_spawn (tuple): The (x, y) most mobile units were spawned from, None until they attack
+
+    """
+    def __init__(self, recency=0.9, mp_bucket=5):
+        self.recency = recency
+        self.mp_bucket = mp_bucket
+        self.turns = []
+        self.current = None
+        self.min_attack_mp = None
+        self.spawn_counts = {}
+        self.favorite_spawn = None
+        self._attacks_by_mp = {}
+        self._turns_by_mp = {}
+        self._attacks = 0
+        self._observed = 0
+        self._side_counts = [0.0, 0.0]
+        self._breach_counts = [0.0, 0.0]
+        self._mix = {index: 0.0 for index in _MOBILE_INDICES}
+        self._lost_structures = {}
+        self._lost = 0
+        self._rebuilt = 0
+        self._rebuild_delay = 0
+
+    def observe_state(self, game_state):
+        """Starts a new turn with the MP the opponent holds in a turn state
+        """
+        self.__start_turn(game_state.turn_number, game_state.get_resource(game_state.MP, 1))
+
+    def observe_turn_state(self, turn_state):
+        """Same as observe_state, read straight from the turn state string for turns played without a GameState
+        """
+        state = json.loads(turn_state)
+        self.__start_turn(int(state["turnInfo"][1]), float(state["p2Stats"][2]))
+
+    def add_frame(self, frame):
+        """Applies the opponent's spawn, breach and death events of an action frame
+
+        Args:
+            frame: An action frame, either the raw string from the engine or the decoded json object
+
+        """
+        if isinstance(frame, str):
+            frame = json.loads(frame)
+        turn_number = int(frame["turnInfo"][1])
+        if self.current is None or self.current.turn_number != turn_number:
+            self.__start_turn(turn_number, None)
+        turn = self.current
+        events = frame.get("events", {})
+
+        for location, unit_type, unit_id, player in events.get("spawn", []):
+            if int(player) != 2:
+                continue
+            key = (int(location[0]), int(location[1]))
+            if unit_type in _MOBILE_INDICES:
+                at = turn.spawns.setdefault(key, {})
+                at[unit_type] = at.get(unit_type, 0) + 1
+                turn.attack_sides[LEFT if key[0] >= _HALF_ARENA else RIGHT] += 1
+                count = self.spawn_counts.get(key, 0) + 1
+                self.spawn_counts[key] = count
+                if self.favorite_spawn is None or count > self.spawn_counts[self.favorite_spawn]:
+                    self.favorite_spawn = key
+            elif unit_type in _STRUCTURE_INDICES and key in self._lost_structures:
+                self._rebuild_delay += turn_number - self._lost_structures.pop(key)
+                self._rebuilt += 1
+                turn.rebuilt += 1
+        for event in events.get("breach", []):
+            if int(event[4]) == 2:
+                turn.breaches[LEFT if event[0][0] < _HALF_ARENA else RIGHT] += 1
+        for location, unit_type, unit_id, player, removed in events.get("death", []):
+            if int(player) == 2 and unit_type in _STRUCTURE_INDICES:
+                self._lost_structures[(int(location[0]), int(location[1]))] = turn_number
+                self._lost += 1
+
+    def __start_turn(self, turn_number, mp):
+        if self.current is not None:
+            if self.current.turn_number == turn_number:
+                if mp is not None:
+                    self.current.mp = mp
+                return
+            self.__finish_turn(self.current)
+        self.current = OpponentTurn(turn_number, mp)
+
+    def __finish_turn(self, turn):
+        self.turns.append(turn)
+        for side in (LEFT, RIGHT):
+            self._side_counts[side] = self._side_counts[side] * self.recency + turn.attack_sides[side]
+            self._breach_counts[side] = self._breach_counts[side] * self.recency + turn.breaches[side]
+        spawned = {}
+        for at in turn.spawns.values():
+            for unit_type, count in at.items():
+                spawned[unit_type] = spawned.get(unit_type, 0) + count
+        for unit_type in self._mix:
+            self._mix[unit_type] = self._mix[unit_type] * self.recency + spawned.get(unit_type, 0)
+
+        if turn.mp is None:
+            return
+        bucket = self.__bucket(turn.mp)
+        self._observed += 1
+        self._turns_by_mp[bucket] = self._turns_by_mp.get(bucket, 0) + 1
+        if turn.attacked:
+            self._attacks += 1
+            self._attacks_by_mp[bucket] = self._attacks_by_mp.get(bucket, 0) + 1
+            if self.min_attack_mp is None or turn.mp < self.min_attack_mp:
+                self.min_attack_mp = turn.mp
+
+    def __bucket(self, mp):
+        return int(mp // self.mp_bucket)
+
+    def attack_probability(self, mp=None):
+        """The probability the opponent attacks this turn
+
+        Args:
+            mp: The MP they hold, the MP of the current turn if None
+
+        Returns:
+            The frequency of attacks on turns they held a similar amount of MP, smoothed towards
+            their overall attack frequency when few such turns were seen
+
+        """
+        if mp is None:
+            mp = self.current.mp if self.current is not None else None
+        overall = (self._attacks + 1) / (self._observed + 2)
+        if mp is None:
+            return overall
+        bucket = self.__bucket(mp)
+        return (self._attacks_by_mp.get(bucket, 0) + overall) / (self._turns_by_mp.get(bucket, 0) + 1)
+
+    def side_probability(self, side):
+        """The probability an attack of the opponent heads for our LEFT or RIGHT side
+        """
+        return (self._side_counts[side] + 1) / (self._side_counts[LEFT] + self._side_counts[RIGHT] + 2)
+
+    def attack_side_probability(self, side, mp=None):
+        """The probability the opponent attacks our LEFT or RIGHT side this turn
+        """
+        return self.attack_probability(mp) * self.side_probability(side)
+
+    def breach_probability(self, side):
+        """The share of the opponent's recent breaches scored on our LEFT or RIGHT side
+        """
+        return (self._breach_counts[side] + 1) / (self._breach_counts[LEFT] + self._breach_counts[RIGHT] + 2)
+
+    def unit_mix(self):
+        """The recent share of each mobile unit type index among the units the opponent spawned
+        """
+        total = sum(self._mix.values())
+        if total == 0:
+            return {unit_type: 0.0 for unit_type in self._mix}
+        return {unit_type: count / total for unit_type, count in self._mix.items()}
+
+    def rebuild_rate(self):
+        """The share of the opponent's lost structures they rebuilt at the same location
+        """
+        return self._rebuilt / self._lost if self._lost else 0.0
+
+    def mean_rebuild_delay(self):
+        """The average number of turns between losing a structure and rebuilding it, None if they never rebuilt
+        """
+        return self._rebuild_delay / self._rebuilt if self._rebuilt else None
+
+    def summary(self):
+        """Writes the model to the debug output
+        """
+        debug_write("Opponent: attack {:.2f} left {:.2f} right {:.2f} min attack MP {} mix {} rebuild {:.2f}".format(
+            self.attack_probability(), self.attack_side_probability(LEFT), self.attack_side_probability(RIGHT),
+            self.min_attack_mp, self.unit_mix(), self.rebuild_rate()))
@@ -0,0 +1,173 @@
+import time
+
+from .util import debug_write
+
+
+class Plan:
+    """A candidate set of build and deploy actions for a single turn.
+
+    Plans only describe actions, they do not touch a GameState until apply() is called.
+    This lets the AnytimePlanner evaluate many candidates against the same state.
+
+    Attributes :
+        * actions (list): Ordered list of (action, unit_type, locations, num) tuples
+        * label (string): A human readable name, used in debug output
+        * score (float): The score given to this plan by the planner, None if it was not evaluated
+
+    """
+    SPAWN = "spawn"
+    UPGRADE = "upgrade"
+    REMOVE = "remove"
+
+    def __init__(self, label=""):
+        self.actions = []
+        self.label = label
+        self.score = None
+
+    def spawn(self, unit_type, locations, num=1):
+        """Adds a spawn action, see GameState.attempt_spawn
+        """
+        self.actions.append((self.SPAWN, unit_type, locations, num))
+        return self
+
+    def upgrade(self, locations):
+        """Adds an upgrade action, see GameState.attempt_upgrade
+        """
+        self.actions.append((self.UPGRADE, None, locations, 1))
+        return self
+
+    def remove(self, locations):
+        """Adds a remove action, see GameState.attempt_remove
+        """
+        self.actions.append((self.REMOVE, None, locations, 1))
+        return self
+
+    def apply(self, game_state):
+        """Applies every action of this plan to the given GameState, in order.
+
+        Args:
+            game_state: The GameState the plan should be spent on
+
+        Returns:
+            The number of units spawned, upgraded or flagged for removal
+
+        """
+        applied = 0
+        for action, unit_type, locations, num in self.actions:
+            if not locations:
+                continue
+            if action == self.SPAWN:
+                applied += game_state.attempt_spawn(unit_type, locations, num) or 0
+            elif action == self.UPGRADE:
+                applied += game_state.attempt_upgrade(locations) or 0
+            elif action == self.REMOVE:
+                applied += game_state.attempt_remove(locations) or 0
+        return applied
+
+    def __str__(self):
+        return "Plan {} ({} actions, score: {})".format(self.label, len(self.actions), self.score)
+
+    def __repr__(self):
+        return self.__str__()
+
+
+class AnytimePlanner:
+    """Searches candidate plans until a wall-clock deadline and keeps the best one found so far.
+
+    Generators are callables taking a GameState and returning an iterable of Plans.
+    They may be infinite, the planner interleaves them and stops when all of them are
+    exhausted or the budget runs out.
+
+    Evaluators are callables taking a GameState and a Plan and returning a score, higher is better.
+    They must not modify the GameState. The score of a plan is the weighted sum of all evaluators.
+
+    Attributes :
+        * budget (float): Seconds the search may run, measured from the start time passed to search()
+        * generators (list): The registered plan generators
+        * evaluators (list): The registered (evaluator, weight) pairs
+        * best (:obj: Plan): The best plan of the last search, None if no plan was evaluated
+        * evaluated (int): The number of plans evaluated during the last search
+
+    """
+    def __init__(self, budget=1.0):
+        self.budget = budget
+        self.generators = []
+        self.evaluators = []
+        self.best = None
+        self.evaluated = 0
+
+    def add_generator(self, generator):
+        """Registers a plan generator
+
+        Args:
+            generator: A callable, generator(game_state) returns an iterable of Plans
+
+        """
+        self.generators.append(generator)
+
+    def add_evaluator(self, evaluator, weight=1.0):
+        """Registers a plan evaluator
+
+        Args:
+            evaluator: A callable, evaluator(game_state, plan) returns a float
+            weight: The weight of this evaluator in the total score
+
+        """
+        self.evaluators.append((evaluator, weight))
+
+    def deadline(self, start_time=None):
+        """The time.monotonic() value at which a search started at start_time must stop
+        """
+        if start_time is None:
+            start_time = time.monotonic()
+        return start_time + self.budget
+
+    def evaluate(self, game_state, plan):
+        """Scores a plan with every registered evaluator
+
+        Returns:
+            The weighted sum of all evaluator scores
+
+        """
+        score = 0.0
+        for evaluator, weight in self.evaluators:
+            score += weight * evaluator(game_state, plan)
+        return score
+
+    def search(self, game_state, start_time=None, warm_start=None):
+        """Evaluates candidate plans until the generators are exhausted or the deadline is reached.
+
+        Args:
+            game_state: The GameState of the current turn, it is not modified
+            start_time: The time.monotonic() value the budget is measured from, usually the arrival time of the turn message
+            warm_start: Plans speculated before the turn started, such as AlgoCore.warm_start. They are evaluated
+                before the generated plans, and only if an evaluator is registered since they were not made for this state
+
+        Returns:
+            The best plan found, or None if no plan could be evaluated in time
+
+        """
+        deadline = self.deadline(start_time)
+        self.best = None
+        self.evaluated = 0
+
+        streams = [iter(generator(game_state)) for generator in self.generators]
+        if warm_start and self.evaluators:
+            streams.insert(0, iter(warm_start))
+        while streams and time.monotonic() < deadline:
+            for stream in list(streams):
+                try:
+                    plan = next(stream)
+                except StopIteration:
+                    streams.remove(stream)
+                    continue
+
+                plan.score = self.evaluate(game_state, plan)
+                self.evaluated += 1
+                if self.best is None or plan.score > self.best.score:
+                    self.best = plan
+
+                if time.monotonic() >= deadline:
+                    debug_write("Planner reached its deadline after {} plans".format(self.evaluated))
+                    break
+        return self.best
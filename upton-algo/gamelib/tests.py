@@ -1,11 +1,39 @@
 import unittest
+import io
+import itertools
 import json
+import os
+import tempfile
+import time
+from unittest import mock
 from .game_state import GameState
 from .unit import GameUnit
+from .planner import Plan, AnytimePlanner
+from .background import BackgroundPlanner
+from .watchdog import TurnWatchdog
+from .frames import parse_turn_info, frame_has_events
+from .algocore import AlgoCore
+from .events import RoundEvents
+from .tracking import UnitTracker
+from .allocation import BuildPriority, SPAllocator
+from .build_order import BuildOrder, BuildOrderRule
+from .opponent import OpponentModel, LEFT, RIGHT
+from .opening_book import OpeningBook, source_hash
+from . import util
+from . import algocore
+
+
+def make_turn_state(turn_number, p1_units=None, p2_units=None, p1_stats=(30.0, 25.0, 5.0, 0), p2_stats=(30.0, 25.0, 5.0, 0)):
+    """A turn state string as sent by the engine, units are lists of [x, y, hp, id] per unit type as in p1Units
+    """
+    empty = [[] for _ in range(8)]
+    return json.dumps({"p1Units": p1_units or empty, "p2Units": p2_units or empty, "turnInfo": [0, turn_number, -1],
+        "p1Stats": list(p1_stats), "p2Stats": list(p2_stats)})
+
 
 class BasicTests(unittest.TestCase):
 
-    def make_turn_0_map(self):
+    def make_turn_0_map(self, sp=None):
         config = """
             {
             "seasonCompatibilityModeP1": 5,
@@ -187,6 +215,8 @@ class BasicTests(unittest.TestCase):
         }
         """
         turn_0 = """{"p2Units":[[],[],[],[],[],[],[]],"turnInfo":[0,0,-1],"p1Stats":[30.0,25.0,5.0,0],"p1Units":[[],[],[],[],[],[],[]],"p2Stats":[30.0,25.0,5.0,0],"events":{"selfDestruct":[],"breach":[],"damage":[],"shield":[],"move":[],"spawn":[],"death":[],"attack":[],"melee":[]}}"""
+        if sp is not None:
+            turn_0 = make_turn_state(0, p1_stats=(30.0, sp, 5.0, 0))
         
         state = GameState(json.loads(config), turn_0)
         state.suppress_warnings(True)
@@ -275,3 +305,354 @@ class BasicTests(unittest.TestCase):
         actual = game.project_future_MP(turns)
         self.assertAlmostEqual(actual, expected, 0, "Expected {} MP {} turns from now, got {}".format(expected, turns, actual))
 
+
+    def test_planner_keeps_best_plan(self):
+        game = self.make_turn_0_map()
+        planner = AnytimePlanner(budget=1.0)
+        planner.add_generator(lambda state: [Plan("one").spawn("FF", [[13, 1]]), Plan("many").spawn("FF", [[12, 1], [13, 1], [14, 1]])])
+        planner.add_evaluator(lambda state, plan: sum(len(action[2]) for action in plan.actions))
+        best = planner.search(game)
+        self.assertEqual("many", best.label, "The planner did not keep the best scoring plan")
+        self.assertEqual(2, planner.evaluated, "Both candidates should have been evaluated")
+        self.assertEqual(3, best.apply(game), "Applying the plan should spawn three walls")
+        self.assertEqual(3, len(json.loads(game.turn_strings()[0])), "Applied plan is missing from the build queue")
+
+        warm = [Plan("warm").spawn("FF", [[11, 1], [12, 1], [13, 1], [14, 1]])]
+        self.assertEqual("warm", planner.search(game, warm_start=warm).label, "The warm start plans were not evaluated")
+        self.assertEqual(None, AnytimePlanner(budget=1.0).search(game, warm_start=warm), "Warm start plans should not be picked unranked")
+
+    def test_planner_stops_at_deadline(self):
+        game = self.make_turn_0_map()
+        planner = AnytimePlanner(budget=0.01)
+        planner.add_generator(lambda state: (Plan(str(i)) for i in itertools.count()))
+        planner.add_evaluator(lambda state, plan: -int(plan.label))
+        best = planner.search(game)
+        self.assertEqual("0", best.label, "An infinite search should still return its best plan")
+        self.assertEqual(None, AnytimePlanner(budget=0).search(game), "A planner without candidates has no plan")
+
+    def test_background_planner_batches_frames(self):
+        def speculate(config, frames, warm_start):
+            return (warm_start or []) + frames
+
+        planner = BackgroundPlanner(speculate)
+        planner.start()
+        for frame in ["frame 0", "frame 1", "frame 2"]:
+            planner.submit(frame)
+        self.assertEqual(["frame 0", "frame 1", "frame 2"], planner.collect(timeout=5), "Frames were dropped by the background planner")
+        self.assertEqual(None, planner.collect(), "The warm start should be reset for the next round")
+        planner.stop()
+
+    def test_watchdog_submits_fallback_once(self):
+        game = self.make_turn_0_map()
+        watchdog = TurnWatchdog(0.01)
+        util.set_turn_watchdog(watchdog)
+        try:
+            with mock.patch("sys.stdout", new_callable=io.StringIO) as stdout:
+                watchdog.start_turn()
+                game.attempt_spawn("FF", [[13, 1]])
+                game.record_fallback()
+                deadline = time.monotonic() + 5
+                while not watchdog.fired and time.monotonic() < deadline:
+                    time.sleep(0.01)
+                game.attempt_spawn("FF", [[13, 2]])
+                game.submit_turn()
+            self.assertTrue(watchdog.fired, "The watchdog did not fire")
+            self.assertEqual('[["FF", 13, 1]]\n[]\n', stdout.getvalue(), "Exactly the recorded fallback turn should be sent")
+        finally:
+            util.set_turn_watchdog(None)
+
+        # A timer of the previous turn that fires after the next turn started must not submit anything
+        watchdog = TurnWatchdog(60)
+        with mock.patch("threading.Timer") as timer, mock.patch("sys.stdout", new_callable=io.StringIO) as stdout:
+            watchdog.start_turn()
+            watchdog.start_turn()
+            stale_timer = timer.call_args_list[0]
+            stale_timer[0][1](*stale_timer[1]["args"])
+            self.assertFalse(watchdog.fired, "A timer of the previous turn fired in the current one")
+            self.assertTrue(watchdog.submit("[]", "[]"), "The turn should still be submitted by the strategy")
+
+    def test_frame_header_checks(self):
+        frame = """{"p2Units":[[],[],[],[],[],[],[]],"turnInfo":[1,3,12],"events":{"breach":[[[13,27],1.0,3,"12",1]],"death":[ ],"damage":[]}}"""
+        self.assertEqual([1, 3, 12], parse_turn_info(frame), "turnInfo was not read from the raw frame")
+        self.assertTrue(frame_has_events(frame, ["breach"]), "The breach event was missed")
+        self.assertFalse(frame_has_events(frame, ["death", "damage"]), "Empty event lists should not match")
+
+    def test_frame_subscriptions(self):
+        frame = """{{"turnInfo":[1,0,{}],"events":{{"breach":[{}],"death":[]}}}}"""
+        messages = [
+            frame.format(0, ""), frame.format(1, '[[13,27],1.0,3,"12",1]'), frame.format(2, ""), frame.format(3, ""),
+            """{"turnInfo":[2,1,-1]}""",
+        ]
+        core = AlgoCore()
+        breaches, evens, last = [], [], []
+        core.subscribe_frames(events=["breach"], handler=breaches.append)
+        core.subscribe_frames(every=2, handler=evens.append)
+        core.subscribe_frames(last_only=True, handler=last.append)
+        with mock.patch.object(algocore, "get_command", side_effect=messages), mock.patch.object(algocore, "debug_write"):
+            core.start()
+        self.assertEqual([messages[1]], breaches, "Only the frame with a breach should be received")
+        self.assertEqual([messages[0], messages[2]], evens, "Every second frame should be received")
+        self.assertEqual([messages[3]], last, "Only the last frame of the action phase should be received")
+
+    def test_round_events_aggregates(self):
+        events = RoundEvents()
+        frame = """{{"turnInfo":[1,{},{}],"events":{{"damage":[[[3,12],15.0,2,"7",1],[[14,20],4.0,3,"9",2]],"breach":[[[2,13],1.0,3,"12",2]],"death":[[[3,12],2,"7",1,false],[[4,12],0,"8",1,true]],"spawn":[[[13,0],3,"13",1]]}}}}"""
+        events.add_frame(frame.format(4, 0))
+        events.add_frame(frame.format(4, 1))
+        self.assertEqual(4, events.turn_number, "The round should belong to turn 4")
+        self.assertEqual({(3, 12): 30.0}, events.structure_damage[0], "Structure damage was not accumulated")
+        self.assertEqual({}, events.structure_damage[1], "Mobile unit damage is not structure damage")
+        self.assertEqual({(2, 13): 2}, events.breach_cells[1], "Enemy breaches were not counted")
+        self.assertEqual({2: 2}, events.units_lost[0], "Structures removed by their owner are not losses")
+        self.assertEqual(4, events.count("damage"), "Damage events are missing from the columns")
+        self.assertEqual(1, events.columns["spawn"].frame[-1], "Frame numbers were not stored")
+        events.add_frame(frame.format(5, 0))
+        self.assertEqual(1, events.frames, "A new round should reset the accumulated events")
+        events.add_frame("""{"turnInfo":[1,5,1],"events":{"death":[[[2,13],3,"12",2,false]],"breach":[[[2,13],1.0,3,"12",2]]}}""")
+        events.add_frame("""{"turnInfo":[1,5,2],"events":{"breach":[[[3,14],1.0,3,"14",2]]}}""")
+        events.add_frame("""{"turnInfo":[1,5,3],"events":{"death":[[[3,14],3,"14",2,false],[[5,14],3,"15",2,false]]}}""")
+        self.assertEqual({3: 1}, events.units_lost[1], "Units that breached are not losses")
+        events.start_turn(6)
+        self.assertEqual({3: 1}, events.units_lost[1], "The events of the round before turn 6 should be kept")
+        events.start_turn(8)
+        self.assertEqual(({}, 7), (events.breach_cells[1], events.turn_number), "The events of an older round should be dropped")
+
+    def test_incremental_game_state(self):
+        game = self.make_turn_0_map()
+        first = GameState(game.config, make_turn_state(1, [[[0, 13, 60.0, "1"]], [], [[3, 12, 75.0, "2"]], [], [], [], [], []]))
+        cache = first.location_cache("threat", radius=1)
+        cache[[0, 13]] = 1
+        cache[[3, 13]] = 2
+        upgraded = [[[0, 13, 60.0, "1"]], [], [[3, 12, 70.0, "2"]], [], [], [], [], [[3, 12, 70.0, "3"]]]
+        second = GameState(game.config, make_turn_state(2, upgraded), first)
+
+        self.assertIs(first.game_map[0, 13][0], second.game_map[0, 13][0], "An unchanged wall should be reused")
+        self.assertIsNot(first.game_map[3, 12][0], second.game_map[3, 12][0], "A damaged turret should not be reused")
+        self.assertTrue(second.game_map[3, 12][0].upgraded, "The upgrade was not applied")
+        self.assertEqual((["2"], ["2"], []), (second.board_diff.damaged, second.board_diff.upgraded, second.board_diff.added), "Wrong board diff")
+        fresh = GameState(game.config, make_turn_state(2, upgraded))
+        self.assertEqual(fresh.board_hash, second.board_hash, "The incremental board hash differs from a full one")
+        self.assertEqual({(0, 13): 1}, second.location_cache("threat").values, "Only the entry near the turret should be dropped")
+
+        third = GameState(game.config, make_turn_state(3, [[], [], [[3, 12, 70.0, "2"]], [], [], [], [], [[3, 12, 70.0, "3"]]]), second)
+        self.assertEqual(["1"], third.board_diff.removed, "The destroyed wall is missing from the diff")
+        self.assertEqual(0, len(third.location_cache("threat")), "The entry at the destroyed wall should be dropped")
+
+    def test_structure_indexes(self):
+        game = self.make_turn_0_map()
+        game.attempt_spawn("DF", [[3, 12], [24, 12]])
+        game.attempt_spawn("FF", [[0, 13]])
+        self.assertEqual({(3, 12), (24, 12)}, game.game_map.structure_locations("DF", upgraded=False), "Turrets are not indexed")
+        self.assertFalse(game.contains_certain_upgraded_unit([3, 12]), "The turret is not upgraded yet")
+        game.attempt_upgrade([3, 12])
+        self.assertIs(game.contains_stationary_unit([3, 12]), game.contains_certain_upgraded_unit([3, 12]), "The upgraded turret was not found")
+        self.assertEqual({(3, 12)}, game.game_map.structure_locations("DF", upgraded=True), "The upgrade did not update the index")
+        game.attempt_remove([0, 13])
+        self.assertEqual({(0, 13)}, game.game_map.pending_removal_locations(), "The removal did not update the index")
+        game.game_map.remove_unit([0, 13])
+        self.assertFalse(game.contains_stationary_unit([0, 13]), "A removed wall is still indexed")
+        self.assertEqual(set(), game.game_map.pending_removal_locations(), "A removed wall is still pending removal")
+
+    def test_bulk_placement(self):
+        game = self.make_turn_0_map()
+        reference = self.make_turn_0_map()
+        walls = [[0, 13], [1, 13], [0, 13], [13, 20], [5, 10]]
+        statuses = game.attempt_spawn_many("FF", walls)
+        self.assertEqual([game.OK, game.OK, game.BLOCKED, game.ENEMY_TERRITORY, game.OK], statuses, "Wrong wall statuses")
+        self.assertEqual(3, reference.attempt_spawn("FF", walls), "The reference spawn is wrong")
+        self.assertEqual(reference.turn_strings(), game.turn_strings(), "Bulk spawning built different walls")
+        self.assertEqual(reference.get_resources(), game.get_resources(), "Bulk spawning spent different resources")
+
+        self.assertEqual([game.OK, game.NOT_ON_EDGE], game.attempt_spawn_many("PI", [[13, 0], [13, 5]], 2), "Wrong scout statuses")
+        self.assertEqual(3, game.get_resource(game.MP), "Two scouts should have been paid for")
+        self.assertEqual([game.NOT_AFFORDABLE], game.attempt_spawn_many("PI", [[14, 0]], 4), "Scouts are placed all or nothing")
+
+        self.assertEqual([game.OK, game.NO_STRUCTURE], game.attempt_upgrade_many([[0, 13], [2, 13]]), "Wrong upgrade statuses")
+        self.assertEqual([game.NOT_UPGRADABLE], game.attempt_upgrade_many([[0, 13]]), "A structure cannot be upgraded twice")
+        self.assertEqual([game.OK, game.OK], game.attempt_remove_many([[0, 13], [5, 10]]), "Wrong removal statuses")
+        self.assertEqual({(0, 13), (5, 10)}, game.game_map.pending_removal_locations(), "Removals are not indexed")
+
+        self.assertEqual([game.INVALID_REQUEST] * 2, game.attempt_spawn_many("XX", [[13, 0], [14, 0]]), "An invalid unit should fail every location")
+        self.assertEqual([game.INVALID_REQUEST], game.attempt_spawn_many("PI", [13, 0], 0), "Fewer than one unit should fail the location")
+        self.assertEqual([], game.attempt_upgrade_many([]), "An empty batch has no statuses")
+
+    def test_savepoint_rollback(self):
+        game = self.make_turn_0_map()
+        game.attempt_spawn("DF", [[3, 12]])
+        resources = game.get_resources()
+        outer = game.savepoint()
+        game.attempt_upgrade([[3, 12]])
+        inner = game.savepoint()
+        game.attempt_spawn("FF", [[0, 13], [1, 13]])
+        game.attempt_spawn("PI", [[13, 0]], 2)
+        game.attempt_remove([[0, 13]])
+        game.rollback(inner)
+        self.assertFalse(game.contains_stationary_unit([0, 13]), "The wall was not rolled back")
+        self.assertEqual(0, len(game.game_map[13, 0]), "The scouts were not rolled back")
+        self.assertEqual("[]", game.turn_strings()[1], "The deploy stack was not rolled back")
+        self.assertTrue(game.contains_certain_upgraded_unit([3, 12]), "Rolling back the inner savepoint undid the upgrade")
+
+        game.rollback(outer)
+        turret = game.contains_stationary_unit([3, 12])
+        self.assertFalse(turret.upgraded, "The upgrade was not rolled back")
+        self.assertEqual(turret.cost, game.type_cost("DF"), "The turret stats were not restored")
+        self.assertEqual({(3, 12)}, game.game_map.structure_locations("DF", upgraded=False), "The index was not restored")
+        self.assertEqual('[["DF", 3, 12]]', game.turn_strings()[0], "The build stack was not rolled back")
+        self.assertEqual(resources, game.get_resources(), "The resources were not rolled back")
+
+        self.assertRaises(ValueError, game.rollback, inner)
+        game.attempt_spawn("FF", [[0, 13]])
+        game.rollback(outer)
+        self.assertFalse(game.contains_stationary_unit([0, 13]), "The savepoint did not stay usable after rolling back to it")
+
+        inner = game.savepoint()
+        game.attempt_spawn("FF", [[0, 13]])
+        game.release(inner)
+        self.assertRaises(ValueError, game.rollback, inner)
+        game.rollback(outer)
+        self.assertFalse(game.contains_stationary_unit([0, 13]), "Releasing the inner savepoint broke the outer one")
+
+        game.commit()
+        self.assertRaises(ValueError, game.rollback, outer)
+
+    def test_allocator_beats_greedy(self):
+        game = self.make_turn_0_map(sp=8.0)
+        game.attempt_spawn("DF", [[3, 12]])
+        # Greedy would upgrade the turret for 4 SP and afford a single wall, the allocator builds three walls
+        priorities = [BuildPriority("DF", [[3, 12]], upgrade=True, value=1.5), BuildPriority("FF", [[0, 13], [1, 13], [2, 13]], value=1.0)]
+        plan = SPAllocator(priorities).solve(game, budget=5)
+        self.assertEqual(3.0, plan.score, "The allocation is not optimal")
+        plan.apply(game)
+        self.assertEqual(3.0, game.get_resource(game.SP), "The allocation went over budget")
+        self.assertFalse(game.contains_certain_upgraded_unit([3, 12]), "The turret should not be upgraded")
+
+    def test_allocator_fallback_hierarchy(self):
+        game = self.make_turn_0_map(sp=5.0)
+        allocator = SPAllocator([BuildPriority("DF", [[3, 12], [4, 12], [5, 12]])], hierarchy=["DF", "FF", "EF"])
+        allocator.solve(game).apply(game)
+        types = [game.contains_stationary_unit(location).unit_type for location in [[3, 12], [4, 12], [5, 12]]]
+        self.assertEqual(["DF", "DF", "FF"], sorted(types), "Turrets that cannot be afforded should fall back to walls")
+
+    def test_build_order(self):
+        game = self.make_turn_0_map(sp=7.0)
+        game.attempt_spawn("FF", [[0, 13]])
+        game.contains_stationary_unit([0, 13]).health = 10
+        order = BuildOrder([
+            BuildOrderRule("FF", [[0, 13], [1, 13]], repair_threshold=0.5, required=True),
+            BuildOrderRule("DF", [[3, 12], [4, 12], [5, 12]], required=True, fallback=True),
+            BuildOrderRule("DF", [[10, 12]], required=True),
+            BuildOrderRule("FF", [[12, 12]]),
+            BuildOrderRule("FF", [[11, 12]], first_turn=1),
+            ], hierarchy=["DF", "FF", "EF"])
+        self.assertFalse(order.execute(game), "There is no SP left for the last turret")
+        self.assertEqual({(0, 13)}, game.game_map.pending_removal_locations(), "The damaged wall should be flagged for removal")
+        self.assertTrue(game.contains_stationary_unit([1, 13]), "The missing wall was not built")
+        types = [game.contains_stationary_unit(location).unit_type for location in [[3, 12], [4, 12], [5, 12]]]
+        self.assertEqual(["DF", "DF", "FF"], sorted(types), "Turrets that cannot be afforded should fall back to walls")
+        self.assertFalse(game.contains_stationary_unit([12, 12]), "Rules after an incomplete required rule should be skipped")
+
+        # The next turn, with the damaged wall removed and SP for the rest
+        game = GameState(game.config, make_turn_state(0, p1_units=[[[1, 13, 60.0, "1"], [5, 12, 60.0, "2"]], [],
+            [[3, 12, 75.0, "3"], [4, 12, 75.0, "4"]], [], [], [], [], []], p1_stats=(30.0, 10.0, 5.0, 0)))
+        self.assertTrue(order.execute(game), "The build order should be complete")
+        self.assertFalse(game.contains_stationary_unit([11, 12]), "The rule is not active on turn 0")
+
+        game = self.make_turn_0_map()
+        game.attempt_spawn("DF", [[3, 12]])
+        BuildOrder([BuildOrderRule("DF", [[3, 12], [4, 12]], build=False, upgrade=True, fallback=True)]).execute(game)
+        self.assertTrue(game.contains_certain_upgraded_unit([3, 12]), "The standing turret was not upgraded")
+        self.assertFalse(game.contains_stationary_unit([4, 12]), "A rule without build should not build missing turrets")
+
+        game = self.make_turn_0_map(sp=4.0)
+        game.attempt_spawn("FF", [[0, 13], [12, 12]])
+        game.contains_stationary_unit([12, 12]).health = 10
+        order = BuildOrder([
+            BuildOrderRule("FF", [[0, 13], [1, 13]], upgrade=True, fallback=True),
+            BuildOrderRule("DF", [[3, 12]], required=True),
+            BuildOrderRule("FF", [[12, 12]], repair_threshold=0.5),
+            ])
+        self.assertFalse(order.execute(game), "The turrets cannot all be afforded")
+        self.assertTrue(game.contains_certain_upgraded_unit([1, 13]), "The missing wall was not built upgraded")
+        self.assertFalse(game.contains_certain_upgraded_unit([0, 13]), "A standing wall should not be upgraded by a fallback rule")
+        self.assertEqual(set(), game.game_map.pending_removal_locations(), "An incomplete required rule should stop later repairs")
+
+    def test_opponent_model(self):
+        game = self.make_turn_0_map()
+        model = OpponentModel(recency=1.0, mp_bucket=5)
+        model.observe_state(game)
+        model.add_frame({"turnInfo": [1, 0, 0], "events": {"spawn": [[[20, 21], 2, "1", 2], [[21, 21], 2, "2", 2]]}})
+        model.add_frame({"turnInfo": [1, 1, 0], "events": {"spawn": [[[20, 21], 3, "3", 2], [[20, 21], 3, "4", 2], [[13, 0], 3, "5", 1]]}})
+        model.add_frame({"turnInfo": [1, 1, 9], "events": {
+            "breach": [[[2, 13], 1.0, 3, "3", 2]],
+            "death": [[[21, 21], 2, "2", 2, False]]}})
+        model.add_frame({"turnInfo": [1, 2, 0], "events": {"spawn": [[[21, 21], 2, "6", 2]]}})
+
+        self.assertEqual([5.0, None], [turn.mp for turn in model.turns], "Only turn 0 had a turn state")
+        self.assertEqual([False, True], [turn.attacked for turn in model.turns], "Only turn 1 was an attack")
+        self.assertEqual(None, model.min_attack_mp, "Turns without a turn state do not set the attack MP")
+        self.assertEqual(3 / 4, model.side_probability(LEFT), "Units from the top right edge attack our left")
+        self.assertEqual(2 / 3, model.breach_probability(LEFT), "The breach on our left was not counted")
+        self.assertEqual(1.0, model.unit_mix()[3], "Only scouts were spawned")
+        self.assertEqual((20, 21), model.favorite_spawn, "Wrong favorite spawn location")
+        self.assertEqual(1.0, model.rebuild_rate(), "The turret was rebuilt")
+        self.assertEqual(1.0, model.mean_rebuild_delay(), "The turret was rebuilt one turn later")
+        self.assertLess(model.attack_probability(5.0), 0.5, "They never attacked holding 5 MP")
+        self.assertGreater(model.attack_side_probability(LEFT), model.attack_side_probability(RIGHT), "Left is attacked more often")
+
+        raw = OpponentModel()
+        raw.observe_turn_state(make_turn_state(3, p2_stats=(30.0, 25.0, 7.0, 0)))
+        self.assertEqual((3, 7.0), (raw.current.turn_number, raw.current.mp), "The raw turn state was not observed")
+
+    def test_opening_book(self):
+        game = self.make_turn_0_map()
+        def wall(hp, unit_id):
+            return [[[0, 13, hp, unit_id]], [], [], [], [], [], [], []]
+        expected = make_turn_state(1, wall(60.0, "1"))
+        with tempfile.TemporaryDirectory() as directory:
+            book = OpeningBook(game.config, version="test", directory=directory)
+            self.assertFalse(book.play(expected), "An empty book should not play")
+            game.attempt_spawn("FF", [[13, 0]])
+            book.record(expected, game)
+
+            book = OpeningBook(game.config, version="test", directory=directory)
+            with mock.patch("sys.stdout", new_callable=io.StringIO) as stdout:
+                self.assertTrue(book.play(make_turn_state(1, wall(60.0, "7"))), "Unit IDs should not matter")
+                self.assertFalse(book.play(make_turn_state(1, wall(30.0, "1"))), "A damaged wall is a deviation")
+                self.assertFalse(book.play(make_turn_state(5, wall(60.0, "1"))), "Turn 5 is past the opening")
+            self.assertEqual('[["FF", 13, 0]]\n[]\n', stdout.getvalue(), "The recorded turn was not sent")
+            self.assertEqual(0, len(OpeningBook(game.config, version="other", directory=directory).entries), "Versions should not share a book")
+
+        with tempfile.TemporaryDirectory() as directory:
+            with open(os.path.join(directory, "strategy.py"), "w") as f:
+                f.write("a")
+            os.makedirs(os.path.join(directory, "gamelib"))
+            os.makedirs(os.path.join(directory, "opening_book"))
+            version = source_hash(directory)
+            with open(os.path.join(directory, "opening_book", "book.json"), "w") as f:
+                f.write("{}")
+            self.assertEqual(version, source_hash(directory), "The opening books should not change the version")
+            with open(os.path.join(directory, "gamelib", "util.py"), "w") as f:
+                f.write("b")
+            self.assertNotEqual(version, source_hash(directory), "A library change should change the version")
+
+    def test_unit_tracker_follows_ids(self):
+        game = self.make_turn_0_map()
+        tracker = UnitTracker(game.config)
+        tracker.add_frame({"turnInfo": [1, 0, 0], "events": {"spawn": [[[3, 12], 2, "5", 1], [[14, 14], 3, "6", 2]]}})
+        tracker.add_frame({"turnInfo": [1, 1, 0], "events": {"spawn": [[[3, 12], 7, "9", 1]]}})
+        tracker.add_frame({"turnInfo": [1, 1, 4], "events": {
+            "attack": [[[14, 14], [3, 12], 2.0, 3, "6", "5", 2]],
+            "damage": [[[3, 12], 2.0, 2, "5", 1]]}})
+        tracker.add_frame({"turnInfo": [1, 1, 5], "events": {"death": [[[3, 12], 2, "5", 1, False]]}})
+        turret = tracker["5"]
+        self.assertEqual((0, 0), turret.built, "The turret was spawned on turn 0")
+        self.assertEqual((1, 0), turret.upgraded, "The upgrade spawn event was not matched to the turret")
+        self.assertEqual([90.0, 88.0], [entry[2] for entry in turret.hp_history], "Health history is wrong")
+        self.assertEqual((1, 5), turret.died, "The turret died on turn 1 frame 5")
+        self.assertEqual((3, "6"), turret.killed_by, "The turret was killed by the scout")
+        self.assertEqual(None, tracker.structure_at([3, 12], 0), "A dead structure should not be indexed")
+        self.assertTrue(tracker["6"].alive, "The scout is still alive")
+        tracker.add_frame({"turnInfo": [1, 1, 6], "events": {"attack": [[[3, 12], [14, 14], 2.0, 7, "9", "6", 1]]}})
+        tracker.add_frame({"turnInfo": [1, 1, 7], "events": {}})
+        tracker.add_frame({"turnInfo": [1, 1, 8], "events": {"death": [[[14, 14], 3, "6", 2, False]]}})
+        self.assertEqual(None, tracker["6"].killed_by, "An attack two frames before the death should be forgotten")
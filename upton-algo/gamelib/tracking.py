@@ -0,0 +1,170 @@
+import json
+
+# Unit type indices of the pseudo units REMOVE and UPGRADE, see p1Units in json-docs.html
+_REMOVE_INDEX = 6
+_UPGRADE_INDEX = 7
+
+
+class UnitRecord:
+    """The history of a single unit, identified by its engine ID.
+
+    Times are (turn_number, frame_number) pairs, frame_number is -1 for units seen in a turn state.
+
+    Attributes :
+        * unit_id (string): The unique engine ID of the unit
+        * unit_type (int): Index of the unit type, as in UNIT_TYPE_TO_INDEX
+        * player_index (int): The player that controls this unit. 0 for you, 1 for your opponent.
+        * location ([int, int]): The last known location of the unit
+        * built (tuple): When the unit was spawned or first seen
+        * upgraded (tuple): When the unit was upgraded, None if it never was
+        * removal_requested (tuple): When its owner flagged it for removal, None if they never did
+        * hp_history (list): (turn_number, frame_number, health) entries, one per change of health
+        * died (tuple): When the unit died, None while it is alive
+        * killed_by: What destroyed the unit: the (unit_type, unit_id) of the last unit that attacked it,
+            "removed", "breach" or "selfDestruct". None while it is alive or if the cause is unknown
+
+    """
+    def __init__(self, unit_id, unit_type, player_index, location, health, time):
+        self.unit_id = unit_id
+        self.unit_type = unit_type
+        self.player_index = player_index
+        self.location = location
+        self.built = time
+        self.upgraded = None
+        self.removal_requested = None
+        self.hp_history = [(time[0], time[1], health)]
+        self.died = None
+        self.killed_by = None
+
+    @property
+    def health(self):
+        """The last known health of the unit
+        """
+        return self.hp_history[-1][2]
+
+    @property
+    def alive(self):
+        return self.died is None
+
+    def __str__(self):
+        return "Unit {} type {} of player {} at {}, health: {} built: {} upgraded: {} died: {} killed by: {}".format(
+            self.unit_id, self.unit_type, self.player_index, self.location, self.health, self.built, self.upgraded, self.died, self.killed_by)
+
+    def __repr__(self):
+        return self.__str__()
+
+
+class UnitTracker:
+    """Follows units across turns and action frames by their engine IDs.
+
+    Feed it every action frame with spawn, damage, attack, breach, selfDestruct and death events,
+    and with move events if the locations of mobile units are needed.
+    Each frame only touches the units its events mention, the unit lists are never rescanned.
+    Units that existed before tracking started can be registered once with observe_state.
+    Shields are not followed, so the health of shielded mobile units may be too low.
+
+    Attributes :
+        * config (JSON): Contains information about the game
+        * units (dict): Maps engine IDs to UnitRecords, dead units included
+
+    """
+    def __init__(self, config):
+        self.config = config
+        self.units = {}
+        self._structures = {}
+        # Last attacker of each unit hit in the current and in the previous frame, a unit dies the frame after the hit
+        self._attackers = {}
+        self._previous_attackers = {}
+
+    def __getitem__(self, unit_id):
+        return self.units[unit_id]
+
+    def __contains__(self, unit_id):
+        return unit_id in self.units
+
+    def structure_at(self, location, player_index):
+        """The record of the living structure of the given player at a location, None if there is none
+        """
+        unit_id = self._structures.get((player_index, tuple(location)))
+        return self.units[unit_id] if unit_id is not None else None
+
+    def observe_state(self, game_state):
+        """Registers the structures of a turn state the tracker has not seen yet.
+        Only needed when tracking starts after turn 0, spawn events cover every later unit.
+        """
+        from .game_state import UNIT_TYPE_TO_INDEX
+        for location in game_state.game_map:
+            for unit in game_state.game_map[location]:
+                if unit.unit_id is None or unit.unit_id in self.units:
+                    continue
+                record = self.__add_unit(unit.unit_id, UNIT_TYPE_TO_INDEX[unit.unit_type], unit.player_index, [unit.x, unit.y],
+                    unit.health, (game_state.turn_number, -1))
+                if unit.upgraded:
+                    record.upgraded = record.built
+                if unit.pending_removal:
+                    record.removal_requested = record.built
+
+    def add_frame(self, frame):
+        """Applies the events of an action frame
+
+        Args:
+            frame: An action frame, either the raw string from the engine or the decoded json object
+
+        """
+        if isinstance(frame, str):
+            frame = json.loads(frame)
+        turn_info = frame["turnInfo"]
+        time = (int(turn_info[1]), int(turn_info[2]))
+        events = frame.get("events", {})
+
+        for location, unit_type, unit_id, player in events.get("spawn", []):
+            self.__spawn(location, unit_type, unit_id, int(player) - 1, time)
+        # Units that survived their last hit are forgotten, the map only ever spans two frames
+        self._previous_attackers = self._attackers
+        self._attackers = {}
+        for event in events.get("attack", []):
+            self._attackers[event[5]] = (event[3], event[4])
+        for event in events.get("breach", []):
+            self._attackers[event[3]] = "breach"
+        for event in events.get("selfDestruct", []):
+            self._attackers[event[4]] = "selfDestruct"
+        for location, damage, unit_type, unit_id, player in events.get("damage", []):
+            record = self.units.get(unit_id)
+            if record is not None:
+                record.hp_history.append((time[0], time[1], record.health - damage))
+        for location, unit_type, unit_id, player, removed in events.get("death", []):
+            record = self.units.get(unit_id)
+            if record is None:
+                continue
+            record.died = time
+            record.killed_by = "removed" if removed else self._attackers.get(unit_id, self._previous_attackers.get(unit_id))
+            self._structures.pop((record.player_index, tuple(record.location)), None)
+        for event in events.get("move", []):
+            record = self.units.get(event[4])
+            if record is not None:
+                record.location = event[1]
+
+    def __spawn(self, location, unit_type, unit_id, player_index, time):
+        if unit_type == _UPGRADE_INDEX or unit_type == _REMOVE_INDEX:
+            structure = self.structure_at(location, player_index)
+            if structure is None:
+                return
+            if unit_type == _UPGRADE_INDEX:
+                structure.upgraded = time
+                # Upgrading adds the difference in starting health to the current health
+                type_config = self.config["unitInformation"][structure.unit_type]
+                extra_health = type_config.get("upgrade", {}).get("startHealth", type_config.get("startHealth", 0)) - type_config.get("startHealth", 0)
+                if extra_health:
+                    structure.hp_history.append((time[0], time[1], structure.health + extra_health))
+            else:
+                structure.removal_requested = time
+            return
+        health = self.config["unitInformation"][unit_type].get("startHealth", 0)
+        self.__add_unit(unit_id, unit_type, player_index, location, health, time)
+
+    def __add_unit(self, unit_id, unit_type, player_index, location, health, time):
+        record = UnitRecord(unit_id, unit_type, player_index, list(location), health, time)
+        self.units[unit_id] = record
+        if self.config["unitInformation"][unit_type].get("unitCategory") == 0:
+            self._structures[(player_index, tuple(location))] = unit_id
+        return record
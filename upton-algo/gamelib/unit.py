@@ -30,9 +30,10 @@ class GameUnit:
         * shieldPerUnit (float): how much shield is given per unit
         * pending_removal (boolean): If this unit is marked for removal by its owner
         * upgraded (boolean): If this unit is upgraded
+        * unit_id (string): The unique engine ID of this unit, stays the same between turns and frames. None for units not parsed from the engine
 
     """
-    def __init__(self, unit_type, config, player_index=None, health=None, x=-1, y=-1):
+    def __init__(self, unit_type, config, player_index=None, health=None, x=-1, y=-1, unit_id=None):
         """ Initialize unit variables using args passed
 
         """
@@ -43,6 +44,7 @@ class GameUnit:
         self.upgraded = False
         self.x = x
         self.y = y
+        self.unit_id = unit_id
         self.__serialize_type()
         self.health = self.max_health if not health else health
 
@@ -3,6 +3,9 @@ import sys
 
 BANNER_TEXT = "---------------- Starting Your Algo --------------------"
 
+# The TurnWatchdog guarding the current turn, see set_turn_watchdog
+_turn_watchdog = None
+
 
 def get_command():
     """Gets input from stdin
@@ -29,6 +32,36 @@ def send_command(cmd):
     sys.stdout.write(cmd.strip() + "\n")
     sys.stdout.flush()
 
+def set_turn_watchdog(watchdog):
+    """Routes every turn submitted through send_turn via the given TurnWatchdog.
+    Pass None to send turns directly again.
+
+    """
+    global _turn_watchdog
+    _turn_watchdog = watchdog
+
+def send_turn(build_string, deploy_string):
+    """Sends the build and deploy lines of a turn.
+    If a TurnWatchdog is active, the turn is suppressed when one was already sent for this turn.
+
+    Returns:
+        True if the turn was sent
+
+    """
+    if _turn_watchdog is not None:
+        return _turn_watchdog.submit(build_string, deploy_string)
+    send_command(build_string)
+    send_command(deploy_string)
+    return True
+
+def record_fallback_turn(build_stack, deploy_stack):
+    """Records the given commands as the turn the active TurnWatchdog submits if the deadline is reached.
+    Does nothing if no watchdog is active.
+
+    """
+    if _turn_watchdog is not None:
+        _turn_watchdog.record(build_stack, deploy_stack)
+
 def debug_write(*msg):
     """Prints a message to the games debug output
 
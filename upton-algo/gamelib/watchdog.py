@@ -0,0 +1,95 @@
+import json
+import threading
+import time
+
+from .util import send_command, debug_write
+
+
+class TurnWatchdog:
+    """Submits a fallback turn if the strategy has not submitted one before a soft deadline.
+
+    Exactly one turn is sent per turn message, whether by the strategy or by the watchdog.
+    Anything submitted after that in the same turn is suppressed so the engine protocol never desyncs.
+
+    Attributes :
+        * soft_deadline (float): Seconds after the arrival of the turn message at which the fallback is sent
+        * fired (bool): True if the watchdog sent the fallback turn for the current turn
+
+    """
+    def __init__(self, soft_deadline):
+        self.soft_deadline = soft_deadline
+        self.fired = False
+        self._lock = threading.Lock()
+        self._submitted = True
+        self._timer = None
+        self._fallback = ([], [])
+        # Counts the turns, a timer of an earlier turn that fires late must not submit in the current one
+        self._generation = 0
+
+    def start_turn(self, start_time=None):
+        """Arms the watchdog for a new turn and forgets the fallback of the previous one
+
+        Args:
+            start_time: The time.monotonic() value the deadline is measured from, defaults to now
+
+        """
+        if start_time is None:
+            start_time = time.monotonic()
+        with self._lock:
+            self.cancel()
+            self._submitted = False
+            self.fired = False
+            self._fallback = ([], [])
+            self._generation += 1
+            delay = max(0, self.soft_deadline - (time.monotonic() - start_time))
+            # daemon so a pending timer never keeps the algo alive
+            self._timer = threading.Timer(delay, self._fire, args=(self._generation,))
+            self._timer.daemon = True
+            self._timer.start()
+
+    def cancel(self):
+        """Stops the timer without sending anything
+        """
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+    def record(self, build_stack, deploy_stack):
+        """Records the best turn found so far, it is sent if the deadline is reached
+
+        Args:
+            build_stack: List of (unit_type, x, y) structure commands
+            deploy_stack: List of (unit_type, x, y) mobile unit commands
+
+        """
+        with self._lock:
+            self._fallback = (list(build_stack), list(deploy_stack))
+
+    def submit(self, build_string, deploy_string):
+        """Sends a turn unless one was already sent for the current turn
+
+        Returns:
+            True if the turn was sent
+
+        """
+        with self._lock:
+            if self._submitted:
+                debug_write("Turn already submitted, suppressing late submission")
+                return False
+            self._submitted = True
+            self.cancel()
+            send_command(build_string)
+            send_command(deploy_string)
+            return True
+
+    def _fire(self, generation):
+        with self._lock:
+            if generation != self._generation or self._submitted:
+                return
+            self._submitted = True
+            self.fired = True
+            build_stack, deploy_stack = self._fallback
+            debug_write("Watchdog deadline of {}s reached, submitting fallback turn ({} builds, {} deploys)".format(
+                self.soft_deadline, len(build_stack), len(deploy_stack)))
+            send_command(json.dumps(build_stack))
+            send_command(json.dumps(deploy_stack))
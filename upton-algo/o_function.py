@@ -0,0 +1,138 @@
+"""
+The O-function decision model described in strategy/O_function.tex, as pure functions.
+
+The constants of the model are parameters with the values AlgoStrategy plays with as defaults,
+so the same code can be evaluated offline over recorded replays (see scripts/contributions/tune_decision.py).
+decide() works on the inputs of a single turn, choose_f_batch() computes the choice of f for many turns
+at once with numpy.
+"""
+import random
+
+DEFAULT_PARAMETERS = {
+    "wall_weight": 5.5,    # weight of the wall in g and in the term subtracted from it
+    "z_weight": 0.25,      # weight of not upgraded turrets relative to upgraded ones
+    "mp_margin": 4,        # MP needed on top of the threat of a side before attacking it
+    "ramp": 20,            # rounds per extra MP of margin and per extra interceptor
+    "attack_mp": 10,       # MP needed to attack a side without threat
+    "patience": 9,         # turns of f == 0 in a row before spending the MP on a push
+}
+
+# f of a turn where both sides are equally good and AlgoStrategy picks one at random
+F_TIE = 3
+
+
+def g_function(i, j, t, wall_weight=DEFAULT_PARAMETERS["wall_weight"]):
+    """A function used in the O-function.
+    """
+    return wall_weight*t + 2*i + 3*j
+
+
+def side_terms(x, y, z, w, parameters=DEFAULT_PARAMETERS):
+    """term_a and term_b of one side of the board, x, y, z and w as in the O-function
+    """
+    wall_weight = parameters["wall_weight"]
+    z_weight = parameters["z_weight"]
+    term_a = g_function((x + z_weight*z)*w, y*w, w, wall_weight)
+    term_b = g_function(x + z_weight*z, y, w, wall_weight)
+    return term_a, term_b
+
+
+def decide(x, y, z, x_1, y_1, z_1, w, w_1, mp, sp, r, m, continuous_f_0, parameters=DEFAULT_PARAMETERS, rng=random, tie_break=None):
+    """The O-function for a single turn
+
+    When both sides are equally good to attack, f is tie_break() if given, else 1 or 2 at random.
+
+    Returns:
+        (a, b, c, d, e, f, h, mp_l, sp_l, continuous_f_0), continuous_f_0 is the updated number of turns in a row with f == 0
+
+    """
+    wall_weight = parameters["wall_weight"]
+    a, b, c, d, f, h = 0, 0, 0, 0, 0, 0
+
+    e = r // parameters["ramp"] + 1
+    term_a, term_b = side_terms(x, y, z, w, parameters)
+    term_a_1, term_b_1 = side_terms(x_1, y_1, z_1, w_1, parameters)
+    threat = term_a - wall_weight*w + term_b
+    threat_1 = term_a_1 - wall_weight*w_1 + term_b_1
+    margin = parameters["mp_margin"] + r // parameters["ramp"]
+
+    if (mp <= threat + margin) and (mp <= threat_1 + margin):
+        f = 0
+        continuous_f_0 += 1
+    elif threat == 0 or threat_1 == 0:
+        if mp >= parameters["attack_mp"]:
+            continuous_f_0 = 0
+            c = 2
+            a = 6
+            b = mp - a
+            if threat == 0 and threat_1 != 0:
+                f = 1
+            elif threat != 0 and threat_1 == 0:
+                f = 2
+            elif tie_break is not None:
+                f = tie_break()
+            else:
+                f = rng.randint(1, 2)
+        else:
+            f = 0
+            continuous_f_0 += 1
+    elif (term_b - wall_weight*w)/threat >= (term_b_1 - wall_weight*w_1)/threat_1:
+        f = 1
+        continuous_f_0 = 0
+        c = 2
+        a = term_a_1
+        b = mp - a
+    else:
+        f = 2
+        continuous_f_0 = 0
+        c = 2
+        a = term_a
+        b = mp - a
+
+    if f == 0 and continuous_f_0 == parameters["patience"]:
+        if m == 1:
+            d = int((mp - e)//3)
+        elif m == 0:
+            h = int(mp - e)
+        continuous_f_0 = 0
+
+    a = int(a)
+    b = int(b)
+    sp_l = sp - c
+    mp_l = mp - a - b - 2*d - e
+    return a, b, c, d, e, f, h, mp_l, sp_l, continuous_f_0
+
+
+def choose_f_batch(inputs, parameters=DEFAULT_PARAMETERS):
+    """The choice of f of decide() for many turns at once
+
+    Args:
+        inputs: dict of equally long numpy arrays x, y, z, x_1, y_1, z_1, w, w_1, mp and r
+        parameters: The constants of the model
+
+    Returns:
+        A numpy array of f per turn, F_TIE where decide() would pick 1 or 2 at random
+
+    """
+    import numpy as np
+
+    wall_weight = parameters["wall_weight"]
+    term_a, term_b = side_terms(inputs["x"], inputs["y"], inputs["z"], inputs["w"], parameters)
+    term_a_1, term_b_1 = side_terms(inputs["x_1"], inputs["y_1"], inputs["z_1"], inputs["w_1"], parameters)
+    threat = term_a - wall_weight*inputs["w"] + term_b
+    threat_1 = term_a_1 - wall_weight*inputs["w_1"] + term_b_1
+    margin = parameters["mp_margin"] + inputs["r"] // parameters["ramp"]
+    mp = inputs["mp"]
+
+    no_threat = (threat == 0) | (threat_1 == 0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        left_first = (term_b - wall_weight*inputs["w"])/threat >= (term_b_1 - wall_weight*inputs["w_1"])/threat_1
+    return np.select(
+        [(mp <= threat + margin) & (mp <= threat_1 + margin),
+         no_threat & (mp < parameters["attack_mp"]),
+         no_threat & (threat == 0) & (threat_1 != 0),
+         no_threat & (threat != 0) & (threat_1 == 0),
+         no_threat,
+         left_first],
+        [0, 0, 1, 2, F_TIE, 1],
+        default=2)